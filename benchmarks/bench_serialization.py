@@ -0,0 +1,106 @@
+"""
+回應序列化微基準測試
+
+比較FastAPI預設路徑(建立模型 -> 依response_model再次驗證 -> jsonable_encoder
+-> json.dumps)與快速路徑(單次驗證 -> pydantic-core直接序列化)的每次回應CPU
+時間。
+
+用法:
+    python -m benchmarks.bench_serialization [--iterations N]
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Any, Callable, Dict, List
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from src.api.search import image_result_data
+from src.api.serialization import PydanticJSONResponse
+from src.models.responses import ImageResult, ImageSearchResponse
+
+
+def make_results(count: int) -> List[Dict[str, Any]]:
+    """產生與DDGS圖片結果相同格式的假資料"""
+    return [
+        {
+            "title": f"Result title number {i} with some words",
+            "image": f"https://images.example.com/{i}/full.jpg",
+            "thumbnail": f"https://tse.mm.bing.net/th?id=OIP.{i}",
+            "url": f"https://www.example.com/articles/{i}",
+            "height": 720,
+            "width": 1280,
+            "source": "Bing",
+        }
+        for i in range(count)
+    ]
+
+
+def legacy_path(results: List[Dict[str, Any]]) -> bytes:
+    """原本的路徑: 逐筆建立模型，再由FastAPI驗證並編碼"""
+    response = ImageSearchResponse(
+        success=True,
+        query="benchmark",
+        results=[ImageResult(**image_result_data(r)) for r in results],
+        total_results=len(results),
+        timestamp="2024-01-01T00:00:00",
+        region="wt-wt",
+    )
+    content = LOOP.run_until_complete(_fastapi_serialize(response))
+    return JSONResponse(content).body
+
+
+async def _fastapi_serialize(response: ImageSearchResponse) -> Any:
+    return await serialize_response(
+        field=RESPONSE_FIELD, response_content=response, is_coroutine=True
+    )
+
+
+def fast_path(results: List[Dict[str, Any]]) -> bytes:
+    """快速路徑: 單次驗證後直接序列化"""
+    response = ImageSearchResponse.model_validate(
+        {
+            "success": True,
+            "query": "benchmark",
+            "results": [image_result_data(r) for r in results],
+            "total_results": len(results),
+            "timestamp": "2024-01-01T00:00:00",
+            "region": "wt-wt",
+        }
+    )
+    return PydanticJSONResponse(response).body
+
+
+def measure(func: Callable[[List[Dict[str, Any]]], bytes], results, iterations: int):
+    """回傳每次呼叫的平均CPU時間(微秒)"""
+    func(results)
+    start = time.process_time()
+    for _ in range(iterations):
+        func(results)
+    return (time.process_time() - start) / iterations * 1e6
+
+
+LOOP = asyncio.new_event_loop()
+RESPONSE_FIELD = create_model_field(
+    name="Response_bench", type_=ImageSearchResponse, mode="serialization"
+)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=300)
+    args = parser.parse_args()
+
+    print(f"{'results':>8} {'legacy (us)':>12} {'fast (us)':>10} {'speedup':>8}")
+    for count in (10, 50, 100):
+        results = make_results(count)
+        legacy = measure(legacy_path, results, args.iterations)
+        fast = measure(fast_path, results, args.iterations)
+        print(f"{count:>8} {legacy:>12.1f} {fast:>10.1f} {legacy / fast:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,506 @@
+"""
+離線基準測試套件
+
+以假的DDGS上游(benchmarks.fake_ddgs)在同一程序內執行，不需要網路：
+
+- 微基準測試：請求驗證、查詢正規化、結果轉換與回應序列化的每次呼叫時間
+- 端對端情境：透過ASGI傳輸對完整應用程式發出並發請求
+
+結果以JSON輸出(吞吐量與p50/p95/p99)，可用--compare與先前的結果比較。
+
+用法:
+    python -m benchmarks.bench_suite [--quick] [--output FILE] [--compare BASELINE]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import time
+from collections import Counter
+from contextlib import ExitStack
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from unittest.mock import patch
+
+import httpx
+
+from benchmarks.fake_ddgs import FakeProfile, FakeUpstream
+from src.api.search import result_filter, text_result_data
+from src.api.serialization import PydanticJSONResponse
+from src.core.config import settings
+from src.models.requests import BatchSearchRequest, SearchRequest
+from src.models.responses import SearchResponse
+from src.services.cache import create_search_cache
+from src.services.normalization import normalize_params
+from src.services.replay import UpstreamTape, read_tape
+
+# 基準測試期間覆寫的設定，排除與量測無關的功能並固定使用執行緒後端
+BENCH_SETTINGS = {
+    "SEARCH_BACKEND": "thread",
+    "CACHE_BACKEND": "memory",
+    "ARCHIVE_ENABLED": False,
+    "HEDGE_ENABLED": False,
+    "RATE_LIMIT_ENABLED": False,
+    "WARMUP_ENABLED": False,
+}
+
+# 可轉換為端對端請求的錄製上游操作 (執行緒後端的完整搜尋)
+REPLAY_ENDPOINTS = {
+    "text_search": "/search",
+    "image_search": "/search/images",
+    "news_search": "/search/news",
+}
+
+Request = Tuple[str, str, Optional[Dict[str, Any]]]
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """
+    計算p50/p95/p99 (nearest-rank)
+
+    Args:
+        samples: 樣本
+
+    Returns:
+        百分位數字典
+    """
+    ordered = sorted(samples)
+    if not ordered:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0}
+
+    def rank(q: float) -> float:
+        return ordered[min(len(ordered) - 1, max(0, int(q * len(ordered) + 0.5) - 1))]
+
+    return {"p50": rank(0.50), "p95": rank(0.95), "p99": rank(0.99)}
+
+
+def sample_results(count: int) -> List[Dict[str, Any]]:
+    """產生與DDGS網頁結果相同格式的資料"""
+    return [
+        {
+            "title": f"Result title number {i} with some words",
+            "href": f"https://www.example.com/articles/{i}?utm_source=bench",
+            "body": "Lorem ipsum dolor sit amet " * 8,
+        }
+        for i in range(count)
+    ]
+
+
+def micro_benchmarks() -> Dict[str, Callable[[], Any]]:
+    """建立微基準測試，每個函數執行一次被量測的操作"""
+    search_payload = {
+        "query": "FastAPI benchmark",
+        "region": "us-en",
+        "safesearch": "moderate",
+        "max_results": 20,
+    }
+    batch_payload = {
+        "items": [
+            {"type": ("text", "images", "news")[i % 3], "query": f"query {i}"}
+            for i in range(10)
+        ]
+    }
+    params = {
+        "query": "  Ｍixed  CJK 查詢 Query？ ",
+        "region": None,
+        "safesearch": "Moderate",
+        "timelimit": None,
+        "max_results": 10,
+    }
+    results = sample_results(50)
+
+    def transform() -> Any:
+        return [text_result_data(r) for r in result_filter("text")(results)]
+
+    def serialize() -> bytes:
+        response = SearchResponse.model_validate(
+            {
+                "success": True,
+                "query": "benchmark",
+                "results": [text_result_data(r) for r in results],
+                "total_results": len(results),
+                "timestamp": "2024-01-01T00:00:00",
+                "region": "wt-wt",
+                "safesearch": "moderate",
+                "time_limit": None,
+            }
+        )
+        return PydanticJSONResponse(response).body
+
+    return {
+        "validate_search_request": lambda: SearchRequest.model_validate(search_payload),
+        "validate_batch_request": lambda: BatchSearchRequest.model_validate(
+            batch_payload
+        ),
+        "normalize_params": lambda: normalize_params(params),
+        "transform_text_results_50": transform,
+        "serialize_text_response_50": serialize,
+    }
+
+
+def run_micro(func: Callable[[], Any], iterations: int) -> Dict[str, Any]:
+    """
+    重複執行操作並統計每次呼叫時間(微秒)
+
+    Args:
+        func: 被量測的操作
+        iterations: 執行次數
+
+    Returns:
+        包含每秒操作數與百分位數的字典
+    """
+    for _ in range(min(iterations, 50)):
+        func()
+    samples = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        start = time.perf_counter_ns()
+        func()
+        samples.append((time.perf_counter_ns() - start) / 1000)
+    elapsed = time.perf_counter() - started
+    return {
+        "iterations": iterations,
+        "ops_per_sec": round(iterations / elapsed, 1),
+        **{f"{k}_us": round(v, 2) for k, v in percentiles(samples).items()},
+    }
+
+
+@dataclass
+class Scenario:
+    """端對端情境：以concurrency個並發客戶端送出requests個請求"""
+
+    name: str
+    make_request: Callable[[int], Request]
+    requests: int = 400
+    concurrency: int = 16
+    profile: FakeProfile = field(default_factory=FakeProfile)
+    # 每個請求相對於開始的送出時間(秒)；設定時依時間送出，不限制並發數
+    arrivals: Optional[List[float]] = None
+    # 以錄製檔取代上游的重播設定 (錄製檔路徑, 耗時倍數)
+    replay: Optional[Tuple[str, float]] = None
+
+
+def search(path: str, body: Dict[str, Any]) -> Request:
+    """建立POST搜尋請求"""
+    return ("POST", path, body)
+
+
+def scenarios(scale: float) -> List[Scenario]:
+    """建立端對端情境，scale用於縮放請求數"""
+
+    def count(n: int) -> int:
+        return max(20, int(n * scale))
+
+    search_paths = ("/search", "/search/images", "/search/news")
+    return [
+        Scenario(
+            "cached_hot_query",
+            lambda i: search("/search", {"query": "hot query", "max_results": 10}),
+            requests=count(2000),
+        ),
+        Scenario(
+            "cold_unique_queries",
+            lambda i: search("/search", {"query": f"unique {i}", "max_results": 10}),
+            requests=count(400),
+        ),
+        Scenario(
+            "mixed_types_zipf",
+            lambda i: search(
+                search_paths[i % 3],
+                {"query": f"popular {int(20 / (1 + i % 20))}", "max_results": 10},
+            ),
+            requests=count(1000),
+        ),
+        Scenario(
+            "upstream_errors_10pct",
+            lambda i: search("/search", {"query": f"flaky {i}", "max_results": 10}),
+            requests=count(400),
+            profile=FakeProfile(error_rate=0.1),
+        ),
+        Scenario(
+            "batch_5_items",
+            lambda i: search(
+                "/search/batch",
+                {
+                    "items": [
+                        {"type": "text", "query": f"batch {i} {j}"} for j in range(5)
+                    ]
+                },
+            ),
+            requests=count(100),
+            concurrency=8,
+        ),
+    ]
+
+
+def replay_scenario(path: str, scale: float) -> Scenario:
+    """
+    由上游錄製檔建立情境：每筆完整搜尋的錄製轉換為一個請求，並以錄製檔重播上游
+
+    Args:
+        path: UPSTREAM_RECORD_PATH錄製的檔案
+        scale: 錄製耗時與請求間隔的倍數，0表示不等待並以並發客戶端送出
+
+    Returns:
+        重播情境
+    """
+    entries = [entry for entry in read_tape(path) if entry["op"] in REPLAY_ENDPOINTS]
+    if not entries:
+        raise SystemExit(f"{path} has no recorded searches to replay")
+
+    requests: List[Request] = []
+    for entry in entries:
+        body = dict(entry.get("params") or {})
+        if "timelimit" in body:
+            body["time_limit"] = body.pop("timelimit")
+        requests.append(search(REPLAY_ENDPOINTS[entry["op"]], body))
+
+    arrivals = None
+    if scale > 0:
+        first = entries[0].get("at", 0.0)
+        arrivals = [(entry.get("at", first) - first) * scale for entry in entries]
+    return Scenario(
+        "replay",
+        lambda i: requests[i],
+        requests=len(requests),
+        arrivals=arrivals,
+        replay=(path, scale),
+    )
+
+
+def reset_state() -> None:
+    """清除快取與各項自適應狀態，讓每個情境從相同狀態開始"""
+    from src.services.ddgs_service import search_cache
+    from src.services.concurrency import upstream_limiter
+    from src.services.ddgs_service import circuit_breakers
+
+    search_cache.clear()
+    upstream_limiter.reset()
+    for breaker in circuit_breakers.values():
+        breaker.reset()
+
+
+async def run_scenario(
+    client: httpx.AsyncClient, upstream: FakeUpstream, scenario: Scenario
+) -> Dict[str, Any]:
+    """
+    執行單一情境並統計延遲與狀態碼
+
+    Args:
+        client: 連接到應用程式的HTTP客戶端
+        upstream: 假上游
+        scenario: 情境
+
+    Returns:
+        包含吞吐量、延遲百分位數與狀態碼分布的字典
+    """
+    reset_state()
+    upstream.configure(scenario.profile)
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    next_index = 0
+
+    async def send(index: int) -> None:
+        method, path, body = scenario.make_request(index)
+        start = time.perf_counter()
+        response = await client.request(method, path, json=body)
+        latencies.append((time.perf_counter() - start) * 1000)
+        statuses[str(response.status_code)] += 1
+
+    async def worker() -> None:
+        nonlocal next_index
+        while next_index < scenario.requests:
+            index = next_index
+            next_index += 1
+            await send(index)
+
+    async def arrive(index: int, offset: float) -> None:
+        await asyncio.sleep(max(0.0, started + offset - time.perf_counter()))
+        await send(index)
+
+    tape = None
+    with ExitStack() as stack:
+        if scenario.replay is not None:
+            tape = UpstreamTape(
+                replay_path=scenario.replay[0], latency_scale=scenario.replay[1]
+            )
+            stack.enter_context(patch("src.services.ddgs_service.upstream_tape", tape))
+        started = time.perf_counter()
+        if scenario.arrivals is not None:
+            await asyncio.gather(
+                *[arrive(i, offset) for i, offset in enumerate(scenario.arrivals)]
+            )
+        else:
+            await asyncio.gather(*[worker() for _ in range(scenario.concurrency)])
+        elapsed = time.perf_counter() - started
+
+    return {
+        "requests": scenario.requests,
+        "concurrency": None if scenario.arrivals is not None else scenario.concurrency,
+        "profile": None if tape else asdict(scenario.profile),
+        "throughput_rps": round(scenario.requests / elapsed, 1),
+        **{f"{k}_ms": round(v, 2) for k, v in percentiles(latencies).items()},
+        "status_codes": dict(sorted(statuses.items())),
+        "upstream": tape.stats() if tape else upstream.stats(),
+    }
+
+
+async def run_scenarios(selected: List[Scenario]) -> Dict[str, Any]:
+    """在同一個應用程式生命週期內依序執行情境"""
+    from src.app import create_app
+    from src.services.auth_service import verify_token
+
+    upstream = FakeUpstream(FakeProfile())
+    results = {}
+    with ExitStack() as stack:
+        stack.enter_context(patch("src.services.ddgs_service.DDGS", upstream.client))
+        for name, value in BENCH_SETTINGS.items():
+            stack.enter_context(patch.object(settings, name, value))
+        # 全域快取與封存在匯入時依.env建立，這裡換成記憶體快取並停用封存
+        stack.enter_context(
+            patch("src.services.ddgs_service.search_cache", create_search_cache())
+        )
+        stack.enter_context(patch("src.services.ddgs_service.search_archive", None))
+
+        app = create_app()
+        app.dependency_overrides[verify_token] = lambda: "benchmark"
+        transport = httpx.ASGITransport(app=app)
+        async with app.router.lifespan_context(app):
+            async with httpx.AsyncClient(
+                transport=transport, base_url="http://bench", timeout=60
+            ) as client:
+                for scenario in selected:
+                    print(f"  scenario {scenario.name} ...", file=sys.stderr)
+                    results[scenario.name] = await run_scenario(
+                        client, upstream, scenario
+                    )
+    return results
+
+
+def git_commit() -> Optional[str]:
+    """取得目前的git commit，無法取得時為None"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    """
+    與先前的結果比較
+
+    Args:
+        current: 本次結果
+        baseline: 先前的結果
+
+    Returns:
+        每個指標的比較行，變化為正值表示變慢(延遲)或變快(吞吐量)
+    """
+
+    def change(new: float, old: float) -> str:
+        return f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+
+    lines = [
+        f"comparing {current['meta'].get('commit')} with "
+        f"{baseline.get('meta', {}).get('commit')}"
+    ]
+    for name, stats in current["micro"].items():
+        old = baseline.get("micro", {}).get(name)
+        if old:
+            lines.append(
+                f"micro    {name:<28} p50 {stats['p50_us']:>9.2f}us "
+                f"({change(stats['p50_us'], old['p50_us'])})"
+            )
+    for name, stats in current["scenarios"].items():
+        old = baseline.get("scenarios", {}).get(name)
+        if old:
+            lines.append(
+                f"scenario {name:<28} {stats['throughput_rps']:>8.1f} rps "
+                f"({change(stats['throughput_rps'], old['throughput_rps'])}), "
+                f"p95 {stats['p95_ms']:.2f}ms "
+                f"({change(stats['p95_ms'], old['p95_ms'])})"
+            )
+    return lines
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--quick", action="store_true", help="fewer iterations")
+    parser.add_argument("--output", help="write JSON results to this file")
+    parser.add_argument("--compare", help="baseline JSON results to compare against")
+    parser.add_argument(
+        "--only", choices=("micro", "scenarios"), help="run only one part"
+    )
+    parser.add_argument(
+        "--replay",
+        metavar="PATH",
+        help="replay an UPSTREAM_RECORD_PATH recording instead of the "
+        "synthetic scenarios",
+    )
+    parser.add_argument(
+        "--replay-scale",
+        type=float,
+        default=1.0,
+        help="multiply recorded latency and request gaps (0: no waiting)",
+    )
+    args = parser.parse_args()
+
+    # 每個請求的資訊日誌會主導量測結果，基準測試期間只保留警告以上
+    logging.getLogger("ddgs_api").setLevel(logging.WARNING)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    scale = 0.1 if args.quick else 1.0
+
+    report: Dict[str, Any] = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "quick": args.quick,
+        },
+        "micro": {},
+        "scenarios": {},
+    }
+
+    if args.only != "scenarios":
+        iterations = int(20000 * scale)
+        for name, func in micro_benchmarks().items():
+            print(f"  micro {name} ...", file=sys.stderr)
+            report["micro"][name] = run_micro(func, iterations)
+    if args.only != "micro":
+        if args.replay:
+            selected = [replay_scenario(args.replay, args.replay_scale)]
+        else:
+            selected = scenarios(scale)
+        report["scenarios"] = asyncio.run(run_scenarios(selected))
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        for line in compare(report, baseline):
+            print(line, file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
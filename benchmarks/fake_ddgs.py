@@ -0,0 +1,169 @@
+"""
+離線基準測試用的DDGS替身
+
+提供與ddgs.DDGS相同介面(context manager與text/images/news方法)的假客戶端，
+延遲、錯誤率與結果數可設定，並以固定的亂數種子產生可重現的結果。
+"""
+
+import math
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+from ddgs.exceptions import DDGSException, RatelimitException, TimeoutException
+
+
+@dataclass
+class FakeProfile:
+    """
+    假上游的行為設定
+
+    延遲為對數常態分布，latency_median為中位數(秒)、latency_sigma為形狀參數，
+    sigma為0時每次延遲相同。錯誤依error_rate發生，其中ratelimit_share比例為
+    RatelimitException、timeout_share比例為TimeoutException，其餘為DDGSException。
+    """
+
+    latency_median: float = 0.05
+    latency_sigma: float = 0.5
+    error_rate: float = 0.0
+    ratelimit_share: float = 0.5
+    timeout_share: float = 0.25
+    results: Optional[int] = None
+    body_words: int = 30
+    seed: int = 42
+
+
+class FakeUpstream:
+    """
+    共用的假上游，記錄呼叫數與錯誤數
+
+    亂數產生器由所有客戶端共用並以鎖保護，相同設定與呼叫順序得到相同結果。
+    """
+
+    def __init__(self, profile: FakeProfile):
+        self.profile = profile
+        self.calls = 0
+        self.errors = 0
+        self._random = random.Random(profile.seed)
+        self._lock = threading.Lock()
+
+    def configure(self, profile: FakeProfile) -> None:
+        """套用新的行為設定並重設亂數產生器與統計，已建立的客戶端立即生效"""
+        with self._lock:
+            self.profile = profile
+            self.calls = 0
+            self.errors = 0
+            self._random = random.Random(profile.seed)
+
+    def client(self) -> "FakeDDGS":
+        """建立假客戶端，可直接取代DDGS類別作為factory"""
+        return FakeDDGS(self)
+
+    def call(
+        self,
+        search_type: str,
+        query: str,
+        max_results: Optional[int],
+        page: int,
+        make: Callable[[int, str], Dict[str, Any]],
+    ) -> List[Dict[str, Any]]:
+        """模擬一次上游呼叫：等待延遲、依錯誤率拋出例外，否則產生結果"""
+        profile = self.profile
+        with self._lock:
+            self.calls += 1
+            latency = profile.latency_median * math.exp(
+                self._random.gauss(0.0, profile.latency_sigma)
+            )
+            roll = self._random.random()
+        time.sleep(latency)
+
+        if roll < profile.error_rate:
+            with self._lock:
+                self.errors += 1
+            share = roll / profile.error_rate
+            if share < profile.ratelimit_share:
+                raise RatelimitException(f"fake ratelimit for {query}")
+            if share < profile.ratelimit_share + profile.timeout_share:
+                raise TimeoutException(f"fake timeout for {query}")
+            raise DDGSException(f"fake failure for {query}")
+
+        count = profile.results if profile.results is not None else max_results or 10
+        offset = (page - 1) * count
+        return [make(offset + i, query) for i in range(count)]
+
+    def stats(self) -> Dict[str, int]:
+        """取得呼叫統計"""
+        return {"calls": self.calls, "errors": self.errors}
+
+
+class FakeDDGS:
+    """與ddgs.DDGS相同介面的假客戶端"""
+
+    def __init__(self, upstream: FakeUpstream):
+        self.upstream = upstream
+
+    def __enter__(self) -> "FakeDDGS":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        return None
+
+    def text(
+        self,
+        query: str,
+        max_results: Optional[int] = 10,
+        page: int = 1,
+        **kwargs: Any,
+    ) -> List[Dict[str, Any]]:
+        return self.upstream.call("text", query, max_results, page, self._text)
+
+    def images(
+        self,
+        query: str,
+        max_results: Optional[int] = 10,
+        page: int = 1,
+        **kwargs: Any,
+    ) -> List[Dict[str, Any]]:
+        return self.upstream.call("images", query, max_results, page, self._image)
+
+    def news(
+        self,
+        query: str,
+        max_results: Optional[int] = 10,
+        page: int = 1,
+        **kwargs: Any,
+    ) -> List[Dict[str, Any]]:
+        return self.upstream.call("news", query, max_results, page, self._news)
+
+    def _body(self, query: str) -> str:
+        return " ".join([query] * self.upstream.profile.body_words)
+
+    def _text(self, index: int, query: str) -> Dict[str, Any]:
+        return {
+            "title": f"{query} result {index}",
+            "href": f"https://example.com/{index}?utm_source=bench",
+            "body": self._body(query),
+        }
+
+    def _image(self, index: int, query: str) -> Dict[str, Any]:
+        return {
+            "title": f"{query} image {index}",
+            "image": f"https://images.example.com/{index}/full.jpg",
+            "thumbnail": f"https://images.example.com/{index}/thumb.jpg",
+            "url": f"https://example.com/gallery/{index}",
+            "height": 720,
+            "width": 1280,
+            "source": "Bing",
+        }
+
+    def _news(self, index: int, query: str) -> Dict[str, Any]:
+        return {
+            "date": "2024-01-01T00:00:00+00:00",
+            "title": f"{query} story {index}",
+            "body": self._body(query),
+            "url": f"https://news.example.com/{index}",
+            "image": None,
+            "source": "Example News",
+        }
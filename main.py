@@ -7,15 +7,7 @@ import os
 # 添加src目錄到Python路徑
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
-from src.app import app
-from src.core.config import settings
+from src.core.server import run
 
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(
-        "app:app",
-        host=settings.HOST,
-        port=settings.PORT,
-        reload=settings.DEBUG,
-        log_level="info"
-    )
+    run()
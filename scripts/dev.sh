@@ -16,4 +16,4 @@ if ! command -v uv &> /dev/null; then
 fi
 
 echo "� Starting development server..."
-uv run --with fastapi --with "uvicorn[standard]" --with ddgs --with python-dotenv python main.py
+WORKERS="${WORKERS:-1}" uv run --with fastapi --with "uvicorn[standard]" --with ddgs --with python-dotenv python main.py
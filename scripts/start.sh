@@ -22,6 +22,7 @@ if [ ! -f .env ]; then
     cp .env.example .env
 fi
 
-# 啟動生產服務器
-echo "🌟 Starting production server..."
-uv run --with fastapi --with "uvicorn[standard]" --with ddgs --with python-dotenv python main.py
+# 啟動生產服務器 (worker數、uvloop/httptools與worker回收等設定見.env)
+# 以exec取代shell，讓SIGHUP (逐一重啟worker) 與SIGTERM (優雅關閉) 直接送到主程序
+echo "🌟 Starting production server (WORKERS=${WORKERS:-auto})..."
+exec uv run --with fastapi --with "uvicorn[standard]" --with ddgs --with python-dotenv python main.py
@@ -0,0 +1,102 @@
+"""
+請求截止時間與客戶端斷線處理
+"""
+
+import asyncio
+from contextlib import suppress
+from typing import Any, Awaitable, Optional, TypeVar
+
+from fastapi import HTTPException, Request
+
+from src.core.config import settings
+from src.core.exceptions import ClientDisconnectedError, DeadlineExceededError
+
+T = TypeVar("T")
+
+# 客戶端指定截止時間(秒)的標頭
+TIMEOUT_HEADER = "X-Search-Timeout"
+
+
+def resolve_timeout(raw_request: Request, requested: Optional[float] = None) -> float:
+    """
+    決定請求的截止時間長度
+
+    優先使用請求欄位，其次為X-Search-Timeout標頭，最後為SEARCH_TIMEOUT設定；
+    結果不會超過SEARCH_TIMEOUT_MAX。
+
+    Args:
+        raw_request: HTTP請求
+        requested: 請求欄位中指定的秒數
+
+    Returns:
+        截止時間長度(秒)
+
+    Raises:
+        HTTPException: 當標頭不是正數時
+    """
+    if requested is None:
+        header = raw_request.headers.get(TIMEOUT_HEADER)
+        if header is not None:
+            try:
+                requested = float(header)
+            except ValueError:
+                requested = 0.0
+            if not requested > 0:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"{TIMEOUT_HEADER} must be a positive number of seconds",
+                )
+    timeout = requested if requested is not None else settings.SEARCH_TIMEOUT
+    return min(timeout, settings.SEARCH_TIMEOUT_MAX)
+
+
+async def wait_for_disconnect(raw_request: Request) -> None:
+    """
+    等待客戶端中斷連線
+
+    只能在請求主體已讀取完畢後使用。
+    """
+    while True:
+        message = await raw_request.receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+async def run_with_deadline(
+    operation: Awaitable[T], raw_request: Request, timeout: Optional[float]
+) -> T:
+    """
+    在截止時間內執行操作，逾時或客戶端斷線時取消操作
+
+    取消會傳遞到搜尋服務，尚未開始的執行緒池工作會被移除，不再佔用容量。
+
+    Args:
+        operation: 要執行的awaitable
+        raw_request: HTTP請求，用於偵測客戶端斷線
+        timeout: 截止時間長度(秒)，None表示只在斷線時取消
+
+    Returns:
+        操作的結果
+
+    Raises:
+        DeadlineExceededError: 當超過截止時間時
+        ClientDisconnectedError: 當客戶端在完成前斷線時
+    """
+    task: "asyncio.Future[Any]" = asyncio.ensure_future(operation)
+    watcher = asyncio.ensure_future(wait_for_disconnect(raw_request))
+    try:
+        done, _ = await asyncio.wait(
+            {task, watcher}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+        )
+    finally:
+        watcher.cancel()
+        if not task.done():
+            task.cancel()
+            with suppress(asyncio.CancelledError, Exception):
+                await task
+
+    if task in done:
+        return task.result()
+    if watcher in done:
+        raise ClientDisconnectedError("Client disconnected before search completed")
+    raise DeadlineExceededError(f"Search deadline of {timeout:g}s exceeded")
@@ -0,0 +1,195 @@
+"""
+HTTP中介層
+"""
+
+import time
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.core.config import settings
+from src.core.metrics import (
+    http_request_duration_seconds,
+    http_requests_in_flight,
+    http_requests_total,
+    rate_limited_requests_total,
+)
+from src.services.auth_service import TokenInfo, resolve_token, token_digest
+from src.services.rate_limit import (
+    RateLimitDecision,
+    RateLimiter,
+    ip_rate_limiter,
+    token_rate_limiter,
+)
+
+# 需要限速的路徑前綴 (會執行DDGS搜尋的端點)
+RATE_LIMITED_PREFIXES = ("/search",)
+
+
+class MetricsMiddleware:
+    """
+    記錄每個路由的請求數量與延遲
+
+    以路由樣板(例如 /search/images)而非實際路徑作為標籤，避免標籤數量
+    無限增加；沒有對應路由的請求歸類為 unmatched。串流回應的延遲包含
+    整個回應主體的傳送時間。
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_requests_in_flight.dec()
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            method = scope["method"]
+            http_requests_total.inc(route=path, method=method, status=str(status_code))
+            http_request_duration_seconds.observe(
+                time.perf_counter() - start, route=path, method=method
+            )
+
+
+def client_ip(scope: Scope, headers: Headers) -> str:
+    """
+    取得客戶端IP
+
+    設定RATE_LIMIT_TRUST_FORWARDED時使用X-Forwarded-For的第一個位址。
+    """
+    if settings.RATE_LIMIT_TRUST_FORWARDED:
+        forwarded = headers.get("x-forwarded-for", "").split(",")[0].strip()
+        if forwarded:
+            return forwarded
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+def known_token(headers: Headers) -> Optional[Tuple[str, TokenInfo]]:
+    """
+    取得有效Bearer token的摘要與設定，摘要作為限速鍵，共用狀態中不保存token本身
+
+    Returns:
+        (token的SHA-256摘要, token的設定)，未提供token或token無效時為None
+    """
+    scheme, _, token = headers.get("authorization", "").partition(" ")
+    token = token.strip()
+    if scheme.lower() != "bearer" or not token:
+        return None
+    digest = token_digest(token)
+    info = resolve_token(token, digest)
+    return (digest, info) if info is not None else None
+
+
+def rate_limit_headers(decision: RateLimitDecision) -> dict:
+    """
+    產生RateLimit-*回應標頭
+
+    Args:
+        decision: 判斷結果
+
+    Returns:
+        標頭字典，被拒絕時另外包含Retry-After
+    """
+    headers = {
+        "RateLimit-Limit": str(decision.limit),
+        "RateLimit-Remaining": str(decision.remaining),
+        "RateLimit-Reset": str(decision.reset),
+        "RateLimit-Policy": f"{decision.limit};w={decision.window}",
+    }
+    if not decision.allowed:
+        headers["Retry-After"] = str(decision.retry_after)
+    return headers
+
+
+class RateLimitMiddleware:
+    """
+    以token bucket限制搜尋端點的請求速率
+
+    每個請求依序檢查API token (有效時) 與客戶端IP的bucket，任一用盡即回應429，
+    已取出的token會歸還，被拒絕的請求不消耗任何bucket的額度；無效的token只計入IP，
+    避免以任意token建立新的bucket繞過限制。在路由與認證之前執行，被拒絕的請求不會產生任何DDGS工作。回應帶有
+    剩餘額度最少的bucket的RateLimit-*標頭。
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or not settings.RATE_LIMIT_ENABLED
+            or not scope["path"].startswith(RATE_LIMITED_PREFIXES)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        checks: List[Tuple[str, RateLimiter, str, Optional[TokenInfo]]] = []
+        token = known_token(headers)
+        if token is not None:
+            # token清單中設定的限速優先於預設值
+            checks.append(("token", token_rate_limiter, *token))
+        checks.append(("ip", ip_rate_limiter, client_ip(scope, headers), None))
+
+        reported: Optional[RateLimitDecision] = None
+        for index, (limit_scope, limiter, key, info) in enumerate(checks):
+            decision = await limiter.aacquire(
+                key,
+                rate=info.rate if info else None,
+                burst=info.burst if info else None,
+            )
+            if not decision.allowed:
+                # 歸還先前的bucket已取出的token，避免共用token的其他客戶端被拖累
+                for _, charged, charged_key, charged_info in checks[:index]:
+                    await charged.arefund(
+                        charged_key,
+                        rate=charged_info.rate if charged_info else None,
+                        burst=charged_info.burst if charged_info else None,
+                    )
+                rate_limited_requests_total.inc(scope=limit_scope)
+                response = JSONResponse(
+                    status_code=429,
+                    content={
+                        "success": False,
+                        "error": "HTTP Exception",
+                        "message": f"Rate limit exceeded for {limit_scope}",
+                        "status_code": 429,
+                        "timestamp": datetime.now().isoformat(),
+                    },
+                    headers=rate_limit_headers(decision),
+                )
+                await response(scope, receive, send)
+                return
+            if reported is None or decision.remaining < reported.remaining:
+                reported = decision
+
+        extra = [
+            (name.lower().encode(), value.encode())
+            for name, value in rate_limit_headers(reported).items()
+        ]
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + extra
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
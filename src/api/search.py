@@ -2,11 +2,23 @@
 搜尋API路由
 """
 
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+import json
+import time
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from datetime import datetime
-from typing import Optional
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Type, Union
+from pydantic import BaseModel, TypeAdapter, ValidationError
 
-from src.models.requests import SearchRequest, ImageSearchRequest, NewsSearchRequest
+from src.models.requests import (
+    SearchRequest,
+    ImageSearchRequest,
+    NewsSearchRequest,
+    BatchSearchRequest,
+    BatchSearchItem,
+    PaginatedSearchRequest,
+)
 from src.models.responses import (
     SearchResponse,
     ImageSearchResponse,
@@ -14,52 +26,420 @@ from src.models.responses import (
     SearchResult,
     ImageResult,
     NewsResult,
+    BatchSearchItemResult,
+    BatchSearchResponse,
+    PaginatedSearchResponse,
 )
+from src.api.deadlines import resolve_timeout, run_with_deadline
+from src.api.serialization import model_response
+from src.services.cursors import Cursor, decode_cursor, encode_cursor, search_paginator
 from src.services.ddgs_service import DDGSService
-from src.services.auth_service import verify_token
+from src.services.dedup import ResultDeduplicator
+from src.services.auth_service import (
+    TokenInfo,
+    authorize_search_type,
+    verify_token,
+)
+from src.services.warmup import query_log
+from src.core.config import settings
+from src.core.exceptions import (
+    ClientDisconnectedError,
+    DeadlineExceededError,
+    ServiceUnavailableError,
+)
 from src.core.logging import logger
+from src.core.metrics import search_transform_seconds
 
 router = APIRouter()
 
+# 支援的串流格式 (Accept標頭 -> 格式名稱)
+STREAM_MEDIA_TYPES = {
+    "application/x-ndjson": "ndjson",
+    "text/event-stream": "sse",
+}
+
+
+def text_search_params(request: SearchRequest) -> Dict[str, Any]:
+    """將網頁搜尋請求轉換為DDGSService參數"""
+    return {
+        "query": request.query,
+        "region": request.region,
+        "safesearch": request.safesearch,
+        "timelimit": request.time_limit,
+        "max_results": request.max_results,
+    }
+
+
+def image_search_params(request: ImageSearchRequest) -> Dict[str, Any]:
+    """將圖片搜尋請求轉換為DDGSService參數"""
+    return {
+        "query": request.query,
+        "region": request.region,
+        "safesearch": request.safesearch,
+        "size": request.size,
+        "color": request.color,
+        "type_image": request.type_image,
+        "layout": request.layout,
+        "license_image": request.license_image,
+        "max_results": request.max_results,
+    }
+
+
+def news_search_params(request: NewsSearchRequest) -> Dict[str, Any]:
+    """將新聞搜尋請求轉換為DDGSService參數"""
+    return {
+        "query": request.query,
+        "region": request.region,
+        "safesearch": request.safesearch,
+        "timelimit": request.time_limit,
+        "max_results": request.max_results,
+    }
+
+
+def text_result_data(result: Dict[str, Any]) -> Dict[str, Any]:
+    """將DDGS網頁結果轉換為SearchResult欄位"""
+    return {
+        "title": result.get("title", ""),
+        "href": result.get("href", ""),
+        "body": result.get("body", ""),
+    }
+
+
+def image_result_data(result: Dict[str, Any]) -> Dict[str, Any]:
+    """將DDGS圖片結果轉換為ImageResult欄位"""
+    return {
+        "title": result.get("title", ""),
+        "image": result.get("image", ""),
+        "thumbnail": result.get("thumbnail", ""),
+        "url": result.get("url", ""),
+        "height": result.get("height", 0),
+        "width": result.get("width", 0),
+        "source": result.get("source", ""),
+    }
+
+
+def news_result_data(result: Dict[str, Any]) -> Dict[str, Any]:
+    """將DDGS新聞結果轉換為NewsResult欄位"""
+    return {
+        "date": result.get("date", ""),
+        "title": result.get("title", ""),
+        "body": result.get("body", ""),
+        "url": result.get("url", ""),
+        "image": result.get("image"),
+        "source": result.get("source", ""),
+    }
+
+
+def result_filter(
+    search_type: str,
+) -> Callable[[List[Dict[str, Any]]], List[Dict[str, Any]]]:
+    """
+    取得結果後處理函數，依設定去除重複結果
+
+    Args:
+        search_type: 搜尋類型 (text, images, news)
+
+    Returns:
+        接受DDGS結果列表並回傳處理後列表的函數；同一函數的多次呼叫之間共用
+        已見過的URL，可用於跨分頁去重
+    """
+    if not settings.RESULT_DEDUP_ENABLED:
+        return list
+    return ResultDeduplicator(search_type).filter
+
+
+async def run_text_search(request: SearchRequest) -> SearchResponse:
+    """
+    執行網頁搜尋並建立回應
+
+    Args:
+        request: 網頁搜尋請求
+
+    Returns:
+        網頁搜尋回應
+    """
+    results = await DDGSService.search("text", **text_search_params(request))
+
+    # 轉換結果格式，整個回應只驗證一次
+    with search_transform_seconds.time(search_type="text"):
+        results = result_filter("text")(results)
+        return SearchResponse.model_validate(
+            {
+                "success": True,
+                "query": request.query,
+                "results": [text_result_data(result) for result in results],
+                "total_results": len(results),
+                "timestamp": datetime.now().isoformat(),
+                "region": request.region or "wt-wt",
+                "safesearch": request.safesearch or "moderate",
+                "time_limit": request.time_limit,
+            }
+        )
+
+
+async def run_image_search(request: ImageSearchRequest) -> ImageSearchResponse:
+    """
+    執行圖片搜尋並建立回應
+
+    Args:
+        request: 圖片搜尋請求
+
+    Returns:
+        圖片搜尋回應
+    """
+    results = await DDGSService.search("images", **image_search_params(request))
+
+    # 轉換結果格式，整個回應只驗證一次
+    with search_transform_seconds.time(search_type="images"):
+        results = result_filter("images")(results)
+        return ImageSearchResponse.model_validate(
+            {
+                "success": True,
+                "query": request.query,
+                "results": [image_result_data(result) for result in results],
+                "total_results": len(results),
+                "timestamp": datetime.now().isoformat(),
+                "region": request.region or "wt-wt",
+            }
+        )
+
+
+async def run_news_search(request: NewsSearchRequest) -> NewsSearchResponse:
+    """
+    執行新聞搜尋並建立回應
+
+    Args:
+        request: 新聞搜尋請求
+
+    Returns:
+        新聞搜尋回應
+    """
+    results = await DDGSService.search("news", **news_search_params(request))
+
+    # 轉換結果格式，整個回應只驗證一次
+    with search_transform_seconds.time(search_type="news"):
+        results = result_filter("news")(results)
+        return NewsSearchResponse.model_validate(
+            {
+                "success": True,
+                "query": request.query,
+                "results": [news_result_data(result) for result in results],
+                "total_results": len(results),
+                "timestamp": datetime.now().isoformat(),
+                "region": request.region or "wt-wt",
+            }
+        )
+
+
+def negotiate_stream_format(raw_request: Request) -> Optional[str]:
+    """
+    依Accept標頭決定是否使用串流回應
+
+    Args:
+        raw_request: HTTP請求
+
+    Returns:
+        串流格式 ("ndjson" 或 "sse")，不串流時為None
+    """
+    accept = raw_request.headers.get("accept", "")
+    for media_type, stream_format in STREAM_MEDIA_TYPES.items():
+        if media_type in accept:
+            return stream_format
+    return None
+
+
+def encode_stream_event(stream_format: str, event: str, data: Dict[str, Any]) -> str:
+    """
+    將串流事件編碼為NDJSON行或SSE事件
+
+    Args:
+        stream_format: 串流格式 ("ndjson" 或 "sse")
+        event: 事件名稱 (result, done, error)
+        data: 事件資料
+
+    Returns:
+        編碼後的字串
+    """
+    if stream_format == "sse":
+        payload = json.dumps(data, ensure_ascii=False)
+        return f"event: {event}\ndata: {payload}\n\n"
+    return json.dumps({"event": event, "data": data}, ensure_ascii=False) + "\n"
+
+
+async def stream_search_response(
+    search_type: str,
+    params: Dict[str, Any],
+    result_model: Type[BaseModel],
+    convert: Callable[[Dict[str, Any]], Dict[str, Any]],
+    stream_format: str,
+    deadline: Optional[float] = None,
+) -> StreamingResponse:
+    """
+    建立逐筆傳送搜尋結果的串流回應
+
+    第一頁在回應開始前取得，因此上游錯誤仍會以一般HTTP錯誤回應；之後的
+    錯誤會以error事件傳送。客戶端斷線時會停止向上游要求後續分頁；超過截止
+    時間時停止分頁，並以partial為true的done事件結束。重複結果會跨分頁去除。
+
+    Args:
+        search_type: 搜尋類型 (text, images, news)
+        params: 搜尋參數
+        result_model: 單筆結果的回應模型
+        convert: 將原始結果轉換為回應模型欄位的函數
+        stream_format: 串流格式 ("ndjson" 或 "sse")
+        deadline: 截止時間(time.monotonic)，None表示不限制
+
+    Returns:
+        串流回應
+    """
+    pages = DDGSService.stream(search_type, deadline=deadline, **params)
+    unique = result_filter(search_type)
+    first_page: List[Dict[str, Any]] = []
+    try:
+        first_page = unique(await pages.__anext__())
+    except StopAsyncIteration:
+        pass
+
+    def encode_result(result: Dict[str, Any]) -> Dict[str, Any]:
+        return result_model.model_validate(convert(result)).model_dump()
+
+    def done_event(total: int, partial: bool) -> str:
+        return encode_stream_event(
+            stream_format,
+            "done",
+            {
+                "success": True,
+                "query": params["query"],
+                "total_results": total,
+                "partial": partial,
+                "timestamp": datetime.now().isoformat(),
+            },
+        )
+
+    async def events() -> AsyncIterator[str]:
+        total = 0
+        try:
+            for result in first_page:
+                total += 1
+                yield encode_stream_event(
+                    stream_format, "result", encode_result(result)
+                )
+            async for page in pages:
+                for result in unique(page):
+                    total += 1
+                    yield encode_stream_event(
+                        stream_format, "result", encode_result(result)
+                    )
+            yield done_event(total, partial=False)
+        except DeadlineExceededError:
+            logger.warning(
+                f"Streaming {search_type} search hit its deadline after {total} results"
+            )
+            yield done_event(total, partial=True)
+        except Exception as e:
+            logger.error(f"Streaming {search_type} search failed: {str(e)}")
+            yield encode_stream_event(
+                stream_format,
+                "error",
+                {"success": False, "message": f"Search failed: {str(e)}"},
+            )
+        finally:
+            await pages.aclose()
+
+    media_type = next(
+        media for media, fmt in STREAM_MEDIA_TYPES.items() if fmt == stream_format
+    )
+    return StreamingResponse(
+        events(),
+        media_type=media_type,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# 搜尋類型對應的執行函數
+SEARCH_RUNNERS = {
+    "text": run_text_search,
+    "images": run_image_search,
+    "news": run_news_search,
+}
+
+
+# 搜尋類型對應的參數轉換、結果模型與結果轉換函數
+SEARCH_TYPE_HANDLERS = {
+    "text": (text_search_params, SearchResult, text_result_data),
+    "images": (image_search_params, ImageResult, image_result_data),
+    "news": (news_search_params, NewsResult, news_result_data),
+}
+
+# 驗證游標中保存的搜尋條件
+search_item_adapter: TypeAdapter = TypeAdapter(BatchSearchItem)
+
+
+def record_query(search_type: str, request: BaseModel) -> None:
+    """設定QUERY_LOG_PATH時記錄搜尋，供快取預熱使用"""
+    if query_log is not None:
+        query_log.record(search_type, request)
+
+
+async def run_search_item(entry: Dict[str, Any]) -> BaseModel:
+    """
+    執行查詢清單項目(與批次搜尋項目相同的欄位)
+
+    Args:
+        entry: 包含type與搜尋欄位的字典
+
+    Returns:
+        對應搜尋類型的回應
+
+    Raises:
+        ValidationError: 當項目欄位不正確時
+    """
+    item = search_item_adapter.validate_python(entry)
+    return await SEARCH_RUNNERS[item.type](item)
+
 
 @router.post("/search", response_model=SearchResponse)
 async def search_web(
-    request: SearchRequest, token: Optional[str] = Depends(verify_token)
+    request: SearchRequest,
+    raw_request: Request,
+    token_info: TokenInfo = Depends(verify_token),
 ):
     """
     網頁搜尋端點 (POST)
+
+    Accept為application/x-ndjson或text/event-stream時逐筆串流結果
     """
+    authorize_search_type(token_info, "text")
+    timeout = resolve_timeout(raw_request, request.timeout)
+    record_query("text", request)
     try:
-        results = await DDGSService.safe_ddgs_operation(
-            DDGSService.text_search,
-            request.query,
-            request.region,
-            request.safesearch,
-            request.time_limit,
-            request.max_results,
-        )
-
-        # 轉換結果格式
-        search_results = [
-            SearchResult(
-                title=result.get("title", ""),
-                href=result.get("href", ""),
-                body=result.get("body", ""),
+        stream_format = negotiate_stream_format(raw_request)
+        if stream_format:
+            return await run_with_deadline(
+                stream_search_response(
+                    "text",
+                    text_search_params(request),
+                    SearchResult,
+                    text_result_data,
+                    stream_format,
+                    deadline=time.monotonic() + timeout,
+                ),
+                raw_request,
+                None,
             )
-            for result in results
-        ]
-
-        return SearchResponse(
-            success=True,
-            query=request.query,
-            results=search_results,
-            total_results=len(search_results),
-            timestamp=datetime.now().isoformat(),
-            region=request.region or "wt-wt",
-            safesearch=request.safesearch or "moderate",
-            time_limit=request.time_limit,
+        return model_response(
+            await run_with_deadline(run_text_search(request), raw_request, timeout)
         )
 
+    except DeadlineExceededError as e:
+        logger.warning(f"Search timed out: {str(e)}")
+        raise HTTPException(status_code=504, detail=str(e))
+    except ClientDisconnectedError as e:
+        logger.info(f"Search abandoned: {str(e)}")
+        raise HTTPException(status_code=499, detail=str(e))
+    except ServiceUnavailableError as e:
+        logger.warning(f"Search rejected: {str(e)}")
+        raise HTTPException(status_code=503, detail=str(e), headers=e.headers())
     except Exception as e:
         logger.error(f"Search failed: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
@@ -67,48 +447,44 @@ async def search_web(
 
 @router.post("/search/images", response_model=ImageSearchResponse)
 async def search_images(
-    request: ImageSearchRequest, token: Optional[str] = Depends(verify_token)
+    request: ImageSearchRequest,
+    raw_request: Request,
+    token_info: TokenInfo = Depends(verify_token),
 ):
     """
-    圖片搜尋端點
+    圖片搜尋端點，支援與網頁搜尋相同的串流格式
     """
+    authorize_search_type(token_info, "images")
+    timeout = resolve_timeout(raw_request, request.timeout)
+    record_query("images", request)
     try:
-        results = await DDGSService.safe_ddgs_operation(
-            DDGSService.image_search,
-            request.query,
-            request.region,
-            request.safesearch,
-            request.size,
-            request.color,
-            request.type_image,
-            request.layout,
-            request.license_image,
-            request.max_results,
-        )
-
-        # 轉換結果格式
-        image_results = [
-            ImageResult(
-                title=result.get("title", ""),
-                image=result.get("image", ""),
-                thumbnail=result.get("thumbnail", ""),
-                url=result.get("url", ""),
-                height=result.get("height", 0),
-                width=result.get("width", 0),
-                source=result.get("source", ""),
+        stream_format = negotiate_stream_format(raw_request)
+        if stream_format:
+            return await run_with_deadline(
+                stream_search_response(
+                    "images",
+                    image_search_params(request),
+                    ImageResult,
+                    image_result_data,
+                    stream_format,
+                    deadline=time.monotonic() + timeout,
+                ),
+                raw_request,
+                None,
             )
-            for result in results
-        ]
-
-        return ImageSearchResponse(
-            success=True,
-            query=request.query,
-            results=image_results,
-            total_results=len(image_results),
-            timestamp=datetime.now().isoformat(),
-            region=request.region or "wt-wt",
+        return model_response(
+            await run_with_deadline(run_image_search(request), raw_request, timeout)
         )
 
+    except DeadlineExceededError as e:
+        logger.warning(f"Image search timed out: {str(e)}")
+        raise HTTPException(status_code=504, detail=str(e))
+    except ClientDisconnectedError as e:
+        logger.info(f"Image search abandoned: {str(e)}")
+        raise HTTPException(status_code=499, detail=str(e))
+    except ServiceUnavailableError as e:
+        logger.warning(f"Image search rejected: {str(e)}")
+        raise HTTPException(status_code=503, detail=str(e), headers=e.headers())
     except Exception as e:
         logger.error(f"Image search failed: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Image search failed: {str(e)}")
@@ -116,43 +492,201 @@ async def search_images(
 
 @router.post("/search/news", response_model=NewsSearchResponse)
 async def search_news(
-    request: NewsSearchRequest, token: Optional[str] = Depends(verify_token)
+    request: NewsSearchRequest,
+    raw_request: Request,
+    token_info: TokenInfo = Depends(verify_token),
 ):
     """
-    新聞搜尋端點
+    新聞搜尋端點，支援與網頁搜尋相同的串流格式
     """
+    authorize_search_type(token_info, "news")
+    timeout = resolve_timeout(raw_request, request.timeout)
+    record_query("news", request)
     try:
-        results = await DDGSService.safe_ddgs_operation(
-            DDGSService.news_search,
-            request.query,
-            request.region,
-            request.safesearch,
-            request.time_limit,
-            request.max_results,
-        )
-
-        # 轉換結果格式
-        news_results = [
-            NewsResult(
-                date=result.get("date", ""),
-                title=result.get("title", ""),
-                body=result.get("body", ""),
-                url=result.get("url", ""),
-                image=result.get("image"),
-                source=result.get("source", ""),
+        stream_format = negotiate_stream_format(raw_request)
+        if stream_format:
+            return await run_with_deadline(
+                stream_search_response(
+                    "news",
+                    news_search_params(request),
+                    NewsResult,
+                    news_result_data,
+                    stream_format,
+                    deadline=time.monotonic() + timeout,
+                ),
+                raw_request,
+                None,
             )
-            for result in results
-        ]
-
-        return NewsSearchResponse(
-            success=True,
-            query=request.query,
-            results=news_results,
-            total_results=len(news_results),
-            timestamp=datetime.now().isoformat(),
-            region=request.region or "wt-wt",
+        return model_response(
+            await run_with_deadline(run_news_search(request), raw_request, timeout)
         )
 
+    except DeadlineExceededError as e:
+        logger.warning(f"News search timed out: {str(e)}")
+        raise HTTPException(status_code=504, detail=str(e))
+    except ClientDisconnectedError as e:
+        logger.info(f"News search abandoned: {str(e)}")
+        raise HTTPException(status_code=499, detail=str(e))
+    except ServiceUnavailableError as e:
+        logger.warning(f"News search rejected: {str(e)}")
+        raise HTTPException(status_code=503, detail=str(e), headers=e.headers())
     except Exception as e:
         logger.error(f"News search failed: {str(e)}")
         raise HTTPException(status_code=500, detail=f"News search failed: {str(e)}")
+
+
+@router.post("/search/batch", response_model=BatchSearchResponse)
+async def search_batch(
+    request: BatchSearchRequest,
+    raw_request: Request,
+    token_info: TokenInfo = Depends(verify_token),
+):
+    """
+    批次搜尋端點，並發執行多個搜尋，個別項目失敗不影響整個批次
+
+    每個項目各自套用截止時間(項目的timeout欄位，或X-Search-Timeout標頭)
+    """
+    for search_type in {item.type for item in request.items}:
+        authorize_search_type(token_info, search_type)
+    default_timeout = resolve_timeout(raw_request)
+    concurrency = min(
+        request.concurrency or settings.BATCH_CONCURRENCY, settings.BATCH_CONCURRENCY
+    )
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_item(
+        index: int,
+        item: Union[SearchRequest, ImageSearchRequest, NewsSearchRequest],
+    ) -> BatchSearchItemResult:
+        timeout = min(item.timeout or default_timeout, settings.SEARCH_TIMEOUT_MAX)
+        record_query(item.type, item)
+        async with semaphore:
+            try:
+                response = await asyncio.wait_for(
+                    SEARCH_RUNNERS[item.type](item), timeout
+                )
+                return BatchSearchItemResult(
+                    index=index,
+                    type=item.type,
+                    success=True,
+                    status_code=200,
+                    response=response,
+                )
+            except asyncio.TimeoutError:
+                logger.warning(f"Batch item {index} timed out after {timeout:g}s")
+                return BatchSearchItemResult(
+                    index=index,
+                    type=item.type,
+                    success=False,
+                    status_code=504,
+                    error=f"Search deadline of {timeout:g}s exceeded",
+                )
+            except ServiceUnavailableError as e:
+                logger.warning(f"Batch item {index} rejected: {str(e)}")
+                return BatchSearchItemResult(
+                    index=index,
+                    type=item.type,
+                    success=False,
+                    status_code=503,
+                    error=str(e),
+                )
+            except Exception as e:
+                logger.error(f"Batch item {index} failed: {str(e)}")
+                return BatchSearchItemResult(
+                    index=index,
+                    type=item.type,
+                    success=False,
+                    status_code=500,
+                    error=f"Search failed: {str(e)}",
+                )
+
+    try:
+        results = await run_with_deadline(
+            asyncio.gather(
+                *[run_item(index, item) for index, item in enumerate(request.items)]
+            ),
+            raw_request,
+            None,
+        )
+    except ClientDisconnectedError as e:
+        logger.info(f"Batch search abandoned: {str(e)}")
+        raise HTTPException(status_code=499, detail=str(e))
+    succeeded = sum(1 for result in results if result.success)
+
+    return model_response(
+        BatchSearchResponse(
+            success=succeeded == len(results),
+            results=results,
+            total_items=len(results),
+            succeeded=succeeded,
+            failed=len(results) - succeeded,
+            timestamp=datetime.now().isoformat(),
+        )
+    )
+
+
+@router.post("/search/page", response_model=PaginatedSearchResponse)
+async def search_page(
+    request: PaginatedSearchRequest,
+    raw_request: Request,
+    token_info: TokenInfo = Depends(verify_token),
+):
+    """
+    游標分頁搜尋端點
+
+    第一頁以search提供搜尋條件，回應中的next_cursor用於取得下一頁；後續分頁
+    從保存的分頁狀態繼續，只向上游要求尚未取得的分頁。
+    """
+    try:
+        if request.cursor is not None:
+            cursor = decode_cursor(request.cursor)
+            item = search_item_adapter.validate_python(cursor.search)
+        else:
+            item = request.search
+            cursor = Cursor(
+                None,
+                0,
+                item.model_dump(mode="json", exclude={"max_results", "timeout"}),
+            )
+    except (ValueError, ValidationError):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+    authorize_search_type(token_info, item.type)
+    build_params, result_model, convert = SEARCH_TYPE_HANDLERS[item.type]
+    params = build_params(item)
+    params.pop("max_results")
+    timeout = resolve_timeout(raw_request, request.timeout)
+    try:
+        results, next_cursor = await run_with_deadline(
+            search_paginator.page(cursor, item.type, params, request.page_size),
+            raw_request,
+            timeout,
+        )
+
+        with search_transform_seconds.time(search_type=item.type):
+            response = PaginatedSearchResponse(
+                success=True,
+                type=item.type,
+                query=item.query,
+                results=[
+                    result_model.model_validate(convert(result)) for result in results
+                ],
+                total_results=len(results),
+                offset=cursor.offset,
+                next_cursor=encode_cursor(next_cursor) if next_cursor else None,
+                timestamp=datetime.now().isoformat(),
+            )
+        return model_response(response)
+
+    except DeadlineExceededError as e:
+        logger.warning(f"Paginated search timed out: {str(e)}")
+        raise HTTPException(status_code=504, detail=str(e))
+    except ClientDisconnectedError as e:
+        logger.info(f"Paginated search abandoned: {str(e)}")
+        raise HTTPException(status_code=499, detail=str(e))
+    except ServiceUnavailableError as e:
+        logger.warning(f"Paginated search rejected: {str(e)}")
+        raise HTTPException(status_code=503, detail=str(e), headers=e.headers())
+    except Exception as e:
+        logger.error(f"Paginated search failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
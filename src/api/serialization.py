@@ -0,0 +1,40 @@
+"""
+回應序列化工具
+"""
+
+from typing import Any, Union
+
+from fastapi.responses import Response
+from pydantic import BaseModel
+from pydantic_core import to_json
+
+from src.core.config import settings
+from src.core.metrics import response_serialization_seconds
+
+
+class PydanticJSONResponse(Response):
+    """使用pydantic-core直接將模型序列化為JSON的回應"""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        with response_serialization_seconds.time(model=type(content).__name__):
+            return to_json(content)
+
+
+def model_response(model: BaseModel) -> Union[BaseModel, Response]:
+    """
+    將已驗證的回應模型轉為HTTP回應
+
+    模型在建立時已驗證過一次，因此直接序列化，略過FastAPI依response_model
+    再次驗證與編碼的流程。DEBUG模式下回傳模型本身，由FastAPI完整驗證。
+
+    Args:
+        model: 已驗證的回應模型
+
+    Returns:
+        JSON回應，或DEBUG模式下的模型本身
+    """
+    if settings.DEBUG:
+        return model
+    return PydanticJSONResponse(model)
@@ -2,14 +2,145 @@
 主要的FastAPI應用程式
 """
 
+import asyncio
+from contextlib import asynccontextmanager, suppress
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from datetime import datetime
-from typing import Dict, Any
+from typing import AsyncIterator, Dict, Any
 
 from src.core.config import settings
 from src.core.logging import logger
-from src.api.search import router as search_router
+from src.core import metrics
+from src.core.exceptions import ServiceUnavailableError
+from src.api.middleware import MetricsMiddleware, RateLimitMiddleware
+from src.api.search import router as search_router, run_search_item
+from src.services.archive import search_archive
+from src.services.async_backend import async_backend
+from src.services.auth_service import token_registry
+from src.services.cache import search_cache
+from src.services.concurrency import upstream_limiter
+from src.services.cursors import search_paginator
+from src.services.ddgs_service import circuit_breakers, ddgs_pool
+from src.services.executor import search_executor
+from src.services.hedging import search_hedger
+from src.services.rate_limit import ip_rate_limiter, token_rate_limiter
+from src.services.replay import upstream_tape
+from src.services.warmup import load_warmup_queries, query_log, search_warmer
+
+
+async def recycle_ddgs_pool() -> None:
+    """
+    定期更換過期的DDGS客戶端
+    """
+    loop = asyncio.get_event_loop()
+    while True:
+        await asyncio.sleep(settings.DDGS_POOL_RECYCLE_INTERVAL)
+        try:
+            recycled = await loop.run_in_executor(None, ddgs_pool.recycle_expired)
+            if recycled:
+                logger.info(f"Recycled {recycled} expired DDGS clients")
+        except Exception as e:
+            logger.error(f"DDGS client pool recycling failed: {str(e)}")
+
+
+async def refresh_archive() -> None:
+    """
+    定期掃描其他worker附加到磁碟封存的紀錄，讀取時不需掃描
+    """
+    loop = asyncio.get_event_loop()
+    while True:
+        await asyncio.sleep(search_archive.refresh_interval)
+        try:
+            await loop.run_in_executor(None, search_archive.refresh)
+        except Exception as e:
+            logger.error(f"Search archive refresh failed: {str(e)}")
+
+
+async def refresh_tokens() -> None:
+    """
+    定期檢查token清單檔案是否變更，驗證時不進行檔案I/O
+    """
+    loop = asyncio.get_event_loop()
+    while True:
+        await asyncio.sleep(token_registry.reload_interval)
+        try:
+            await loop.run_in_executor(None, token_registry.refresh)
+        except Exception as e:
+            logger.error(f"API token reload failed: {str(e)}")
+
+
+async def warm_cache() -> None:
+    """
+    以查詢清單與查詢日誌中的常用搜尋預熱快取，設定WARMUP_INTERVAL時定期重新執行
+    """
+    loop = asyncio.get_event_loop()
+    while True:
+        try:
+            entries = await loop.run_in_executor(
+                None,
+                load_warmup_queries,
+                settings.WARMUP_QUERIES_FILE,
+                settings.QUERY_LOG_PATH,
+                settings.WARMUP_MAX_QUERIES,
+            )
+            await search_warmer.run(entries, run_search_item)
+        except Exception as e:
+            search_warmer.fail(e)
+        if settings.WARMUP_INTERVAL <= 0:
+            return
+        await asyncio.sleep(settings.WARMUP_INTERVAL)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """
+    應用程式生命週期：啟動與關閉共用資源
+    """
+    loop = asyncio.get_event_loop()
+    await loop.run_in_executor(None, ddgs_pool.start)
+    if search_archive is not None:
+        # 建立既有封存區段的索引，只讀取紀錄標頭
+        await loop.run_in_executor(None, search_archive.refresh)
+    if upstream_tape.mode != "off":
+        # 重播模式下所有搜尋都不會連線上游，啟動時明確提示
+        logger.warning(
+            f"Upstream {upstream_tape.mode} mode enabled "
+            f"({upstream_tape.replay_path or upstream_tape.record_path})"
+        )
+    recycle_task = asyncio.create_task(recycle_ddgs_pool())
+    archive_task = None
+    if search_archive is not None:
+        archive_task = asyncio.create_task(refresh_archive())
+    token_task = None
+    if token_registry.path:
+        token_task = asyncio.create_task(refresh_tokens())
+    warmup_task = None
+    if settings.WARMUP_ENABLED and settings.CACHE_ENABLED:
+        warmup_task = asyncio.create_task(warm_cache())
+        if settings.WARMUP_BLOCKING:
+            # 等待第一次預熱完成再接受請求，逾時後預熱在背景繼續
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(
+                    search_warmer.wait_ready(), settings.WARMUP_STARTUP_TIMEOUT
+                )
+    try:
+        yield
+    finally:
+        for task in (recycle_task, archive_task, token_task, warmup_task):
+            if task is not None:
+                task.cancel()
+                with suppress(asyncio.CancelledError):
+                    await task
+        await loop.run_in_executor(None, ddgs_pool.close)
+        search_executor.shutdown()
+        await async_backend.close()
+        if search_archive is not None:
+            await loop.run_in_executor(None, search_archive.close)
+        if query_log is not None:
+            query_log.close()
+        upstream_tape.close()
 
 
 def create_app() -> FastAPI:
@@ -25,8 +156,12 @@ def create_app() -> FastAPI:
         version=settings.API_VERSION,
         docs_url="/docs",
         redoc_url="/redoc",
+        lifespan=lifespan,
     )
 
+    # 請求速率限制 middleware (在路由與認證之前執行，429回應仍經過CORS)
+    app.add_middleware(RateLimitMiddleware)
+
     # CORS middleware
     app.add_middleware(
         CORSMiddleware,
@@ -36,6 +171,9 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
 
+    # 請求指標 middleware
+    app.add_middleware(MetricsMiddleware)
+
     # 註冊路由
     app.include_router(search_router, tags=["search"])
 
@@ -52,6 +190,9 @@ def create_app() -> FastAPI:
                 "search": "/search",
                 "search_images": "/search/images",
                 "search_news": "/search/news",
+                "search_batch": "/search/batch",
+                "search_page": "/search/page",
+                "metrics": "/metrics",
                 "docs": "/docs",
             },
             "powered_by": "DDGS 9.4.3",
@@ -63,7 +204,65 @@ def create_app() -> FastAPI:
         """
         健康檢查端點
         """
-        return {"status": "healthy", "timestamp": datetime.now().isoformat()}
+        breakers = {
+            search_type: breaker.stats()
+            for search_type, breaker in circuit_breakers.items()
+        }
+        degraded = any(stats["state"] == "open" for stats in breakers.values())
+        warming = (
+            settings.WARMUP_ENABLED
+            and settings.CACHE_ENABLED
+            and not search_warmer.ready
+        )
+        if warming:
+            status = "warming"
+        else:
+            status = "degraded" if degraded else "healthy"
+        body = {
+            "status": status,
+            "timestamp": datetime.now().isoformat(),
+            "backend": settings.SEARCH_BACKEND,
+            "cache": await search_cache.astats(),
+            "archive": search_archive.stats() if search_archive is not None else None,
+            "ddgs_pool": ddgs_pool.stats(),
+            "upstream_tape": upstream_tape.stats(),
+            "executor": search_executor.stats(),
+            "upstream_concurrency": upstream_limiter.stats(),
+            "pagination": search_paginator.stats(),
+            "auth": token_registry.stats(),
+            "rate_limit": {
+                "enabled": settings.RATE_LIMIT_ENABLED,
+                "token": await token_rate_limiter.astats(),
+                "ip": await ip_rate_limiter.astats(),
+            },
+            "circuit_breakers": breakers,
+            "hedging": {
+                "enabled": settings.HEDGE_ENABLED,
+                "backend": settings.HEDGE_BACKEND,
+                **search_hedger.stats(),
+            },
+            "warmup": {"enabled": settings.WARMUP_ENABLED, **search_warmer.stats()},
+        }
+        if warming and settings.WARMUP_HEALTH_GATE:
+            # 讓負載平衡器在預熱完成前不轉送流量
+            return JSONResponse(status_code=503, content=body)
+        return body
+
+    # Prometheus指標端點
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics_endpoint():
+        """
+        以Prometheus文字格式輸出應用程式指標
+        """
+        cache_stats = await search_cache.astats()
+        metrics.cache_entries.set(cache_stats["entries"])
+        metrics.cache_bytes.set(cache_stats["bytes"])
+        metrics.executor_pending.set(search_executor.pending)
+        metrics.ddgs_pool_idle.set(ddgs_pool.stats()["idle"])
+        return PlainTextResponse(
+            metrics.registry.render(),
+            media_type="text/plain; version=0.0.4; charset=utf-8",
+        )
 
     # 例外處理器
     @app.exception_handler(HTTPException)
@@ -79,6 +278,24 @@ def create_app() -> FastAPI:
                 "status_code": exc.status_code,
                 "timestamp": datetime.now().isoformat(),
             },
+            headers=getattr(exc, "headers", None),
+        )
+
+    @app.exception_handler(ServiceUnavailableError)
+    async def service_unavailable_handler(request, exc):
+        from fastapi.responses import JSONResponse
+
+        logger.warning(f"Request rejected: {str(exc)}")
+        return JSONResponse(
+            status_code=503,
+            content={
+                "success": False,
+                "error": "Service Unavailable",
+                "message": str(exc),
+                "status_code": 503,
+                "timestamp": datetime.now().isoformat(),
+            },
+            headers=exc.headers(),
         )
 
     @app.exception_handler(Exception)
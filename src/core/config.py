@@ -3,6 +3,7 @@
 """
 
 import os
+import tempfile
 from typing import Optional
 from dotenv import load_dotenv
 
@@ -24,9 +25,34 @@ class Settings:
     HOST: str = os.getenv("HOST", "0.0.0.0")
     PORT: int = int(os.getenv("PORT", "9410"))
     DEBUG: bool = os.getenv("DEBUG", "False").lower() == "true"
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "info").lower()
+    ACCESS_LOG: bool = os.getenv("ACCESS_LOG", "True").lower() == "true"
+
+    # 生產環境啟動設定 (main.py)，worker程序數為0時每個CPU核心一個
+    WORKERS: int = int(os.getenv("WORKERS", "0"))
+    # 事件迴圈與HTTP解析器，auto時已安裝則使用uvloop與httptools
+    UVICORN_LOOP: str = os.getenv("UVICORN_LOOP", "auto").lower()
+    UVICORN_HTTP: str = os.getenv("UVICORN_HTTP", "auto").lower()
+    # 閒置keep-alive連線保留秒數，應大於前端負載平衡器的閒置逾時
+    KEEPALIVE_TIMEOUT: int = int(os.getenv("KEEPALIVE_TIMEOUT", "75"))
+    BACKLOG: int = int(os.getenv("BACKLOG", "2048"))
+    # 每個worker處理MAX_REQUESTS(加上0到MAX_REQUESTS_JITTER)個請求後重啟，0表示不重啟
+    MAX_REQUESTS: int = int(os.getenv("MAX_REQUESTS", "0"))
+    MAX_REQUESTS_JITTER: int = int(os.getenv("MAX_REQUESTS_JITTER", "0"))
+    # 關閉或重啟worker時等待進行中請求完成的秒數，0表示不限制
+    GRACEFUL_TIMEOUT: float = float(os.getenv("GRACEFUL_TIMEOUT", "30"))
+    SSL_CERTFILE: Optional[str] = os.getenv("SSL_CERTFILE") or None
+    SSL_KEYFILE: Optional[str] = os.getenv("SSL_KEYFILE") or None
 
     # 認證設定
     API_TOKEN: Optional[str] = os.getenv("API_TOKEN")
+    # 多個token：以逗號分隔的API_TOKENS，或JSON格式的token清單檔案(可設定權限與限速)
+    API_TOKENS: Optional[str] = os.getenv("API_TOKENS") or None
+    API_TOKENS_FILE: Optional[str] = os.getenv("API_TOKENS_FILE") or None
+    # 檢查token清單檔案是否變更的間隔秒數
+    API_TOKENS_RELOAD_INTERVAL: float = float(
+        os.getenv("API_TOKENS_RELOAD_INTERVAL", "5")
+    )
 
     # CORS設定
     ALLOWED_ORIGINS: list = ["*"]  # 在生產環境中應該限制特定域名
@@ -37,5 +63,199 @@ class Settings:
     MAX_RESULTS_LIMIT: int = 100
     DEFAULT_MAX_RESULTS: int = 10
 
+    # 查詢正規化 (NFKC、合併空白、去除結尾標點、大小寫摺疊與參數預設值)
+    QUERY_NORMALIZATION_ENABLED: bool = (
+        os.getenv("QUERY_NORMALIZATION_ENABLED", "True").lower() == "true"
+    )
+    QUERY_CASEFOLD: bool = os.getenv("QUERY_CASEFOLD", "True").lower() == "true"
+    QUERY_STRIP_PUNCTUATION: bool = (
+        os.getenv("QUERY_STRIP_PUNCTUATION", "True").lower() == "true"
+    )
+
+    # 搜尋截止時間設定 (秒)，客戶端可透過X-Search-Timeout標頭或timeout欄位縮短
+    SEARCH_TIMEOUT: float = float(os.getenv("SEARCH_TIMEOUT", "20"))
+    SEARCH_TIMEOUT_MAX: float = float(os.getenv("SEARCH_TIMEOUT_MAX", "60"))
+
+    # 請求速率限制 (token bucket，依API token與客戶端IP分別計算，rate為每秒請求數)
+    RATE_LIMIT_ENABLED: bool = (
+        os.getenv("RATE_LIMIT_ENABLED", "False").lower() == "true"
+    )
+    RATE_LIMIT_TOKEN_RATE: float = float(os.getenv("RATE_LIMIT_TOKEN_RATE", "10"))
+    RATE_LIMIT_TOKEN_BURST: int = int(os.getenv("RATE_LIMIT_TOKEN_BURST", "20"))
+    RATE_LIMIT_IP_RATE: float = float(os.getenv("RATE_LIMIT_IP_RATE", "5"))
+    RATE_LIMIT_IP_BURST: int = int(os.getenv("RATE_LIMIT_IP_BURST", "10"))
+    # 位於反向代理之後時以X-Forwarded-For的第一個位址作為客戶端IP
+    RATE_LIMIT_TRUST_FORWARDED: bool = (
+        os.getenv("RATE_LIMIT_TRUST_FORWARDED", "False").lower() == "true"
+    )
+    # memory: 每個worker各自計算；sqlite: 同一主機的worker共用狀態
+    RATE_LIMIT_BACKEND: str = os.getenv("RATE_LIMIT_BACKEND", "memory").lower()
+    RATE_LIMIT_SQLITE_PATH: str = os.getenv(
+        "RATE_LIMIT_SQLITE_PATH",
+        os.path.join(
+            "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(),
+            "python-search-api-ratelimit.sqlite3",
+        ),
+    )
+    RATE_LIMIT_MAX_KEYS: int = int(os.getenv("RATE_LIMIT_MAX_KEYS", "10000"))
+
+    # 搜尋結果快取設定
+    CACHE_ENABLED: bool = os.getenv("CACHE_ENABLED", "True").lower() == "true"
+    CACHE_MAX_ENTRIES: int = int(os.getenv("CACHE_MAX_ENTRIES", "2048"))
+    CACHE_MAX_BYTES: int = int(os.getenv("CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+    CACHE_TTL_TEXT: float = float(os.getenv("CACHE_TTL_TEXT", "600"))
+    CACHE_TTL_IMAGES: float = float(os.getenv("CACHE_TTL_IMAGES", "1800"))
+    CACHE_TTL_NEWS: float = float(os.getenv("CACHE_TTL_NEWS", "120"))
+    # 超過TTL後仍可回傳舊結果並在背景更新的時間(秒)
+    CACHE_STALE_TTL: float = float(os.getenv("CACHE_STALE_TTL", "300"))
+    # TTL隨機縮短的最大比例，避免熱門項目同時過期
+    CACHE_TTL_JITTER: float = float(os.getenv("CACHE_TTL_JITTER", "0.1"))
+    # memory: 每個worker各自的快取；sqlite: 同一主機的worker共用一個快取檔案
+    CACHE_BACKEND: str = os.getenv("CACHE_BACKEND", "memory").lower()
+    CACHE_SQLITE_PATH: str = os.getenv(
+        "CACHE_SQLITE_PATH",
+        os.path.join(
+            "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(),
+            "python-search-api-cache.sqlite3",
+        ),
+    )
+
+    # 磁碟搜尋結果封存 (第二層快取，跨重新啟動保留)
+    ARCHIVE_ENABLED: bool = os.getenv("ARCHIVE_ENABLED", "False").lower() == "true"
+    ARCHIVE_DIR: str = os.getenv(
+        "ARCHIVE_DIR",
+        os.path.join(tempfile.gettempdir(), "python-search-api-archive"),
+    )
+    ARCHIVE_SEGMENT_BYTES: int = int(
+        os.getenv("ARCHIVE_SEGMENT_BYTES", str(64 * 1024 * 1024))
+    )
+    ARCHIVE_MAX_BYTES: int = int(
+        os.getenv("ARCHIVE_MAX_BYTES", str(1024 * 1024 * 1024))
+    )
+    ARCHIVE_WRITE_QUEUE: int = int(os.getenv("ARCHIVE_WRITE_QUEUE", "1024"))
+    # 背景掃描其他worker新寫入紀錄的間隔(秒)
+    ARCHIVE_REFRESH_INTERVAL: float = float(os.getenv("ARCHIVE_REFRESH_INTERVAL", "1"))
+
+    # 快取預熱設定 (查詢來源為查詢清單檔案與查詢日誌中最常見的搜尋)
+    WARMUP_ENABLED: bool = os.getenv("WARMUP_ENABLED", "False").lower() == "true"
+    WARMUP_QUERIES_FILE: Optional[str] = os.getenv("WARMUP_QUERIES_FILE") or None
+    QUERY_LOG_PATH: Optional[str] = os.getenv("QUERY_LOG_PATH") or None
+    WARMUP_MAX_QUERIES: int = int(os.getenv("WARMUP_MAX_QUERIES", "100"))
+    WARMUP_RATE: float = float(os.getenv("WARMUP_RATE", "2"))
+    WARMUP_CONCURRENCY: int = int(os.getenv("WARMUP_CONCURRENCY", "2"))
+    # 開始接受請求前等待預熱完成，最多WARMUP_STARTUP_TIMEOUT秒
+    WARMUP_BLOCKING: bool = os.getenv("WARMUP_BLOCKING", "False").lower() == "true"
+    WARMUP_STARTUP_TIMEOUT: float = float(os.getenv("WARMUP_STARTUP_TIMEOUT", "60"))
+    # 定期重新預熱的間隔秒數，0表示只在啟動時執行
+    WARMUP_INTERVAL: float = float(os.getenv("WARMUP_INTERVAL", "0"))
+    # 第一次預熱完成前/health回傳503
+    WARMUP_HEALTH_GATE: bool = (
+        os.getenv("WARMUP_HEALTH_GATE", "False").lower() == "true"
+    )
+
+    # 上游錄製與重播 (以錄製的上游回應進行可重現的負載測試)
+    UPSTREAM_RECORD_PATH: Optional[str] = os.getenv("UPSTREAM_RECORD_PATH") or None
+    # 設定後不呼叫上游，改由錄製檔回應 (優先於錄製)
+    UPSTREAM_REPLAY_PATH: Optional[str] = os.getenv("UPSTREAM_REPLAY_PATH") or None
+    # 重播時等待錄製耗時乘以此倍數，0表示立即回應
+    UPSTREAM_REPLAY_LATENCY_SCALE: float = float(
+        os.getenv("UPSTREAM_REPLAY_LATENCY_SCALE", "1")
+    )
+
+    # 批次搜尋設定
+    BATCH_CONCURRENCY: int = int(os.getenv("BATCH_CONCURRENCY", "8"))
+
+    # 依正規化URL去除重複結果並移除追蹤參數
+    RESULT_DEDUP_ENABLED: bool = (
+        os.getenv("RESULT_DEDUP_ENABLED", "True").lower() == "true"
+    )
+
+    # 串流搜尋時每次向上游要求的結果數
+    STREAM_PAGE_SIZE: int = int(os.getenv("STREAM_PAGE_SIZE", "10"))
+
+    # 游標分頁設定 (分頁狀態保存在各worker的記憶體中)
+    PAGINATION_SESSION_TTL: float = float(os.getenv("PAGINATION_SESSION_TTL", "600"))
+    PAGINATION_MAX_SESSIONS: int = int(os.getenv("PAGINATION_MAX_SESSIONS", "1000"))
+    PAGINATION_MAX_DEPTH: int = int(os.getenv("PAGINATION_MAX_DEPTH", "500"))
+
+    # 搜尋後端: "thread" (ddgs函式庫 + 執行緒池) 或 "async" (httpx原生非同步)
+    SEARCH_BACKEND: str = os.getenv("SEARCH_BACKEND", "thread").lower()
+    ASYNC_BACKEND_TIMEOUT: float = float(os.getenv("ASYNC_BACKEND_TIMEOUT", "10"))
+    ASYNC_BACKEND_MAX_CONNECTIONS: int = int(
+        os.getenv("ASYNC_BACKEND_MAX_CONNECTIONS", "100")
+    )
+
+    # 搜尋執行緒池設定
+    SEARCH_EXECUTOR_WORKERS: int = int(os.getenv("SEARCH_EXECUTOR_WORKERS", "16"))
+    SEARCH_EXECUTOR_QUEUE_LIMIT: int = int(
+        os.getenv("SEARCH_EXECUTOR_QUEUE_LIMIT", "64")
+    )
+    SEARCH_RETRY_AFTER: float = float(os.getenv("SEARCH_RETRY_AFTER", "2"))
+
+    # DDGS客戶端連線池設定 (預設與執行緒數相同)
+    DDGS_POOL_SIZE: int = int(os.getenv("DDGS_POOL_SIZE", str(SEARCH_EXECUTOR_WORKERS)))
+    DDGS_POOL_MAX_AGE: float = float(os.getenv("DDGS_POOL_MAX_AGE", "900"))
+    DDGS_POOL_MAX_FAILURES: int = int(os.getenv("DDGS_POOL_MAX_FAILURES", "3"))
+    DDGS_POOL_ACQUIRE_TIMEOUT: float = float(
+        os.getenv("DDGS_POOL_ACQUIRE_TIMEOUT", "10")
+    )
+    DDGS_POOL_RECYCLE_INTERVAL: float = float(
+        os.getenv("DDGS_POOL_RECYCLE_INTERVAL", "60")
+    )
+
+    # 上游自適應並發限制 (AIMD，上限預設與執行緒數相同)
+    # 初始值刻意低於執行緒數，冷啟動時先以少量並發連線上游，延遲穩定後再逐步增加；
+    # 執行緒後端的延遲不含執行緒池佇列等待，上限超過執行緒數時多出的名額只會排隊
+    ADAPTIVE_CONCURRENCY_ENABLED: bool = (
+        os.getenv("ADAPTIVE_CONCURRENCY_ENABLED", "True").lower() == "true"
+    )
+    ADAPTIVE_CONCURRENCY_INITIAL: int = int(
+        os.getenv("ADAPTIVE_CONCURRENCY_INITIAL", "4")
+    )
+    ADAPTIVE_CONCURRENCY_MIN: int = int(os.getenv("ADAPTIVE_CONCURRENCY_MIN", "1"))
+    ADAPTIVE_CONCURRENCY_MAX: int = int(
+        os.getenv("ADAPTIVE_CONCURRENCY_MAX", str(SEARCH_EXECUTOR_WORKERS))
+    )
+    ADAPTIVE_CONCURRENCY_LATENCY_TOLERANCE: float = float(
+        os.getenv("ADAPTIVE_CONCURRENCY_LATENCY_TOLERANCE", "2")
+    )
+    ADAPTIVE_CONCURRENCY_BACKOFF: float = float(
+        os.getenv("ADAPTIVE_CONCURRENCY_BACKOFF", "0.5")
+    )
+    ADAPTIVE_CONCURRENCY_MAX_WAIT: float = float(
+        os.getenv("ADAPTIVE_CONCURRENCY_MAX_WAIT", "10")
+    )
+
+    # 上游斷路器設定 (每個搜尋類型各一個)
+    CIRCUIT_BREAKER_ENABLED: bool = (
+        os.getenv("CIRCUIT_BREAKER_ENABLED", "True").lower() == "true"
+    )
+    CIRCUIT_BREAKER_WINDOW: float = float(os.getenv("CIRCUIT_BREAKER_WINDOW", "60"))
+    CIRCUIT_BREAKER_MIN_CALLS: int = int(os.getenv("CIRCUIT_BREAKER_MIN_CALLS", "20"))
+    CIRCUIT_BREAKER_FAILURE_RATE: float = float(
+        os.getenv("CIRCUIT_BREAKER_FAILURE_RATE", "0.5")
+    )
+    CIRCUIT_BREAKER_SLOW_CALL_SECONDS: float = float(
+        os.getenv("CIRCUIT_BREAKER_SLOW_CALL_SECONDS", "10")
+    )
+    CIRCUIT_BREAKER_OPEN_SECONDS: float = float(
+        os.getenv("CIRCUIT_BREAKER_OPEN_SECONDS", "30")
+    )
+    CIRCUIT_BREAKER_HALF_OPEN_CALLS: int = int(
+        os.getenv("CIRCUIT_BREAKER_HALF_OPEN_CALLS", "3")
+    )
+
+    # 上游請求避險設定 (主要請求逾時未回應時以替代設定再送出一次)
+    HEDGE_ENABLED: bool = os.getenv("HEDGE_ENABLED", "False").lower() == "true"
+    # 避險請求使用的後端: async為原生非同步後端，其他值作為DDGS的backend參數
+    HEDGE_BACKEND: str = os.getenv("HEDGE_BACKEND", "async").lower()
+    # 避險請求使用的地區，空值表示與原請求相同
+    HEDGE_REGION: Optional[str] = os.getenv("HEDGE_REGION") or None
+    HEDGE_PERCENTILE: float = float(os.getenv("HEDGE_PERCENTILE", "0.95"))
+    HEDGE_MIN_DELAY: float = float(os.getenv("HEDGE_MIN_DELAY", "0.2"))
+    HEDGE_MAX_DELAY: float = float(os.getenv("HEDGE_MAX_DELAY", "5"))
+    HEDGE_INITIAL_DELAY: float = float(os.getenv("HEDGE_INITIAL_DELAY", "1"))
+    HEDGE_MIN_SAMPLES: int = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+
 
 settings = Settings()
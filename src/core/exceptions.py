@@ -0,0 +1,32 @@
+"""
+應用程式例外定義
+"""
+
+from typing import Optional
+
+
+class ServiceUnavailableError(Exception):
+    """服務暫時無法處理請求，應回應503並附帶Retry-After"""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+    def headers(self) -> dict:
+        """
+        產生回應標頭
+
+        Returns:
+            包含Retry-After的標頭字典
+        """
+        if self.retry_after is None:
+            return {}
+        return {"Retry-After": str(max(1, int(round(self.retry_after))))}
+
+
+class DeadlineExceededError(Exception):
+    """搜尋超過請求的截止時間，應回應504"""
+
+
+class ClientDisconnectedError(Exception):
+    """客戶端在搜尋完成前中斷連線"""
@@ -0,0 +1,412 @@
+"""
+Prometheus格式的應用程式指標
+"""
+
+import math
+from abc import ABC, abstractmethod
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+# 延遲指標的預設分桶(秒)
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+
+# 結果數量分桶
+RESULT_COUNT_BUCKETS = (0, 1, 5, 10, 20, 30, 50, 75, 100)
+
+
+def _format_value(value: float) -> str:
+    """格式化指標數值"""
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    """跳脫標籤值中的特殊字元"""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Metric(ABC):
+    """指標基底類別"""
+
+    metric_type = "untyped"
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        """依標籤名稱順序產生標籤值tuple"""
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels_text(
+        self, key: Tuple[str, ...], extra: Tuple[Tuple[str, str], ...] = ()
+    ) -> str:
+        """產生標籤文字，例如 {route="/search",method="POST"}"""
+        pairs = list(zip(self.labelnames, key)) + list(extra)
+        if not pairs:
+            return ""
+        inner = ",".join(f'{name}="{_escape(value)}"' for name, value in pairs)
+        return "{" + inner + "}"
+
+    @abstractmethod
+    def _samples(self) -> List[str]:
+        """產生此指標的樣本行"""
+
+    def render(self) -> str:
+        """
+        以Prometheus文字格式輸出
+
+        Returns:
+            指標文字
+        """
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.metric_type}",
+        ]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """只會增加的計數器"""
+
+    metric_type = "counter"
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        """增加計數"""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        """取得目前計數"""
+        return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [
+            f"{self.name}{self._labels_text(key)} {_format_value(value)}"
+            for key, value in items
+        ]
+
+
+class Gauge(_Metric):
+    """可增可減的量測值"""
+
+    metric_type = "gauge"
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels: str) -> None:
+        """設定數值"""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        """增加數值"""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        """減少數值"""
+        self.inc(-amount, **labels)
+
+    def value(self, **labels: str) -> float:
+        """取得目前數值"""
+        return self._values.get(self._key(labels), 0.0)
+
+    @contextmanager
+    def track_inprogress(self, **labels: str) -> Iterator[None]:
+        """在區塊執行期間將數值加一"""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [
+            f"{self.name}{self._labels_text(key)} {_format_value(value)}"
+            for key, value in items
+        ]
+
+
+class Histogram(_Metric):
+    """分桶統計的觀測值分佈"""
+
+    metric_type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._counts: Dict[Tuple[str, ...], List[int]] = {}
+        self._sums: Dict[Tuple[str, ...], float] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        """記錄一次觀測值"""
+        key = self._key(labels)
+        with self._lock:
+            counts = self._counts.get(key)
+            if counts is None:
+                counts = self._counts[key] = [0] * len(self.buckets)
+                self._sums[key] = 0.0
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            self._sums[key] += value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """記錄區塊執行時間(秒)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels: str) -> int:
+        """取得觀測次數"""
+        return sum(self._counts.get(self._key(labels), []))
+
+    def sum(self, **labels: str) -> float:
+        """取得觀測值總和"""
+        return self._sums.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, list(counts)) for key, counts in self._counts.items())
+            sums = dict(self._sums)
+        lines = []
+        for key, counts in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                labels = self._labels_text(key, (("le", _format_value(bound)),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(
+                f"{self.name}_sum{self._labels_text(key)} {_format_value(sums[key])}"
+            )
+            lines.append(f"{self.name}_count{self._labels_text(key)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """指標註冊表"""
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        """註冊指標，名稱不可重複"""
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric already registered: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> Counter:
+        """建立並註冊計數器"""
+        return self.register(Counter(name, documentation, labelnames))  # type: ignore
+
+    def gauge(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> Gauge:
+        """建立並註冊量測值"""
+        return self.register(Gauge(name, documentation, labelnames))  # type: ignore
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        """建立並註冊直方圖"""
+        return self.register(  # type: ignore
+            Histogram(name, documentation, labelnames, buckets)
+        )
+
+    def render(self) -> str:
+        """
+        以Prometheus文字格式輸出所有指標
+
+        Returns:
+            指標文字
+        """
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+
+# 建立全域指標註冊表
+registry = MetricsRegistry()
+
+# HTTP層
+http_requests_total = registry.counter(
+    "http_requests_total",
+    "HTTP requests by route, method and status",
+    ("route", "method", "status"),
+)
+http_request_duration_seconds = registry.histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route",
+    ("route", "method"),
+)
+http_requests_in_flight = registry.gauge(
+    "http_requests_in_flight", "HTTP requests currently being served"
+)
+response_serialization_seconds = registry.histogram(
+    "response_serialization_seconds",
+    "Time spent serializing response bodies to JSON",
+    ("model",),
+)
+rate_limited_requests_total = registry.counter(
+    "rate_limited_requests_total",
+    "Requests rejected with 429 by the token bucket limiter",
+    ("scope",),
+)
+
+# 搜尋層
+search_requests_total = registry.counter(
+    "search_requests_total",
+    "Search calls by type and cache outcome (hit, stale, archive, miss, disabled)",
+    ("search_type", "cache"),
+)
+search_duration_seconds = registry.histogram(
+    "search_duration_seconds",
+    "End-to-end DDGSService search latency by type",
+    ("search_type",),
+)
+search_errors_total = registry.counter(
+    "search_errors_total",
+    "Search failures by type and exception class",
+    ("search_type", "exception"),
+)
+search_result_count = registry.histogram(
+    "search_result_count",
+    "Number of results returned per search",
+    ("search_type",),
+    buckets=RESULT_COUNT_BUCKETS,
+)
+search_transform_seconds = registry.histogram(
+    "search_transform_seconds",
+    "Time spent converting DDGS results into response models",
+    ("search_type",),
+)
+search_duplicates_removed_total = registry.counter(
+    "search_duplicates_removed_total",
+    "Duplicate results dropped after URL canonicalization",
+    ("search_type",),
+)
+search_normalized_total = registry.counter(
+    "search_query_normalized_total",
+    "Searches whose cache key was changed by query normalization, by outcome "
+    "(cache_hit, coalesced, upstream)",
+    ("search_type", "outcome"),
+)
+
+# 上游與執行緒池
+upstream_duration_seconds = registry.histogram(
+    "ddgs_upstream_duration_seconds",
+    "Time spent in upstream DDGS calls, excluding executor queue wait",
+    ("search_type", "backend"),
+)
+upstream_in_flight = registry.gauge(
+    "ddgs_upstream_in_flight",
+    "Upstream DDGS calls currently in progress",
+    ("search_type",),
+)
+executor_queue_wait_seconds = registry.histogram(
+    "search_executor_queue_wait_seconds",
+    "Time blocking DDGS work waits for an executor thread",
+)
+executor_pending = registry.gauge(
+    "search_executor_pending", "Searches running or queued on the executor"
+)
+executor_rejected_total = registry.counter(
+    "search_executor_rejected_total", "Searches rejected because the queue was full"
+)
+
+# 快取與連線池(於抓取時更新)
+cache_entries = registry.gauge("search_cache_entries", "Cached search results")
+cache_bytes = registry.gauge(
+    "search_cache_bytes", "Approximate memory used by cached search results"
+)
+ddgs_pool_idle = registry.gauge("ddgs_pool_idle_clients", "Idle pooled DDGS clients")
+
+# 斷路器
+circuit_breaker_state = registry.gauge(
+    "circuit_breaker_state",
+    "Upstream circuit breaker state (0 closed, 1 half-open, 2 open)",
+    ("search_type",),
+)
+circuit_breaker_rejections_total = registry.counter(
+    "circuit_breaker_rejections_total",
+    "Searches failed fast because the circuit breaker was open",
+    ("search_type",),
+)
+
+# 上游請求避險
+hedged_requests_total = registry.counter(
+    "search_hedged_requests_total",
+    "Upstream fetches by hedging outcome (not_hedged, primary_won, hedge_won, failed)",
+    ("search_type", "outcome"),
+)
+
+# 上游自適應並發限制
+upstream_concurrency_limit = registry.gauge(
+    "ddgs_upstream_concurrency_limit", "Adaptive upstream concurrency limit"
+)
+upstream_concurrency_in_flight = registry.gauge(
+    "ddgs_upstream_concurrency_in_flight",
+    "Upstream calls holding a concurrency limiter slot",
+)
+upstream_concurrency_rejected_total = registry.counter(
+    "ddgs_upstream_concurrency_rejected_total",
+    "Upstream calls rejected after waiting too long for a concurrency slot",
+)
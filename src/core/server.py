@@ -0,0 +1,147 @@
+"""
+生產環境啟動器：依設定以多個worker程序執行uvicorn
+"""
+
+import importlib.util
+import os
+import random
+import sys
+from typing import Any, Dict
+
+import uvicorn
+from uvicorn.main import STARTUP_FAILURE
+from uvicorn.supervisors import ChangeReload, Multiprocess
+
+from src.core.config import settings
+from src.core.logging import logger
+
+# uvicorn載入的應用程式 (多個worker時必須以匯入字串指定)
+APP_IMPORT_STRING = "src.app:app"
+
+# auto時依序嘗試的事件迴圈與HTTP解析器實作，第一個已安裝的優先
+LOOP_IMPLEMENTATIONS = ("uvloop", "asyncio")
+HTTP_IMPLEMENTATIONS = ("httptools", "h11")
+
+
+def resolve_implementation(name: str, candidates: tuple) -> str:
+    """
+    解析auto設定為第一個已安裝的實作
+
+    Args:
+        name: 設定值 (auto或實作名稱)
+        candidates: 依偏好排序的實作，最後一個為內建實作
+
+    Returns:
+        實作名稱
+    """
+    if name != "auto":
+        return name
+    for candidate in candidates[:-1]:
+        if importlib.util.find_spec(candidate) is not None:
+            return candidate
+    return candidates[-1]
+
+
+def worker_count() -> int:
+    """
+    取得worker程序數，開發模式(自動重新載入)固定為一個
+
+    Returns:
+        WORKERS設定值，0表示CPU核心數
+    """
+    if settings.DEBUG:
+        return 1
+    if settings.WORKERS > 0:
+        return settings.WORKERS
+    return os.cpu_count() or 1
+
+
+class RecyclingConfig(uvicorn.Config):
+    """
+    每個worker的請求數上限加上各自的隨機抖動
+
+    設定在每個worker程序內載入一次，抖動因此在各程序獨立抽取，避免所有worker
+    在同一時間重啟。
+    """
+
+    def __init__(self, *args: Any, max_requests_jitter: int = 0, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.max_requests_jitter = max_requests_jitter
+
+    def load(self) -> None:
+        if self.limit_max_requests and self.max_requests_jitter > 0:
+            self.limit_max_requests += random.randint(0, self.max_requests_jitter)
+        super().load()
+
+
+def server_options() -> Dict[str, Any]:
+    """
+    依設定建立uvicorn的參數
+
+    Returns:
+        uvicorn.Config的關鍵字參數
+    """
+    return {
+        "host": settings.HOST,
+        "port": settings.PORT,
+        "workers": worker_count(),
+        "reload": settings.DEBUG,
+        "loop": resolve_implementation(settings.UVICORN_LOOP, LOOP_IMPLEMENTATIONS),
+        "http": resolve_implementation(settings.UVICORN_HTTP, HTTP_IMPLEMENTATIONS),
+        # API沒有WebSocket路由，不載入WebSocket協定實作
+        "ws": "none",
+        "backlog": settings.BACKLOG,
+        "timeout_keep_alive": settings.KEEPALIVE_TIMEOUT,
+        "timeout_graceful_shutdown": settings.GRACEFUL_TIMEOUT or None,
+        "limit_max_requests": settings.MAX_REQUESTS or None,
+        "max_requests_jitter": settings.MAX_REQUESTS_JITTER,
+        "log_level": settings.LOG_LEVEL,
+        "access_log": settings.ACCESS_LOG,
+        "ssl_certfile": settings.SSL_CERTFILE,
+        "ssl_keyfile": settings.SSL_KEYFILE,
+    }
+
+
+def run() -> None:
+    """
+    啟動服務
+
+    多個worker或設定了請求數上限時由uvicorn的主程序管理worker (只有一個worker也是)：
+    結束的worker (包含達到請求數上限者) 會被重新啟動，收到SIGHUP時逐一重啟所有
+    worker，SIGTERM時等待進行中的請求完成後關閉。開發模式的自動重新載入不會重新
+    啟動結束的worker，因此忽略請求數上限。
+    """
+    options = server_options()
+    config = RecyclingConfig(APP_IMPORT_STRING, **options)
+    if config.should_reload and config.limit_max_requests:
+        logger.warning(
+            "MAX_REQUESTS is ignored with DEBUG=true: "
+            "the reloader does not restart a worker that exits"
+        )
+        config.limit_max_requests = None
+        options["limit_max_requests"] = None
+    # 達到請求數上限的worker會結束，需要主程序重新啟動
+    supervised = not config.should_reload and (
+        config.workers > 1 or bool(config.limit_max_requests)
+    )
+    server = uvicorn.Server(config=config)
+    logger.info(
+        f"Starting {options['workers']} worker(s) on {options['host']}:"
+        f"{options['port']} (loop={options['loop']}, http={options['http']}, "
+        f"max_requests={options['limit_max_requests']})"
+    )
+
+    try:
+        if config.should_reload:
+            sock = config.bind_socket()
+            ChangeReload(config, target=server.run, sockets=[sock]).run()
+        elif supervised:
+            sock = config.bind_socket()
+            Multiprocess(config, target=server.run, sockets=[sock]).run()
+        else:
+            server.run()
+    except KeyboardInterrupt:
+        pass
+
+    if not server.started and not config.should_reload and not supervised:
+        sys.exit(STARTUP_FAILURE)
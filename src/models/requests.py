@@ -2,8 +2,8 @@
 API請求模型
 """
 
-from pydantic import BaseModel, Field
-from typing import Optional
+from pydantic import BaseModel, Field, model_validator
+from typing import Annotated, List, Literal, Optional, Union
 
 
 class SearchRequest(BaseModel):
@@ -22,6 +22,11 @@ class SearchRequest(BaseModel):
     max_results: Optional[int] = Field(
         10, description="Maximum number of results", ge=1, le=100
     )
+    timeout: Optional[float] = Field(
+        None,
+        description="Search deadline in seconds (overrides X-Search-Timeout)",
+        gt=0,
+    )
 
 
 class ImageSearchRequest(BaseModel):
@@ -52,6 +57,11 @@ class ImageSearchRequest(BaseModel):
     max_results: Optional[int] = Field(
         10, description="Maximum number of results", ge=1, le=100
     )
+    timeout: Optional[float] = Field(
+        None,
+        description="Search deadline in seconds (overrides X-Search-Timeout)",
+        gt=0,
+    )
 
 
 class NewsSearchRequest(BaseModel):
@@ -66,3 +76,75 @@ class NewsSearchRequest(BaseModel):
     max_results: Optional[int] = Field(
         10, description="Maximum number of results", ge=1, le=100
     )
+    timeout: Optional[float] = Field(
+        None,
+        description="Search deadline in seconds (overrides X-Search-Timeout)",
+        gt=0,
+    )
+
+
+class BatchTextSearchItem(SearchRequest):
+    """批次中的網頁搜尋項目"""
+
+    type: Literal["text"] = Field(..., description="Search type")
+
+
+class BatchImageSearchItem(ImageSearchRequest):
+    """批次中的圖片搜尋項目"""
+
+    type: Literal["images"] = Field(..., description="Search type")
+
+
+class BatchNewsSearchItem(NewsSearchRequest):
+    """批次中的新聞搜尋項目"""
+
+    type: Literal["news"] = Field(..., description="Search type")
+
+
+BatchSearchItem = Annotated[
+    Union[BatchTextSearchItem, BatchImageSearchItem, BatchNewsSearchItem],
+    Field(discriminator="type"),
+]
+
+
+class BatchSearchRequest(BaseModel):
+    """批次搜尋請求模型"""
+
+    items: List[BatchSearchItem] = Field(
+        ...,
+        description="Search items, each with a 'type' of 'text', 'images' or 'news'",
+        min_length=1,
+        max_length=100,
+    )
+    concurrency: Optional[int] = Field(
+        None,
+        description="Maximum concurrent searches (capped by server setting)",
+        ge=1,
+        le=100,
+    )
+
+
+class PaginatedSearchRequest(BaseModel):
+    """游標分頁搜尋請求模型，第一頁提供search，後續分頁提供cursor"""
+
+    search: Optional[BatchSearchItem] = Field(
+        None,
+        description="Search for the first page, with a 'type' of 'text', 'images' "
+        "or 'news' (max_results is ignored)",
+    )
+    cursor: Optional[str] = Field(
+        None, description="Opaque cursor from the previous page's next_cursor"
+    )
+    page_size: int = Field(10, description="Results per page", ge=1, le=100)
+    timeout: Optional[float] = Field(
+        None,
+        description="Search deadline in seconds (overrides X-Search-Timeout)",
+        gt=0,
+    )
+
+    @model_validator(mode="after")
+    def check_search_or_cursor(self) -> "PaginatedSearchRequest":
+        """search與cursor必須擇一提供"""
+        if (self.search is None) == (self.cursor is None):
+            raise ValueError("Provide exactly one of 'search' or 'cursor'")
+        return self
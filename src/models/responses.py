@@ -3,7 +3,7 @@ API回應模型
 """
 
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import List, Optional, Union
 
 
 class SearchResult(BaseModel):
@@ -72,6 +72,43 @@ class NewsSearchResponse(BaseModel):
     region: str
 
 
+class BatchSearchItemResult(BaseModel):
+    """批次搜尋中單一項目的結果"""
+
+    index: int
+    type: str
+    success: bool
+    status_code: int
+    response: Optional[
+        Union[SearchResponse, ImageSearchResponse, NewsSearchResponse]
+    ] = None
+    error: Optional[str] = None
+
+
+class BatchSearchResponse(BaseModel):
+    """批次搜尋回應模型"""
+
+    success: bool
+    results: List[BatchSearchItemResult]
+    total_items: int
+    succeeded: int
+    failed: int
+    timestamp: str
+
+
+class PaginatedSearchResponse(BaseModel):
+    """游標分頁搜尋回應模型"""
+
+    success: bool
+    type: str
+    query: str
+    results: List[Union[SearchResult, ImageResult, NewsResult]]
+    total_results: int
+    offset: int
+    next_cursor: Optional[str] = None
+    timestamp: str
+
+
 class ErrorResponse(BaseModel):
     """錯誤回應模型"""
 
@@ -0,0 +1,537 @@
+"""
+磁碟上的搜尋結果封存 (第二層快取)
+"""
+
+import hashlib
+import mmap
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.core.config import settings
+from src.core.logging import logger
+from src.services.cache import CacheBackend, CacheLookup, decode_results, encode_results
+
+# 紀錄標頭: 識別碼、鍵的雜湊、軟性到期、硬性到期、CRC32、內容長度
+RECORD_HEADER = struct.Struct("<4s16sddII")
+RECORD_MAGIC = b"SRA1"
+
+SEGMENT_PREFIX = "segment-"
+SEGMENT_SUFFIX = ".log"
+
+# 索引項目: (區段編號, 內容位移, 內容長度, CRC32, 軟性到期, 硬性到期)
+IndexEntry = Tuple[int, int, int, int, float, float]
+
+# 非最新的區段超過這個秒數未修改即視為已封閉，可以刪除
+# (寫入前會切換到最新的區段，只有同時輪替的寫入可能晚一點寫入舊區段)
+SEGMENT_SEAL_SECONDS = 10.0
+
+# 封存讀取結果: (搜尋結果, 軟性到期的系統時間)
+ArchiveRead = Tuple[List[Dict[str, Any]], float]
+
+
+def key_digest(key: str) -> bytes:
+    """
+    計算快取鍵的固定長度雜湊
+
+    Args:
+        key: 快取鍵
+
+    Returns:
+        16位元組的雜湊值
+    """
+    return hashlib.blake2b(key.encode(), digest_size=16).digest()
+
+
+def segment_name(segment_id: int) -> str:
+    """取得區段編號對應的檔名"""
+    return f"{SEGMENT_PREFIX}{segment_id:08d}{SEGMENT_SUFFIX}"
+
+
+class Segment:
+    """單一區段檔案與其唯讀記憶體映射"""
+
+    def __init__(self, segment_id: int, path: str):
+        self.segment_id = segment_id
+        self.path = path
+        self.scanned = 0
+        self._file = None
+        self._map: Optional[mmap.mmap] = None
+
+    def view(self, end: int) -> mmap.mmap:
+        """
+        取得至少涵蓋前end個位元組的記憶體映射，檔案成長後重新映射
+
+        Args:
+            end: 需要讀取到的位置
+
+        Returns:
+            唯讀的記憶體映射
+        """
+        if self._map is None or len(self._map) < end:
+            self.close()
+            self._file = open(self.path, "rb")
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._map
+
+    def close(self) -> None:
+        """關閉記憶體映射與檔案"""
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class SegmentArchive(CacheBackend):
+    """
+    以僅附加區段檔案與雜湊索引組成的磁碟搜尋結果封存
+
+    寫入由背景執行緒以單次O_APPEND寫入完成，不阻塞事件迴圈；佇列已滿時捨棄。
+    每個程序只在記憶體中保留鍵雜湊到檔案位置的索引，讀取時透過mmap取出單筆
+    內容並解壓，不需要載入整個封存；讀取會存取磁碟，非同步呼叫者應使用aread或
+    alookup。其他worker新附加的紀錄由refresh增量掃描，應用程式每refresh_interval
+    秒在背景執行一次，讀取時不掃描。總大小超過max_bytes時刪除最舊的已封閉區段，
+    不會刪除任何worker仍可能寫入的區段。
+    """
+
+    name = "archive"
+    blocking = True
+
+    def __init__(
+        self,
+        directory: str,
+        segment_bytes: int,
+        max_bytes: int,
+        ttls: Dict[str, float],
+        default_ttl: float = 300.0,
+        stale_ttl: float = 0.0,
+        ttl_jitter: float = 0.0,
+        write_queue: int = 1024,
+        refresh_interval: float = 1.0,
+    ):
+        super().__init__(ttls, default_ttl, stale_ttl, ttl_jitter)
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.max_bytes = max_bytes
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._index: Dict[bytes, IndexEntry] = {}
+        self._segments: Dict[int, Segment] = {}
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=write_queue)
+        self._writer: Optional[threading.Thread] = None
+        self._fd: Optional[int] = None
+        self._fd_segment: Optional[int] = None
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.dropped = 0
+
+    def lookup(self, key: str, include_expired: bool = False) -> Optional[CacheLookup]:
+        """
+        讀取封存的項目
+
+        Args:
+            key: 快取鍵
+            include_expired: 是否回傳已超過硬性期限的項目(標記為過時)
+
+        Returns:
+            (搜尋結果, 是否已過時)，未命中時為None
+        """
+        entry = self.read(key, include_expired)
+        if entry is None:
+            return None
+        results, fresh_until = entry
+        return results, time.time() >= fresh_until
+
+    async def aread(
+        self, key: str, include_expired: bool = False
+    ) -> Optional[ArchiveRead]:
+        """非同步版本的read，在執行緒中讀取"""
+        return await self._offload(self.read, key, include_expired)
+
+    def read(self, key: str, include_expired: bool = False) -> Optional[ArchiveRead]:
+        """
+        讀取封存的項目與其軟性到期時間，供提升到上層快取時保留剩餘的TTL
+
+        Args:
+            key: 快取鍵
+            include_expired: 是否回傳已超過硬性期限的項目
+
+        Returns:
+            (搜尋結果, 軟性到期的系統時間)，未命中時為None
+        """
+        entry = self._index.get(key_digest(key))
+        now = time.time()
+        if entry is None or (now >= entry[5] and not include_expired):
+            self.misses += 1
+            return None
+
+        segment_id, offset, length, crc, fresh_until, _ = entry
+        data: Optional[bytes] = None
+        with self._lock:
+            segment = self._segments.get(segment_id)
+            if segment is not None:
+                try:
+                    data = segment.view(offset + length)[offset : offset + length]
+                except (OSError, ValueError):
+                    # 區段已被其他程序刪除
+                    self._drop_segment(segment_id)
+        if data is None or zlib.crc32(data) != crc:
+            self.misses += 1
+            return None
+
+        if now >= fresh_until:
+            self.stale_hits += 1
+        else:
+            self.hits += 1
+        return decode_results(data), fresh_until
+
+    def set(
+        self,
+        key: str,
+        results: List[Dict[str, Any]],
+        search_type: str,
+        ttl: Optional[float] = None,
+    ) -> None:
+        """
+        排入背景寫入，佇列已滿時捨棄
+
+        Args:
+            key: 快取鍵
+            results: 搜尋結果
+            search_type: 搜尋類型，用於決定TTL
+            ttl: 指定的軟性TTL(秒)，None時依搜尋類型決定
+        """
+        fresh_until, expires_at = self.expiry(search_type, time.time(), ttl)
+        self._ensure_writer()
+        try:
+            self._queue.put_nowait((key_digest(key), results, fresh_until, expires_at))
+        except queue.Full:
+            self.dropped += 1
+
+    def refresh(self) -> None:
+        """掃描新的區段與其他程序附加的紀錄，並移除已被刪除的區段"""
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            names = []
+        ids = set()
+        for name in names:
+            if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX):
+                try:
+                    ids.add(int(name[len(SEGMENT_PREFIX) : -len(SEGMENT_SUFFIX)]))
+                except ValueError:
+                    continue
+
+        with self._lock:
+            for segment_id in sorted(set(self._segments) - ids):
+                self._drop_segment(segment_id)
+            for segment_id in sorted(ids):
+                segment = self._segments.get(segment_id)
+                if segment is None:
+                    segment = self._segments[segment_id] = Segment(
+                        segment_id,
+                        os.path.join(self.directory, segment_name(segment_id)),
+                    )
+                self._scan(segment)
+
+    def flush(self, timeout: float = 5.0) -> None:
+        """
+        等待佇列中的寫入完成
+
+        Args:
+            timeout: 最長等待秒數
+        """
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def close(self) -> None:
+        """完成剩餘寫入並停止背景執行緒"""
+        writer = self._writer
+        if writer is not None:
+            self._queue.put(None)
+            writer.join(timeout=5.0)
+            self._writer = None
+        with self._lock:
+            self._close_fd()
+            for segment in self._segments.values():
+                segment.close()
+
+    def clear(self) -> None:
+        """刪除所有區段檔案與索引"""
+        self.flush()
+        with self._lock:
+            self._close_fd()
+            for segment_id in list(self._segments):
+                self._drop_segment(segment_id)
+            for name in self._segment_files():
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass
+            self.hits = self.stale_hits = self.misses = 0
+            self.writes = self.dropped = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        取得封存統計資訊
+
+        Returns:
+            包含項目數、區段數、大小、命中率與寫入統計的字典
+        """
+        with self._lock:
+            entries = len(self._index)
+            segments = len(self._segments)
+            size = sum(segment.scanned for segment in self._segments.values())
+        total = self.hits + self.stale_hits + self.misses
+        return {
+            "backend": self.name,
+            "directory": self.directory,
+            "entries": entries,
+            "segments": segments,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_rate": (
+                round((self.hits + self.stale_hits) / total, 4) if total else 0.0
+            ),
+            "writes": self.writes,
+            "dropped": self.dropped,
+            "queued": self._queue.qsize(),
+        }
+
+    def _ensure_writer(self) -> None:
+        """啟動背景寫入執行緒"""
+        if self._writer is None or not self._writer.is_alive():
+            with self._lock:
+                if self._writer is None or not self._writer.is_alive():
+                    self._writer = threading.Thread(
+                        target=self._write_loop, name="search-archive", daemon=True
+                    )
+                    self._writer.start()
+
+    def _write_loop(self) -> None:
+        """背景寫入迴圈"""
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                self._append(*item)
+            except Exception as e:
+                logger.error(f"Search archive write failed: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    def _append(
+        self,
+        digest: bytes,
+        results: List[Dict[str, Any]],
+        fresh_until: float,
+        expires_at: float,
+    ) -> None:
+        """以單次附加寫入一筆紀錄並更新索引"""
+        value = encode_results(results)
+        record = (
+            RECORD_HEADER.pack(
+                RECORD_MAGIC,
+                digest,
+                fresh_until,
+                expires_at,
+                zlib.crc32(value),
+                len(value),
+            )
+            + value
+        )
+        with self._lock:
+            fd, segment_id = self._active_fd(len(record))
+            os.write(fd, record)
+            self.writes += 1
+            segment = self._segments.get(segment_id)
+            if segment is None:
+                segment = self._segments[segment_id] = Segment(
+                    segment_id, os.path.join(self.directory, segment_name(segment_id))
+                )
+            self._scan(segment)
+
+    def _active_fd(self, size: int) -> Tuple[int, int]:
+        """取得目前寫入區段的檔案描述子，超過區段大小時輪替(呼叫者需持有鎖)"""
+        if self._fd is not None and self._fd_segment is not None:
+            newest = self._newest_from(self._fd_segment)
+            if (
+                newest == self._fd_segment
+                and os.fstat(self._fd).st_size + size <= self.segment_bytes
+            ):
+                return self._fd, self._fd_segment
+            # 區段已滿或其他worker已輪替到較新的區段，切換後舊區段不再寫入
+            next_id = max(newest, self._fd_segment + 1)
+            self._close_fd()
+        else:
+            os.makedirs(self.directory, exist_ok=True)
+            files = self._segment_files()
+            next_id = (
+                int(files[-1][len(SEGMENT_PREFIX) : -len(SEGMENT_SUFFIX)])
+                if files
+                else 1
+            )
+
+        next_id = self._newest_from(next_id)
+        path = os.path.join(self.directory, segment_name(next_id))
+        self._fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._fd_segment = next_id
+        self._enforce_limit()
+        return self._fd, next_id
+
+    def _newest_from(self, segment_id: int) -> int:
+        """其他worker可能已建立較新的區段，回傳從segment_id起最新的區段編號"""
+        while os.path.exists(
+            os.path.join(self.directory, segment_name(segment_id + 1))
+        ):
+            segment_id += 1
+        return segment_id
+
+    def _is_sealed(self, size: int, modified: float, now: float) -> bool:
+        """
+        非最新的區段是否已封閉：已放不下任何紀錄，或超過SEGMENT_SEAL_SECONDS
+        秒未修改
+        """
+        return (
+            size + RECORD_HEADER.size > self.segment_bytes
+            or now - modified >= SEGMENT_SEAL_SECONDS
+        )
+
+    def _enforce_limit(self) -> None:
+        """
+        總大小超過max_bytes時由舊到新刪除已封閉的區段(呼叫者需持有鎖)
+
+        最新的區段與自己正在寫入的區段不會刪除；其他worker可能仍持有舊區段的
+        檔案描述子，因此只刪除已封閉的區段。
+        """
+        files = self._segment_files()
+        stats: List[Tuple[int, float]] = []
+        for name in files:
+            try:
+                info = os.stat(os.path.join(self.directory, name))
+                stats.append((info.st_size, info.st_mtime))
+            except FileNotFoundError:
+                stats.append((0, 0.0))
+        total = sum(size for size, _ in stats)
+        now = time.time()
+        for name, (size, modified) in zip(files[:-1], stats[:-1]):
+            if total <= self.max_bytes:
+                break
+            segment_id = int(name[len(SEGMENT_PREFIX) : -len(SEGMENT_SUFFIX)])
+            if segment_id == self._fd_segment or not self._is_sealed(
+                size, modified, now
+            ):
+                continue
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+            self._drop_segment(segment_id)
+            total -= size
+            logger.info(f"Search archive removed segment {name}")
+
+    def _segment_files(self) -> List[str]:
+        """依編號排序的區段檔名"""
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return sorted(
+            name
+            for name in names
+            if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX)
+        )
+
+    def _scan(self, segment: Segment) -> None:
+        """從上次掃描位置讀取新紀錄的標頭並加入索引(呼叫者需持有鎖)"""
+        try:
+            size = os.path.getsize(segment.path)
+        except FileNotFoundError:
+            return
+        if size <= segment.scanned:
+            return
+
+        view = segment.view(size)
+        position = segment.scanned
+        while position + RECORD_HEADER.size <= size:
+            magic, digest, fresh_until, expires_at, crc, length = (
+                RECORD_HEADER.unpack_from(view, position)
+            )
+            if magic != RECORD_MAGIC:
+                logger.warning(
+                    f"Search archive segment {segment.path} is corrupt at {position}"
+                )
+                position = size
+                break
+            end = position + RECORD_HEADER.size + length
+            if end > size:
+                # 其他程序正在寫入的紀錄，下次再讀取
+                break
+            self._index[digest] = (
+                segment.segment_id,
+                position + RECORD_HEADER.size,
+                length,
+                crc,
+                fresh_until,
+                expires_at,
+            )
+            position = end
+        segment.scanned = position
+
+    def _drop_segment(self, segment_id: int) -> None:
+        """移除區段與指向它的索引項目(呼叫者需持有鎖)"""
+        segment = self._segments.pop(segment_id, None)
+        if segment is not None:
+            segment.close()
+        stale = [d for d, entry in self._index.items() if entry[0] == segment_id]
+        for digest in stale:
+            del self._index[digest]
+
+    def _close_fd(self) -> None:
+        """關閉寫入中的檔案描述子(呼叫者需持有鎖)"""
+        if self._fd is not None:
+            os.close(self._fd)
+        self._fd = None
+        self._fd_segment = None
+
+
+def create_search_archive() -> Optional[SegmentArchive]:
+    """
+    依設定建立磁碟搜尋結果封存
+
+    Returns:
+        ARCHIVE_ENABLED為true時回傳封存實例，否則為None
+    """
+    if not settings.ARCHIVE_ENABLED:
+        return None
+    return SegmentArchive(
+        directory=settings.ARCHIVE_DIR,
+        segment_bytes=settings.ARCHIVE_SEGMENT_BYTES,
+        max_bytes=settings.ARCHIVE_MAX_BYTES,
+        ttls={
+            "text": settings.CACHE_TTL_TEXT,
+            "images": settings.CACHE_TTL_IMAGES,
+            "news": settings.CACHE_TTL_NEWS,
+        },
+        stale_ttl=settings.CACHE_STALE_TTL,
+        ttl_jitter=settings.CACHE_TTL_JITTER,
+        write_queue=settings.ARCHIVE_WRITE_QUEUE,
+        refresh_interval=settings.ARCHIVE_REFRESH_INTERVAL,
+    )
+
+
+# 建立全域封存實例 (未啟用時為None)
+search_archive = create_search_archive()
@@ -0,0 +1,346 @@
+"""
+原生asyncio DuckDuckGo搜尋後端
+"""
+
+import time
+from dataclasses import asdict
+from functools import partial
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import httpx
+from lxml import html as lxml_html
+
+from src.core.config import settings
+from src.core.logging import logger
+from src.core.metrics import upstream_duration_seconds, upstream_in_flight
+from src.services.pagination import paginate
+from src.services.replay import upstream_tape
+from src.services.upstream_timing import call_duration_reporter
+
+try:
+    from ddgs.exceptions import DDGSException
+    from ddgs.results import ImagesResult, NewsResult, TextResult
+    from ddgs.utils import json_loads
+except ImportError:
+    logger.error("DDGS not found. Please install with: pip install ddgs==9.4.3")
+    raise
+
+DDG_URL = "https://duckduckgo.com"
+DDG_HTML_URL = "https://html.duckduckgo.com/html/"
+DDG_IMAGES_URL = "https://duckduckgo.com/i.js"
+DDG_NEWS_URL = "https://duckduckgo.com/news.js"
+
+DEFAULT_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36"
+    ),
+    "Referer": "https://duckduckgo.com/",
+}
+
+
+# 與DDGS查無結果時相同的錯誤訊息
+NO_RESULTS_MESSAGE = "No results found."
+
+# 頁面中vqd參數的三種寫法：(開頭標記, 結尾標記)
+VQD_MARKERS = ((b'vqd="', b'"'), (b"vqd=", b"&"), (b"vqd='", b"'"))
+
+
+def extract_vqd(html_bytes: bytes, query: str) -> str:
+    """
+    從DuckDuckGo首頁取出圖片與新聞搜尋需要的vqd參數
+
+    Args:
+        html_bytes: 首頁內容
+        query: 搜尋關鍵字
+
+    Returns:
+        vqd字串
+
+    Raises:
+        DDGSException: 當頁面中沒有vqd時
+    """
+    for start_marker, end_marker in VQD_MARKERS:
+        start = html_bytes.find(start_marker)
+        if start == -1:
+            continue
+        start += len(start_marker)
+        end = html_bytes.find(end_marker, start)
+        if end != -1:
+            return html_bytes[start:end].decode()
+    raise DDGSException(f"Could not extract vqd for query: {query}")
+
+
+class AsyncDDGSBackend:
+    """
+    使用共用httpx.AsyncClient直接呼叫DuckDuckGo的搜尋後端
+
+    與執行緒後端相同的參數與結果格式，但不需要為每個搜尋佔用一個執行緒。
+    """
+
+    def __init__(self, timeout: float, max_connections: int):
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """取得或延遲建立共用的HTTP客戶端"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                headers=DEFAULT_HEADERS,
+                timeout=self.timeout,
+                follow_redirects=True,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+            )
+        return self._client
+
+    async def close(self) -> None:
+        """關閉共用的HTTP客戶端"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def search(self, search_type: str, **params: Any) -> List[Dict[str, Any]]:
+        """
+        執行搜尋並收集所有分頁結果
+
+        Args:
+            search_type: 搜尋類型 (text, images, news)
+            **params: 與DDGSService搜尋函數相同的關鍵字參數
+
+        Returns:
+            搜尋結果列表
+        """
+        results: List[Dict[str, Any]] = []
+        async for page in self.iter_pages(search_type, **params):
+            results.extend(page)
+        logger.info(
+            f"Async {search_type} search completed. Found {len(results)} results"
+        )
+        return results
+
+    async def fetch_page(
+        self,
+        search_type: str,
+        page: int,
+        vqds: Optional[Dict[str, str]] = None,
+        **params: Any,
+    ) -> List[Dict[str, Any]]:
+        """
+        取得單頁搜尋結果並記錄上游呼叫時間，上游錄製或重播時經由upstream_tape呼叫
+
+        與執行緒後端相同，第一頁沒有結果時拋出DDGSException，後續分頁沒有結果時
+        回傳空列表。
+
+        Args:
+            search_type: 搜尋類型 (text, images, news)
+            page: 頁碼，從1開始
+            vqds: 同一次搜尋共用的vqd快取 (查詢 -> vqd)，None表示每頁重新取得
+            **params: 與DDGSService搜尋函數相同的關鍵字參數
+
+        Returns:
+            該頁的搜尋結果列表
+
+        Raises:
+            ValueError: 當搜尋類型不支援時
+            DDGSException: 當第一頁沒有結果時
+        """
+        fetchers = {
+            "text": self._fetch_text_page,
+            "images": self._fetch_images_page,
+            "news": self._fetch_news_page,
+        }
+        if search_type not in fetchers:
+            raise ValueError(f"Unsupported search type: {search_type}")
+
+        report_duration = call_duration_reporter()
+        with upstream_in_flight.track_inprogress(
+            search_type=search_type
+        ), upstream_duration_seconds.time(search_type=search_type, backend="async"):
+            start = time.monotonic()
+            try:
+                results = await upstream_tape.arun(
+                    search_type,
+                    "async_page",
+                    {"page": page, **params},
+                    partial(fetchers[search_type], page=page, vqds=vqds, **params),
+                )
+            finally:
+                report_duration(time.monotonic() - start)
+        if not results and page == 1:
+            raise DDGSException(NO_RESULTS_MESSAGE)
+        return results
+
+    async def iter_pages(
+        self, search_type: str, deadline: Optional[float] = None, **params: Any
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        逐頁產生搜尋結果，已取得max_results筆或沒有新結果時停止
+
+        Args:
+            search_type: 搜尋類型 (text, images, news)
+            deadline: 截止時間(time.monotonic)，超過後不再要求後續分頁
+            **params: 與DDGSService搜尋函數相同的關鍵字參數
+
+        Yields:
+            每一頁去除重複後的搜尋結果
+        """
+        if search_type not in ("text", "images", "news"):
+            raise ValueError(f"Unsupported search type: {search_type}")
+
+        # 同一次搜尋的各頁共用vqd，每頁只需一次請求
+        vqds: Dict[str, str] = {}
+
+        async def fetch(page: int) -> List[Dict[str, Any]]:
+            return await self.fetch_page(search_type, page, vqds=vqds, **params)
+
+        async for results in paginate(
+            fetch, search_type, params.get("max_results") or 10, deadline
+        ):
+            yield results
+
+    async def _get_vqd(self, query: str, vqds: Optional[Dict[str, str]] = None) -> str:
+        """取得圖片與新聞搜尋需要的vqd參數，提供vqds時重複使用已取得的值"""
+        if vqds is not None and query in vqds:
+            return vqds[query]
+        response = await self.client.get(DDG_URL, params={"q": query})
+        response.raise_for_status()
+        vqd = extract_vqd(response.content, query)
+        if vqds is not None:
+            vqds[query] = vqd
+        return vqd
+
+    async def _fetch_text_page(
+        self,
+        query: str,
+        page: int,
+        region: Optional[str] = "wt-wt",
+        safesearch: Optional[str] = "moderate",
+        timelimit: Optional[str] = None,
+        **_: Any,
+    ) -> List[Dict[str, Any]]:
+        """取得單頁網頁搜尋結果"""
+        safesearch_base = {"on": "1", "strict": "1", "moderate": "-1", "off": "-2"}
+        payload = {
+            "q": query,
+            "b": "",
+            "kl": region or "wt-wt",
+            "kp": safesearch_base.get((safesearch or "moderate").lower(), "-1"),
+        }
+        if page > 1:
+            payload["s"] = f"{10 + (page - 2) * 15}"
+        if timelimit:
+            payload["df"] = timelimit
+
+        response = await self.client.post(DDG_HTML_URL, data=payload)
+        response.raise_for_status()
+
+        tree = lxml_html.fromstring(response.text)
+        results = []
+        for item in tree.xpath("//div[contains(@class, 'body')]"):
+            href = " ".join(x.strip() for x in item.xpath("./a/@href"))
+            if not href or "duckduckgo.com/y.js" in href:
+                continue
+            result = TextResult()
+            result.title = " ".join(x.strip() for x in item.xpath(".//h2//text()"))
+            result.href = href
+            result.body = " ".join(x.strip() for x in item.xpath("./a//text()"))
+            results.append(asdict(result))
+        return results
+
+    async def _fetch_images_page(
+        self,
+        query: str,
+        page: int,
+        region: Optional[str] = "wt-wt",
+        safesearch: Optional[str] = "moderate",
+        size: Optional[str] = None,
+        color: Optional[str] = None,
+        type_image: Optional[str] = None,
+        layout: Optional[str] = None,
+        license_image: Optional[str] = None,
+        vqds: Optional[Dict[str, str]] = None,
+        **_: Any,
+    ) -> List[Dict[str, Any]]:
+        """取得單頁圖片搜尋結果"""
+        safesearch_base = {"on": "1", "strict": "1", "moderate": "1", "off": "-1"}
+        filters = [
+            f"size:{size}" if size else "",
+            f"color:{color}" if color else "",
+            f"type:{type_image}" if type_image else "",
+            f"layout:{layout}" if layout else "",
+            f"license:{license_image}" if license_image else "",
+        ]
+        payload = {
+            "o": "json",
+            "q": query,
+            "l": region or "wt-wt",
+            "vqd": await self._get_vqd(query, vqds),
+            "p": safesearch_base.get((safesearch or "moderate").lower(), "1"),
+            "f": "," + ",".join(filters),
+        }
+        if page > 1:
+            payload["s"] = f"{(page - 1) * 100}"
+
+        response = await self.client.get(DDG_IMAGES_URL, params=payload)
+        response.raise_for_status()
+
+        results = []
+        for item in json_loads(response.content).get("results", []):
+            result = ImagesResult()
+            for key in ("title", "image", "thumbnail", "url", "height", "width"):
+                setattr(result, key, item.get(key))
+            result.source = item.get("source")
+            results.append(asdict(result))
+        return results
+
+    async def _fetch_news_page(
+        self,
+        query: str,
+        page: int,
+        region: Optional[str] = "wt-wt",
+        safesearch: Optional[str] = "moderate",
+        timelimit: Optional[str] = None,
+        vqds: Optional[Dict[str, str]] = None,
+        **_: Any,
+    ) -> List[Dict[str, Any]]:
+        """取得單頁新聞搜尋結果"""
+        safesearch_base = {"on": "1", "strict": "1", "moderate": "-1", "off": "-2"}
+        payload = {
+            "l": region or "wt-wt",
+            "o": "json",
+            "noamp": "1",
+            "q": query,
+            "vqd": await self._get_vqd(query, vqds),
+            "p": safesearch_base.get((safesearch or "moderate").lower(), "-1"),
+        }
+        if timelimit:
+            payload["df"] = timelimit
+        if page > 1:
+            payload["s"] = f"{(page - 1) * 30}"
+
+        response = await self.client.get(DDG_NEWS_URL, params=payload)
+        response.raise_for_status()
+
+        results = []
+        for item in json_loads(response.content).get("results", []):
+            result = NewsResult()
+            result.date = item.get("date")
+            result.title = item.get("title")
+            result.body = item.get("excerpt")
+            result.url = item.get("url")
+            result.image = item.get("image")
+            result.source = item.get("source")
+            results.append(asdict(result))
+        return results
+
+
+# 建立全域非同步後端實例
+async_backend = AsyncDDGSBackend(
+    timeout=settings.ASYNC_BACKEND_TIMEOUT,
+    max_connections=settings.ASYNC_BACKEND_MAX_CONNECTIONS,
+)
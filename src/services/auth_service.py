@@ -2,17 +2,261 @@
 認證服務
 """
 
+import hashlib
+import hmac
+import json
+import os
+import string
+import threading
+import time
+from typing import Any, Dict, FrozenSet, Iterable, NamedTuple, Optional, Tuple
+
 from fastapi import HTTPException, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from src.core.config import settings
+from src.core.logging import logger
+from src.services.ddgs_service import SEARCH_TYPES
 
 # 創建HTTPBearer實例 - 強制要求token
 security = HTTPBearer(auto_error=True)
 
 
+class TokenInfo(NamedTuple):
+    """API token的設定"""
+
+    name: str
+    search_types: Optional[FrozenSet[str]] = None
+    rate: Optional[float] = None
+    burst: Optional[int] = None
+
+    def allows(self, search_type: str) -> bool:
+        """是否允許執行指定類型的搜尋"""
+        return self.search_types is None or search_type in self.search_types
+
+
+# 未設定個別權限的token (API_TOKEN與API_TOKENS) 使用的設定
+DEFAULT_TOKEN_INFO = TokenInfo(name="default")
+
+
+def token_digest(token: str) -> str:
+    """
+    計算token的SHA-256摘要，token清單與限速狀態中只保存摘要
+
+    Args:
+        token: 原始token
+
+    Returns:
+        十六進位摘要字串
+    """
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def parse_token_entries(
+    entries: Iterable[Dict[str, Any]],
+) -> Dict[str, TokenInfo]:
+    """
+    解析token清單
+
+    每個項目以sha256 (建議) 或token提供token，並可設定name、search_types、
+    rate_limit (每秒請求數) 與burst。
+
+    Args:
+        entries: token設定項目
+
+    Returns:
+        以token摘要為鍵的字典
+
+    Raises:
+        ValueError: 當項目格式不正確時
+    """
+    tokens: Dict[str, TokenInfo] = {}
+    for index, entry in enumerate(entries):
+        if not isinstance(entry, dict):
+            raise ValueError(f"Token entry {index} must be an object")
+        if entry.get("sha256"):
+            digest = str(entry["sha256"]).lower()
+        elif entry.get("token"):
+            digest = token_digest(str(entry["token"]))
+        else:
+            raise ValueError(f"Token entry {index} needs 'sha256' or 'token'")
+        if len(digest) != 64 or not set(digest) <= set(string.hexdigits):
+            raise ValueError(f"Token entry {index} has an invalid sha256 digest")
+
+        search_types = entry.get("search_types")
+        if search_types is not None:
+            if not isinstance(search_types, list):
+                raise ValueError(f"Token entry {index} search_types must be a list")
+            unknown = set(search_types) - set(SEARCH_TYPES)
+            if unknown:
+                raise ValueError(
+                    f"Token entry {index} has unknown search types: "
+                    f"{', '.join(sorted(map(str, unknown)))}"
+                )
+        rate = entry.get("rate_limit")
+        burst = entry.get("burst")
+        tokens[digest] = TokenInfo(
+            name=str(entry.get("name") or f"token-{index}"),
+            search_types=frozenset(search_types) if search_types else None,
+            rate=float(rate) if rate is not None else None,
+            burst=int(burst) if burst is not None else None,
+        )
+    return tokens
+
+
+class TokenRegistry:
+    """
+    以token摘要為鍵的token清單
+
+    驗證時計算一次SHA-256並查詢字典，耗時與token數量及內容無關，不進行檔案I/O；
+    token清單檔案由背景工作每reload_interval秒呼叫refresh檢查，變更時(修改時間或
+    大小改變)重新載入，載入失敗時沿用先前的清單。
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        env_tokens: Optional[str] = None,
+        reload_interval: float = 5.0,
+    ):
+        self.path = path
+        self.reload_interval = reload_interval
+        self.reloads = 0
+        self.reload_errors = 0
+        self.loaded_at: Optional[float] = None
+        self._env_tokens = parse_token_entries(
+            {"token": token.strip(), "name": "env"}
+            for token in (env_tokens or "").split(",")
+            if token.strip()
+        )
+        self._file_tokens: Dict[str, TokenInfo] = {}
+        self._signature: Optional[Tuple[int, int]] = None
+        self._lock = threading.Lock()
+        if path:
+            self.reload()
+
+    @property
+    def configured(self) -> bool:
+        """是否設定了token清單檔案或API_TOKENS"""
+        return bool(self.path or self._env_tokens)
+
+    def lookup(self, token: str) -> Optional[TokenInfo]:
+        """
+        查詢token的設定
+
+        Args:
+            token: 原始token
+
+        Returns:
+            token的設定，不在清單中時為None
+        """
+        return self.get(token_digest(token))
+
+    def get(self, digest: str) -> Optional[TokenInfo]:
+        """
+        依token摘要查詢設定
+
+        Args:
+            digest: token_digest產生的摘要
+
+        Returns:
+            token的設定，不在清單中時為None
+        """
+        info = self._file_tokens.get(digest)
+        if info is None:
+            info = self._env_tokens.get(digest)
+        return info
+
+    def reload(self) -> bool:
+        """
+        重新載入token清單檔案
+
+        檔案為JSON，內容為token項目的陣列，或包含tokens陣列的物件。
+
+        Returns:
+            是否載入成功
+        """
+        if not self.path:
+            return False
+        with self._lock:
+            try:
+                signature = self._file_signature()
+                with open(self.path, encoding="utf-8") as f:
+                    data = json.load(f)
+                entries = data.get("tokens", []) if isinstance(data, dict) else data
+                tokens = parse_token_entries(entries)
+            except (OSError, ValueError) as e:
+                self.reload_errors += 1
+                logger.error(f"Failed to load API tokens from {self.path}: {str(e)}")
+                return False
+            self._file_tokens = tokens
+            self._signature = signature
+            self.reloads += 1
+            self.loaded_at = time.time()
+        logger.info(f"Loaded {len(tokens)} API tokens from {self.path}")
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        取得token清單統計資訊 (不包含token或摘要)
+
+        Returns:
+            包含token數與載入次數的字典
+        """
+        return {
+            "path": self.path,
+            "file_tokens": len(self._file_tokens),
+            "env_tokens": len(self._env_tokens),
+            "reloads": self.reloads,
+            "reload_errors": self.reload_errors,
+            "loaded_at": self.loaded_at,
+        }
+
+    def refresh(self) -> bool:
+        """
+        檢查清單檔案是否變更，變更時重新載入 (會進行檔案I/O，應在執行緒中呼叫)
+
+        Returns:
+            是否重新載入成功
+        """
+        if not self.path:
+            return False
+        try:
+            signature = self._file_signature()
+        except OSError:
+            return False
+        if signature == self._signature:
+            return False
+        return self.reload()
+
+    def _file_signature(self) -> Tuple[int, int]:
+        """檔案的修改時間與大小"""
+        stat = os.stat(self.path)
+        return stat.st_mtime_ns, stat.st_size
+
+
+def resolve_token(token: str, digest: Optional[str] = None) -> Optional[TokenInfo]:
+    """
+    驗證token並取得其設定
+
+    API_TOKEN以固定時間比較，其餘token查詢token清單。
+
+    Args:
+        token: 原始token
+        digest: 已計算的token_digest(token)，None時在需要時計算
+
+    Returns:
+        token的設定，無效時為None
+    """
+    if settings.API_TOKEN and hmac.compare_digest(
+        token.encode(), settings.API_TOKEN.encode()
+    ):
+        return DEFAULT_TOKEN_INFO
+    return token_registry.get(digest or token_digest(token))
+
+
 def verify_token(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-) -> str:
+) -> TokenInfo:
     """
     驗證Bearer token (必須提供)
     在所有環境中都強制要求token驗證
@@ -21,20 +265,47 @@ def verify_token(
         credentials: HTTP Bearer認證憑證
 
     Returns:
-        驗證通過的token字串
+        驗證通過的token的設定
 
     Raises:
         HTTPException: 當token無效或未提供時
     """
-    # 如果沒有設定API_TOKEN，拋出配置錯誤
-    if not settings.API_TOKEN:
+    # 如果沒有設定API_TOKEN或token清單，拋出配置錯誤
+    if not settings.API_TOKEN and not token_registry.configured:
         raise HTTPException(
             status_code=500,
-            detail="API_TOKEN not configured. Please set API_TOKEN environment variable.",  # noqa: E501
+            detail="API_TOKEN not configured. Please set API_TOKEN, API_TOKENS or API_TOKENS_FILE.",  # noqa: E501
         )
 
-    # 驗證token是否匹配
-    if credentials.credentials != settings.API_TOKEN:
+    # 驗證token是否有效
+    info = resolve_token(credentials.credentials)
+    if info is None:
         raise HTTPException(status_code=401, detail="Invalid authentication token")
 
-    return credentials.credentials
+    return info
+
+
+def authorize_search_type(info: Optional[TokenInfo], search_type: str) -> None:
+    """
+    檢查token是否允許執行指定類型的搜尋
+
+    Args:
+        info: verify_token回傳的token設定
+        search_type: 搜尋類型 (text, images, news)
+
+    Raises:
+        HTTPException: 當token不允許此搜尋類型時 (403)
+    """
+    if info is not None and not info.allows(search_type):
+        raise HTTPException(
+            status_code=403,
+            detail=f"Token '{info.name}' is not allowed to run {search_type} searches",
+        )
+
+
+# 建立全域token清單實例
+token_registry = TokenRegistry(
+    path=settings.API_TOKENS_FILE,
+    env_tokens=settings.API_TOKENS,
+    reload_interval=settings.API_TOKENS_RELOAD_INTERVAL,
+)
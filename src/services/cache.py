@@ -0,0 +1,621 @@
+"""
+搜尋結果快取服務
+"""
+
+import asyncio
+import json
+from abc import ABC, abstractmethod
+from functools import partial
+import os
+import random
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.core.config import settings
+from src.core.logging import logger
+
+# 每個快取項目的固定額外開銷估計(bytes)
+ENTRY_OVERHEAD_BYTES = 256
+
+# 共用快取每寫入幾次清理一次過期與超出數量的項目
+PRUNE_EVERY_WRITES = 64
+
+# zlib壓縮等級，搜尋結果多為重複的欄位名稱與URL，低等級即可取得大部分壓縮率
+COMPRESSION_LEVEL = 1
+
+# 共用快取因大小超出上限而清理時，淘汰到上限的這個比例，避免接近上限時每次寫入都清理
+PRUNE_TARGET_RATIO = 0.9
+
+# 共用快取統計的項目數與大小最多重複使用幾秒，避免每次健康檢查與指標抓取都掃描整個資料表
+STATS_REFRESH_SECONDS = 5.0
+
+
+def make_cache_key(search_type: str, params: Dict[str, Any]) -> str:
+    """
+    根據搜尋類型與正規化後的參數建立快取鍵
+
+    Args:
+        search_type: 搜尋類型 (text, images, news)
+        params: 搜尋參數
+
+    Returns:
+        穩定的快取鍵字串
+    """
+    return json.dumps(
+        [search_type, sorted(params.items())], ensure_ascii=False, default=str
+    )
+
+
+def estimate_size(results: List[Dict[str, Any]]) -> int:
+    """
+    估計搜尋結果佔用的記憶體大小
+
+    Args:
+        results: 搜尋結果列表
+
+    Returns:
+        估計的位元組數
+    """
+    size = ENTRY_OVERHEAD_BYTES
+    for result in results:
+        for key, value in result.items():
+            size += len(key) + len(str(value)) + 16
+    return size
+
+
+def encode_results(results: List[Dict[str, Any]]) -> bytes:
+    """
+    將搜尋結果序列化為壓縮的二進位格式
+
+    Args:
+        results: 搜尋結果列表
+
+    Returns:
+        zlib壓縮後的緊湊JSON
+    """
+    data = json.dumps(
+        results, ensure_ascii=False, separators=(",", ":"), default=str
+    ).encode("utf-8")
+    return zlib.compress(data, COMPRESSION_LEVEL)
+
+
+def decode_results(blob: bytes) -> List[Dict[str, Any]]:
+    """
+    還原encode_results產生的搜尋結果
+
+    Args:
+        blob: 壓縮後的資料
+
+    Returns:
+        搜尋結果列表
+    """
+    return json.loads(zlib.decompress(blob))
+
+
+# 快取查詢結果：(搜尋結果, 是否已超過軟性TTL)
+CacheLookup = Tuple[List[Dict[str, Any]], bool]
+
+
+class CacheBackend(ABC):
+    """
+    搜尋結果快取後端介面
+
+    每個項目有兩個期限：超過軟性TTL後仍可回傳(標記為過時)並由呼叫者在背景更新，
+    超過硬性期限(軟性TTL加上stale_ttl)後則視為不存在。
+    DDGSService只透過lookup、set、clear與stats使用快取，新增後端時必須實作這些抽象方法。
+    操作會阻塞(例如磁碟I/O)的後端將blocking設為True，非同步呼叫者經由alookup、aget、
+    aset與astats在執行緒中執行，不阻塞事件迴圈。
+    """
+
+    name = "base"
+
+    # 操作是否可能阻塞事件迴圈
+    blocking = False
+
+    def __init__(
+        self,
+        ttls: Dict[str, float],
+        default_ttl: float = 300.0,
+        stale_ttl: float = 0.0,
+        ttl_jitter: float = 0.0,
+    ):
+        self.ttls = ttls
+        self.default_ttl = default_ttl
+        self.stale_ttl = stale_ttl
+        self.ttl_jitter = ttl_jitter
+
+    def ttl_for(self, search_type: str) -> float:
+        """取得指定搜尋類型的TTL(秒)"""
+        return self.ttls.get(search_type, self.default_ttl)
+
+    def expiry(
+        self, search_type: str, now: float, ttl: Optional[float] = None
+    ) -> Tuple[float, float]:
+        """
+        計算新項目的軟性與硬性到期時間
+
+        軟性TTL隨機縮短最多ttl_jitter比例，避免同時寫入的熱門項目同時過期。
+
+        Args:
+            search_type: 搜尋類型
+            now: 目前時間
+            ttl: 指定的軟性TTL(秒)，例如從下層快取提升時的剩餘TTL，不套用抖動
+
+        Returns:
+            (軟性到期時間, 硬性到期時間)
+        """
+        if ttl is None:
+            ttl = self.ttl_for(search_type) * (1 - random.uniform(0, self.ttl_jitter))
+        fresh_until = now + ttl
+        return fresh_until, fresh_until + self.stale_ttl
+
+    @abstractmethod
+    def lookup(self, key: str, include_expired: bool = False) -> Optional[CacheLookup]:
+        """
+        讀取未超過硬性期限的快取項目，未命中時為None
+
+        include_expired為True時也回傳已超過硬性期限但尚未清除的項目(標記為過時)，
+        供上游無法使用時作為備援。
+        """
+
+    def get(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        讀取未超過軟性TTL的快取項目
+
+        Args:
+            key: 快取鍵
+
+        Returns:
+            快取的搜尋結果，未命中或已過時時為None
+        """
+        entry = self.lookup(key)
+        if entry is None or entry[1]:
+            return None
+        return entry[0]
+
+    @abstractmethod
+    def set(
+        self,
+        key: str,
+        results: List[Dict[str, Any]],
+        search_type: str,
+        ttl: Optional[float] = None,
+    ) -> None:
+        """寫入快取項目，ttl指定時取代搜尋類型的軟性TTL"""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """清除所有快取項目與統計"""
+
+    @abstractmethod
+    def stats(self) -> Dict[str, Any]:
+        """取得快取統計資訊"""
+
+    async def alookup(
+        self, key: str, include_expired: bool = False
+    ) -> Optional[CacheLookup]:
+        """非同步版本的lookup"""
+        return await self._offload(self.lookup, key, include_expired)
+
+    async def aget(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        """非同步版本的get"""
+        return await self._offload(self.get, key)
+
+    async def aset(
+        self,
+        key: str,
+        results: List[Dict[str, Any]],
+        search_type: str,
+        ttl: Optional[float] = None,
+    ) -> None:
+        """非同步版本的set"""
+        await self._offload(self.set, key, results, search_type, ttl)
+
+    async def astats(self) -> Dict[str, Any]:
+        """非同步版本的stats"""
+        return await self._offload(self.stats)
+
+    async def _offload(self, func: Any, *args: Any) -> Any:
+        """blocking的後端在預設執行緒池中執行操作，其餘直接呼叫"""
+        if not self.blocking:
+            return func(*args)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, partial(func, *args))
+
+
+class SearchCache(CacheBackend):
+    """具有TTL與LRU淘汰機制的記憶體搜尋結果快取"""
+
+    name = "memory"
+
+    def __init__(
+        self,
+        max_entries: int,
+        max_bytes: int,
+        ttls: Dict[str, float],
+        default_ttl: float = 300.0,
+        stale_ttl: float = 0.0,
+        ttl_jitter: float = 0.0,
+    ):
+        super().__init__(ttls, default_ttl, stale_ttl, ttl_jitter)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: (
+            "OrderedDict[str, Tuple[float, float, int, List[Dict[str, Any]]]]"
+        ) = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def lookup(self, key: str, include_expired: bool = False) -> Optional[CacheLookup]:
+        """
+        讀取快取項目，超過硬性期限的項目會被移除
+
+        Args:
+            key: 快取鍵
+            include_expired: 是否保留並回傳已超過硬性期限的項目
+
+        Returns:
+            (快取的搜尋結果, 是否已過時)，未命中時為None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            fresh_until, expires_at, size, results = entry
+            now = time.monotonic()
+            if expires_at <= now and not include_expired:
+                self._remove(key)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            stale = fresh_until <= now
+            if stale:
+                self.stale_hits += 1
+            else:
+                self.hits += 1
+            return results, stale
+
+    def set(
+        self,
+        key: str,
+        results: List[Dict[str, Any]],
+        search_type: str,
+        ttl: Optional[float] = None,
+    ) -> None:
+        """
+        寫入快取項目並依LRU淘汰超出限制的項目
+
+        Args:
+            key: 快取鍵
+            results: 搜尋結果列表
+            search_type: 搜尋類型，用於決定TTL
+            ttl: 指定的軟性TTL(秒)，None時依搜尋類型決定
+        """
+        size = estimate_size(results)
+        if size > self.max_bytes:
+            return
+
+        fresh_until, expires_at = self.expiry(search_type, time.monotonic(), ttl)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (fresh_until, expires_at, size, results)
+            self._bytes += size
+
+            while self._entries and (
+                len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+            ):
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """清除所有快取項目與統計"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = 0
+            self.stale_hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        取得快取統計資訊
+
+        Returns:
+            包含命中、未命中、項目數與大小的字典
+        """
+        served = self.hits + self.stale_hits
+        lookups = served + self.misses
+        return {
+            "backend": self.name,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(served / lookups, 4) if lookups else 0.0,
+        }
+
+    def _remove(self, key: str) -> None:
+        """移除快取項目(呼叫者需持有鎖)"""
+        _, _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+
+class SQLiteSearchCache(CacheBackend):
+    """
+    以SQLite檔案儲存的共用搜尋結果快取
+
+    同一主機上的多個worker開啟同一個檔案(建議放在/dev/shm)即可共用快取。
+    結果以壓縮的二進位格式儲存，過期時間使用系統時間並在讀取時檢查，
+    因此不同程序寫入的項目也會正確過期。命中與未命中次數為各程序自己的統計，
+    項目數與大小為最多STATS_REFRESH_SECONDS秒前的快照。
+    清理時依寫入時間淘汰最舊的項目，直到項目數在上限內且總大小不超過上限的
+    PRUNE_TARGET_RATIO；自上次清理後寫入的資料可能超出大小上限時會提前清理。
+    """
+
+    name = "sqlite"
+    blocking = True
+
+    def __init__(
+        self,
+        path: str,
+        max_entries: int,
+        max_bytes: int,
+        ttls: Dict[str, float],
+        default_ttl: float = 300.0,
+        stale_ttl: float = 0.0,
+        ttl_jitter: float = 0.0,
+    ):
+        super().__init__(ttls, default_ttl, stale_ttl, ttl_jitter)
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._writes = 0
+        # 上次清理後寫入的位元組數
+        self._written_bytes = 0
+        # 最近一次統計的(項目數, 大小, 統計時間)
+        self._totals: Optional[Tuple[int, int, float]] = None
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        """取得或建立資料庫連線(呼叫者需持有鎖)，fork後的子程序會重新連線"""
+        if self._conn is None or self._pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(
+                self.path, timeout=5.0, isolation_level=None, check_same_thread=False
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS search_cache ("
+                "key TEXT PRIMARY KEY, "
+                "search_type TEXT NOT NULL, "
+                "fresh_until REAL NOT NULL, "
+                "expires_at REAL NOT NULL, "
+                "stored_at REAL NOT NULL, "
+                "value BLOB NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS search_cache_stored_at "
+                "ON search_cache (stored_at)"
+            )
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    def lookup(self, key: str, include_expired: bool = False) -> Optional[CacheLookup]:
+        """
+        讀取未超過硬性期限的快取項目
+
+        Args:
+            key: 快取鍵
+            include_expired: 是否也回傳已超過硬性期限但尚未清除的項目
+
+        Returns:
+            (快取的搜尋結果, 是否已過時)，未命中或已過期時為None
+        """
+        now = time.time()
+        with self._lock:
+            try:
+                row = (
+                    self._connection()
+                    .execute(
+                        "SELECT value, fresh_until FROM search_cache "
+                        "WHERE key = ? AND expires_at > ?",
+                        (key, float("-inf") if include_expired else now),
+                    )
+                    .fetchone()
+                )
+            except sqlite3.Error as e:
+                logger.warning(f"Shared cache read failed: {str(e)}")
+                row = None
+
+            if row is None:
+                self.misses += 1
+                return None
+            stale = row[1] <= now
+            if stale:
+                self.stale_hits += 1
+            else:
+                self.hits += 1
+
+        return decode_results(row[0]), stale
+
+    def set(
+        self,
+        key: str,
+        results: List[Dict[str, Any]],
+        search_type: str,
+        ttl: Optional[float] = None,
+    ) -> None:
+        """
+        寫入快取項目，並定期清理過期與超出數量上限的項目
+
+        Args:
+            key: 快取鍵
+            results: 搜尋結果列表
+            search_type: 搜尋類型，用於決定TTL
+            ttl: 指定的軟性TTL(秒)，None時依搜尋類型決定
+        """
+        blob = encode_results(results)
+        if len(blob) > self.max_bytes:
+            return
+
+        now = time.time()
+        fresh_until, expires_at = self.expiry(search_type, now, ttl)
+        with self._lock:
+            try:
+                self._connection().execute(
+                    "INSERT OR REPLACE INTO search_cache "
+                    "(key, search_type, fresh_until, expires_at, stored_at, value) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, search_type, fresh_until, expires_at, now, blob),
+                )
+                self._writes += 1
+                self._written_bytes += len(blob)
+                if self._writes % PRUNE_EVERY_WRITES == 0 or self._over_budget():
+                    self._prune(now)
+            except sqlite3.Error as e:
+                logger.warning(f"Shared cache write failed: {str(e)}")
+
+    def prune(self) -> None:
+        """立即清理過期與超出數量上限的項目"""
+        with self._lock:
+            self._prune(time.time())
+
+    def clear(self) -> None:
+        """清除所有快取項目與統計"""
+        with self._lock:
+            self._connection().execute("DELETE FROM search_cache")
+            self._written_bytes = 0
+            self._totals = None
+            self.hits = 0
+            self.stale_hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        取得快取統計資訊
+
+        Returns:
+            包含命中、未命中、項目數與大小的字典
+        """
+        with self._lock:
+            entries, size = self._current_totals()
+        served = self.hits + self.stale_hits
+        lookups = served + self.misses
+        return {
+            "backend": self.name,
+            "path": self.path,
+            "entries": entries,
+            "bytes": size,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(served / lookups, 4) if lookups else 0.0,
+        }
+
+    def _prune(self, now: float) -> None:
+        """
+        刪除過期項目，再依寫入時間淘汰最舊的項目直到項目數與總大小都在上限內
+        (呼叫者需持有鎖)，大小淘汰到上限的PRUNE_TARGET_RATIO
+        """
+        conn = self._connection()
+        conn.execute("DELETE FROM search_cache WHERE expires_at <= ?", (now,))
+        cursor = conn.execute(
+            "DELETE FROM search_cache WHERE key IN ("
+            "SELECT key FROM ("
+            "SELECT key, "
+            "ROW_NUMBER() OVER newest AS position, "
+            "SUM(LENGTH(value)) OVER newest AS running_bytes "
+            "FROM search_cache "
+            "WINDOW newest AS (ORDER BY stored_at DESC, key)"
+            ") WHERE position > ? OR running_bytes > ?)",
+            (self.max_entries, int(self.max_bytes * PRUNE_TARGET_RATIO)),
+        )
+        self.evictions += max(cursor.rowcount, 0)
+        self._written_bytes = 0
+        self._totals = None
+        self._current_totals()
+
+    def _over_budget(self) -> bool:
+        """上次統計後寫入的資料是否可能超出大小上限(呼叫者需持有鎖)"""
+        size = self._totals[1] if self._totals is not None else 0
+        return size + self._written_bytes > self.max_bytes
+
+    def _current_totals(self) -> Tuple[int, int]:
+        """
+        取得項目數與總大小，最多重複使用STATS_REFRESH_SECONDS秒前的統計
+        (呼叫者需持有鎖)
+        """
+        now = time.monotonic()
+        if self._totals is None or now - self._totals[2] >= STATS_REFRESH_SECONDS:
+            entries, size = (
+                self._connection()
+                .execute(
+                    "SELECT COUNT(*), COALESCE(SUM(LENGTH(value)), 0) "
+                    "FROM search_cache"
+                )
+                .fetchone()
+            )
+            self._totals = (entries, size, now)
+        return self._totals[0], self._totals[1]
+
+
+def create_search_cache() -> CacheBackend:
+    """
+    依設定建立搜尋結果快取後端
+
+    Returns:
+        CACHE_BACKEND為sqlite時回傳共用的SQLite快取，否則回傳記憶體快取
+    """
+    ttls = {
+        "text": settings.CACHE_TTL_TEXT,
+        "images": settings.CACHE_TTL_IMAGES,
+        "news": settings.CACHE_TTL_NEWS,
+    }
+    if settings.CACHE_BACKEND == "sqlite":
+        return SQLiteSearchCache(
+            path=settings.CACHE_SQLITE_PATH,
+            max_entries=settings.CACHE_MAX_ENTRIES,
+            max_bytes=settings.CACHE_MAX_BYTES,
+            ttls=ttls,
+            stale_ttl=settings.CACHE_STALE_TTL,
+            ttl_jitter=settings.CACHE_TTL_JITTER,
+        )
+    return SearchCache(
+        max_entries=settings.CACHE_MAX_ENTRIES,
+        max_bytes=settings.CACHE_MAX_BYTES,
+        ttls=ttls,
+        stale_ttl=settings.CACHE_STALE_TTL,
+        ttl_jitter=settings.CACHE_TTL_JITTER,
+    )
+
+
+# 建立全域快取實例
+search_cache = create_search_cache()
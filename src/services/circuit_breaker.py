@@ -0,0 +1,271 @@
+"""
+上游搜尋的斷路器
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterator, Optional, Tuple
+
+from src.core.exceptions import ServiceUnavailableError
+from src.core.logging import logger
+from src.core.metrics import circuit_breaker_rejections_total, circuit_breaker_state
+from src.services.upstream_timing import measured_duration, track_call_durations
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# 狀態在指標中的數值
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(ServiceUnavailableError):
+    """斷路器開啟中，拒絕向上游發出請求"""
+
+
+class CircuitBreaker:
+    """
+    依滾動視窗內的錯誤率與慢速呼叫比例開啟的斷路器
+
+    關閉狀態下記錄每次呼叫的結果；視窗內呼叫數達到min_calls且失敗(含慢速)比例
+    達到failure_rate時開啟。開啟期間立即拒絕請求，open_duration秒後進入半開狀態，
+    只允許half_open_calls個試探請求：全部成功則關閉，任一失敗則重新開啟。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window: float,
+        min_calls: int,
+        failure_rate: float,
+        slow_call_seconds: float,
+        open_duration: float,
+        half_open_calls: int,
+        enabled: bool = True,
+    ):
+        self.name = name
+        self.window = window
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.open_duration = open_duration
+        self.half_open_calls = half_open_calls
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._calls: Deque[Tuple[float, bool]] = deque()
+        self._failures = 0
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._trials_in_flight = 0
+        self._trial_successes = 0
+        self.opened = 0
+        self.rejected = 0
+        circuit_breaker_state.set(STATE_VALUES[CLOSED], search_type=name)
+
+    @property
+    def state(self) -> str:
+        """目前狀態，開啟時間已過時回報為半開"""
+        with self._lock:
+            if self._state == OPEN and self._open_remaining(time.monotonic()) <= 0:
+                return HALF_OPEN
+            return self._state
+
+    def is_open(self) -> bool:
+        """是否正在拒絕所有請求"""
+        return self.enabled and self.state == OPEN
+
+    def acquire(self) -> bool:
+        """
+        取得發出請求的許可
+
+        Returns:
+            此次請求是否為半開狀態下的試探請求
+
+        Raises:
+            CircuitOpenError: 當斷路器開啟或試探請求數已滿時
+        """
+        now = time.monotonic()
+        with self._lock:
+            if self._state == OPEN:
+                remaining = self._open_remaining(now)
+                if remaining > 0:
+                    self._reject(remaining)
+                self._transition(HALF_OPEN)
+                self._trials_in_flight = 0
+                self._trial_successes = 0
+
+            if self._state == HALF_OPEN:
+                if self._trials_in_flight >= self.half_open_calls:
+                    self._reject(self.open_duration)
+                self._trials_in_flight += 1
+                return True
+            return False
+
+    def record_success(self, trial: bool, duration: float) -> None:
+        """
+        記錄成功的呼叫，超過slow_call_seconds的呼叫視為失敗
+
+        Args:
+            trial: acquire的回傳值
+            duration: 呼叫耗時(秒)
+        """
+        self._record(trial, duration >= self.slow_call_seconds)
+
+    def record_failure(self, trial: bool) -> None:
+        """
+        記錄失敗的呼叫
+
+        Args:
+            trial: acquire的回傳值
+        """
+        self._record(trial, True)
+
+    def release(self, trial: bool) -> None:
+        """
+        放棄許可且不記錄結果，用於取消或本地容量不足等與上游無關的情況
+
+        Args:
+            trial: acquire的回傳值
+        """
+        if trial:
+            with self._lock:
+                self._trials_in_flight = max(0, self._trials_in_flight - 1)
+
+    @contextmanager
+    def guard(
+        self, is_failure: Callable[[BaseException], bool] = lambda e: True
+    ) -> Iterator[None]:
+        """
+        以斷路器保護區塊內的上游呼叫
+
+        慢速呼叫依區塊內經由call_duration_reporter回報的上游耗時總和判斷，不包含
+        等待並發名額、執行緒池佇列與串流消費者的時間；沒有回報時使用整個區塊的耗時。
+
+        Args:
+            is_failure: 判斷例外是否代表上游故障的函數
+
+        Raises:
+            CircuitOpenError: 當斷路器拒絕請求時
+        """
+        if not self.enabled:
+            yield
+            return
+
+        trial = self.acquire()
+        start = time.monotonic()
+        with track_call_durations() as durations:
+            try:
+                yield
+            except ServiceUnavailableError:
+                self.release(trial)
+                raise
+            except Exception as e:
+                if is_failure(e):
+                    self.record_failure(trial)
+                else:
+                    self.record_success(trial, measured_duration(durations, start))
+                raise
+            except BaseException:
+                self.release(trial)
+                raise
+            else:
+                self.record_success(trial, measured_duration(durations, start))
+
+    def reset(self) -> None:
+        """回到關閉狀態並清除統計"""
+        with self._lock:
+            self._calls.clear()
+            self._failures = 0
+            self._trials_in_flight = 0
+            self._trial_successes = 0
+            self.opened = 0
+            self.rejected = 0
+            self._transition(CLOSED)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        取得斷路器狀態資訊
+
+        Returns:
+            包含狀態、視窗內呼叫數、失敗率與開啟次數的字典
+        """
+        state = self.state
+        with self._lock:
+            self._trim(time.monotonic())
+            calls = len(self._calls)
+            retry_after: Optional[float] = None
+            if state == OPEN:
+                retry_after = round(self._open_remaining(time.monotonic()), 3)
+            return {
+                "enabled": self.enabled,
+                "state": state,
+                "window_calls": calls,
+                "failure_rate": round(self._failures / calls, 4) if calls else 0.0,
+                "opened": self.opened,
+                "rejected": self.rejected,
+                "retry_after": retry_after,
+            }
+
+    def _record(self, trial: bool, failed: bool) -> None:
+        """記錄呼叫結果並依需要切換狀態"""
+        now = time.monotonic()
+        with self._lock:
+            if trial:
+                self._trials_in_flight = max(0, self._trials_in_flight - 1)
+                if self._state != HALF_OPEN:
+                    return
+                if failed:
+                    self._open(now)
+                    return
+                self._trial_successes += 1
+                if self._trial_successes >= self.half_open_calls:
+                    self._calls.clear()
+                    self._failures = 0
+                    self._transition(CLOSED)
+                return
+
+            if self._state != CLOSED:
+                return
+            self._calls.append((now, failed))
+            self._failures += failed
+            self._trim(now)
+            calls = len(self._calls)
+            if calls >= self.min_calls and self._failures / calls >= self.failure_rate:
+                self._open(now)
+
+    def _trim(self, now: float) -> None:
+        """移除滾動視窗外的紀錄(呼叫者需持有鎖)"""
+        while self._calls and self._calls[0][0] <= now - self.window:
+            _, failed = self._calls.popleft()
+            self._failures -= failed
+
+    def _open(self, now: float) -> None:
+        """開啟斷路器(呼叫者需持有鎖)"""
+        self._opened_at = now
+        self.opened += 1
+        self._transition(OPEN)
+        logger.warning(
+            f"Circuit breaker for {self.name} search opened for {self.open_duration}s"
+        )
+
+    def _open_remaining(self, now: float) -> float:
+        """開啟狀態剩餘的秒數(呼叫者需持有鎖)"""
+        return self._opened_at + self.open_duration - now
+
+    def _reject(self, retry_after: float) -> None:
+        """拒絕請求(呼叫者需持有鎖)"""
+        self.rejected += 1
+        circuit_breaker_rejections_total.inc(search_type=self.name)
+        raise CircuitOpenError(
+            f"Upstream {self.name} search is unavailable (circuit open)",
+            retry_after=retry_after,
+        )
+
+    def _transition(self, state: str) -> None:
+        """切換狀態並更新指標(呼叫者需持有鎖)"""
+        if state != self._state:
+            logger.info(f"Circuit breaker for {self.name} search is now {state}")
+        self._state = state
+        circuit_breaker_state.set(STATE_VALUES[state], search_type=self.name)
@@ -0,0 +1,300 @@
+"""
+上游請求的自適應並發限制
+"""
+
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+
+import httpx
+
+from src.core.config import settings
+from src.core.exceptions import ServiceUnavailableError
+from src.core.logging import logger
+from src.core.metrics import (
+    upstream_concurrency_in_flight,
+    upstream_concurrency_limit,
+    upstream_concurrency_rejected_total,
+)
+from src.services.upstream_timing import measured_duration, track_call_durations
+
+try:
+    from ddgs.exceptions import RatelimitException, TimeoutException
+except ImportError:
+    logger.error("DDGS not found. Please install with: pip install ddgs==9.4.3")
+    raise
+
+# 延遲升高時的縮減比例 (比限流錯誤溫和)
+LATENCY_BACKOFF_RATIO = 0.9
+# 平滑延遲的指數移動平均權重
+LATENCY_SMOOTHING = 0.2
+# 未指定呼叫種類時使用的延遲統計鍵
+DEFAULT_CALL_KEY = "default"
+
+
+class ConcurrencyLimitError(ServiceUnavailableError):
+    """等待上游並發名額逾時"""
+
+
+def is_overload(error: BaseException) -> bool:
+    """
+    判斷錯誤是否代表上游過載(限流或逾時)
+
+    Args:
+        error: 例外，會一併檢查被包裝的原始例外
+
+    Returns:
+        是否應縮減並發上限
+    """
+    original = error.__cause__ or error
+    if isinstance(
+        original, (RatelimitException, TimeoutException, httpx.TimeoutException)
+    ):
+        return True
+    return isinstance(original, httpx.HTTPStatusError) and (
+        original.response.status_code in (403, 429)
+    )
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    以AIMD演算法調整的上游並發上限
+
+    每次成功且平滑延遲未超過基準延遲(視窗內最小延遲)的latency_tolerance倍時，
+    上限增加1/limit，約每個上限數量的請求增加1；延遲超過容忍值時乘以0.9，
+    遇到限流或逾時錯誤時乘以backoff_ratio。在上次縮減前就已開始的請求不會
+    再次觸發縮減，避免同一波錯誤把上限降到最低。超過上限的請求排隊等待，
+    超過max_wait秒後以503拒絕。
+
+    基準與平滑延遲依呼叫種類(搜尋類型與操作)分別計算，避免較快的呼叫種類
+    使較慢的種類一直被視為延遲升高。上限從initial_limit開始逐步增加到
+    max_limit，讓冷啟動時不會立即以最大並發連線上游。
+    """
+
+    def __init__(
+        self,
+        initial_limit: int,
+        min_limit: int,
+        max_limit: int,
+        latency_tolerance: float,
+        backoff_ratio: float,
+        max_wait: float,
+        window: int = 100,
+        enabled: bool = True,
+    ):
+        self.initial_limit = initial_limit
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_tolerance = latency_tolerance
+        self.backoff_ratio = backoff_ratio
+        self.max_wait = max_wait
+        self.enabled = enabled
+        self.window = window
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._smoothed: Dict[str, float] = {}
+        self._waiters: Deque["asyncio.Future[None]"] = deque()
+        self.reset()
+
+    @property
+    def target(self) -> int:
+        """目前允許的並發上限"""
+        return max(self.min_limit, min(self.max_limit, int(self.limit)))
+
+    @property
+    def in_flight(self) -> int:
+        """目前進行中的上游請求數"""
+        return self._in_flight
+
+    async def acquire(self) -> None:
+        """
+        取得一個上游並發名額
+
+        Raises:
+            ConcurrencyLimitError: 當等待超過max_wait秒時
+        """
+        if self._in_flight < self.target and not self._waiters:
+            self._take()
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.max_wait)
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                # 名額已分配但請求已放棄，轉交給下一個等待者
+                self.release()
+            if isinstance(e, asyncio.TimeoutError):
+                self.rejected += 1
+                upstream_concurrency_rejected_total.inc()
+                raise ConcurrencyLimitError(
+                    f"Upstream concurrency limit {self.target} reached",
+                    retry_after=self.max_wait,
+                ) from e
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+    def release(self) -> None:
+        """歸還名額並喚醒等待中的請求"""
+        self._in_flight = max(0, self._in_flight - 1)
+        self._wake()
+
+    def record(
+        self,
+        started_at: float,
+        latency: float,
+        error: Optional[BaseException] = None,
+        key: str = DEFAULT_CALL_KEY,
+    ) -> None:
+        """
+        依一次上游呼叫的結果調整上限
+
+        在釋放名額前呼叫，進行中的請求數包含此次呼叫。
+
+        Args:
+            started_at: 呼叫開始的time.monotonic()值
+            latency: 呼叫耗時(秒)
+            error: 呼叫失敗時的例外
+            key: 呼叫種類，延遲基準依此分別計算
+        """
+        if error is not None:
+            if is_overload(error):
+                self._decrease(started_at, self.backoff_ratio, type(error).__name__)
+            return
+
+        latencies = self._latencies.setdefault(key, deque(maxlen=self.window))
+        latencies.append(latency)
+        smoothed = self._smoothed.get(key)
+        if smoothed is None:
+            smoothed = latency
+        else:
+            smoothed += LATENCY_SMOOTHING * (latency - smoothed)
+        self._smoothed[key] = smoothed
+
+        baseline = min(latencies)
+        if smoothed > baseline * self.latency_tolerance:
+            self._decrease(started_at, LATENCY_BACKOFF_RATIO, "latency")
+        elif self._in_flight >= self.target / 2:
+            # 只有實際用到上限時才增加，避免閒置時上限無意義地成長
+            self.limit = min(float(self.max_limit), self.limit + 1 / self.limit)
+            self._update()
+
+    @asynccontextmanager
+    async def slot(self, key: str = DEFAULT_CALL_KEY) -> AsyncIterator[None]:
+        """
+        在並發上限內執行區塊內的上游呼叫，並以其延遲與錯誤調整上限
+
+        延遲為區塊內經由call_duration_reporter回報的上游耗時，不包含執行緒池
+        佇列的等待時間；沒有回報時使用整個區塊的耗時。
+
+        Args:
+            key: 呼叫種類，例如"text.text_search"
+
+        Raises:
+            ConcurrencyLimitError: 當等待名額逾時時
+        """
+        if not self.enabled:
+            yield
+            return
+
+        await self.acquire()
+        started_at = time.monotonic()
+        try:
+            with track_call_durations() as durations:
+                try:
+                    yield
+                except Exception as e:
+                    self.record(
+                        started_at, measured_duration(durations, started_at), e, key
+                    )
+                    raise
+                else:
+                    self.record(
+                        started_at, measured_duration(durations, started_at), key=key
+                    )
+        finally:
+            self.release()
+
+    def reset(self) -> None:
+        """回到初始上限並清除統計"""
+        self.limit = float(max(self.min_limit, min(self.max_limit, self.initial_limit)))
+        self._in_flight = 0
+        self._latencies.clear()
+        self._smoothed.clear()
+        self._last_decrease = float("-inf")
+        for waiter in self._waiters:
+            waiter.cancel()
+        self._waiters.clear()
+        self.decreases = 0
+        self.rejected = 0
+        self._update()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        取得並發限制狀態
+
+        Returns:
+            包含目前上限、進行中與等待中請求數及各呼叫種類延遲基準的字典
+        """
+        return {
+            "enabled": self.enabled,
+            "limit": self.target,
+            "limit_exact": round(self.limit, 3),
+            "min_limit": self.min_limit,
+            "max_limit": self.max_limit,
+            "in_flight": self._in_flight,
+            "waiting": len(self._waiters),
+            "baseline_latency": {
+                key: round(min(latencies), 4)
+                for key, latencies in self._latencies.items()
+            },
+            "smoothed_latency": {
+                key: round(smoothed, 4) for key, smoothed in self._smoothed.items()
+            },
+            "decreases": self.decreases,
+            "rejected": self.rejected,
+        }
+
+    def _take(self) -> None:
+        """佔用一個名額"""
+        self._in_flight += 1
+        upstream_concurrency_in_flight.set(self._in_flight)
+
+    def _wake(self) -> None:
+        """在上限內依序喚醒等待者"""
+        while self._waiters and self._in_flight < self.target:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self._take()
+                waiter.set_result(None)
+        upstream_concurrency_in_flight.set(self._in_flight)
+
+    def _decrease(self, started_at: float, ratio: float, reason: str) -> None:
+        """以比例縮減上限，同一波請求只縮減一次"""
+        if started_at < self._last_decrease:
+            return
+        self._last_decrease = time.monotonic()
+        self.limit = max(float(self.min_limit), self.limit * ratio)
+        self.decreases += 1
+        logger.info(f"Upstream concurrency limit lowered to {self.target} ({reason})")
+        self._update()
+
+    def _update(self) -> None:
+        """更新上限指標"""
+        upstream_concurrency_limit.set(self.target)
+
+
+# 建立全域上游並發限制實例
+upstream_limiter = AdaptiveConcurrencyLimiter(
+    initial_limit=settings.ADAPTIVE_CONCURRENCY_INITIAL,
+    min_limit=settings.ADAPTIVE_CONCURRENCY_MIN,
+    max_limit=settings.ADAPTIVE_CONCURRENCY_MAX,
+    latency_tolerance=settings.ADAPTIVE_CONCURRENCY_LATENCY_TOLERANCE,
+    backoff_ratio=settings.ADAPTIVE_CONCURRENCY_BACKOFF,
+    max_wait=settings.ADAPTIVE_CONCURRENCY_MAX_WAIT,
+    enabled=settings.ADAPTIVE_CONCURRENCY_ENABLED,
+)
@@ -0,0 +1,265 @@
+"""
+以游標進行的深度分頁
+"""
+
+import asyncio
+import base64
+import json
+import secrets
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from src.core.config import settings
+from src.core.logging import logger
+from src.services.ddgs_service import DDGSService
+from src.services.dedup import ResultDeduplicator
+from src.services.pagination import UNIQUE_KEYS
+
+
+class Cursor(NamedTuple):
+    """
+    分頁游標的內容
+
+    offset是在該搜尋去除重複後的結果序列中的位置，與搜尋引擎每頁的筆數無關。
+    """
+
+    session_id: Optional[str]
+    offset: int
+    search: Dict[str, Any]
+
+
+def encode_cursor(cursor: Cursor) -> str:
+    """
+    將游標編碼為不透明的字串
+
+    游標包含原始搜尋條件，分頁狀態過期或由其他worker處理時仍可重建。
+
+    Args:
+        cursor: 游標內容
+
+    Returns:
+        URL安全的base64字串
+    """
+    payload = json.dumps(
+        [cursor.session_id, cursor.offset, cursor.search],
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    return base64.urlsafe_b64encode(payload.encode()).rstrip(b"=").decode()
+
+
+def decode_cursor(token: str) -> Cursor:
+    """
+    解碼游標字串
+
+    Args:
+        token: encode_cursor產生的字串
+
+    Returns:
+        游標內容
+
+    Raises:
+        ValueError: 當游標格式不正確時
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        session_id, offset, search = json.loads(base64.urlsafe_b64decode(padded))
+    except Exception:
+        raise ValueError("Invalid pagination cursor") from None
+    if (
+        not (session_id is None or isinstance(session_id, str))
+        or not isinstance(offset, int)
+        or offset < 0
+        or not isinstance(search, dict)
+    ):
+        raise ValueError("Invalid pagination cursor")
+    return Cursor(session_id, offset, search)
+
+
+def unique_filter(
+    search_type: str,
+) -> Callable[[List[Dict[str, Any]]], List[Dict[str, Any]]]:
+    """
+    取得跨分頁去除重複結果的函數
+
+    啟用RESULT_DEDUP_ENABLED時以正規化URL比對，否則與串流分頁相同，只比對原始URL。
+    """
+    if settings.RESULT_DEDUP_ENABLED:
+        return ResultDeduplicator(search_type).filter
+
+    unique_key = UNIQUE_KEYS.get(search_type, "url")
+    seen: set = set()
+
+    def fresh(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        unique = []
+        for result in results:
+            key = result.get(unique_key)
+            if key not in seen:
+                seen.add(key)
+                unique.append(result)
+        return unique
+
+    return fresh
+
+
+class PaginationSession:
+    """
+    單一搜尋的分頁狀態
+
+    保留已取得的結果與下一個要向上游要求的引擎頁碼，後續分頁只需取得新的上游
+    分頁；每個引擎分頁完整保留，游標依結果位移從緩衝區切出每頁。
+    """
+
+    def __init__(self, session_id: str, search_type: str, params: Dict[str, Any]):
+        self.session_id = session_id
+        self.search_type = search_type
+        self.params = params
+        self.buffer: List[Dict[str, Any]] = []
+        self.next_page = 1
+        self.exhausted = False
+        self.last_used = time.monotonic()
+        self.lock = asyncio.Lock()
+        self._unique = unique_filter(search_type)
+
+    async def fill(self, needed: int, max_depth: int) -> None:
+        """
+        向上游取得分頁直到緩衝區有needed筆結果或沒有更多結果
+
+        取得分頁時被取消不會破壞狀態，下次呼叫會重新要求同一頁。
+
+        Args:
+            needed: 需要的結果數
+            max_depth: 單一搜尋最多保留的結果數
+        """
+        while len(self.buffer) < needed and not self.exhausted:
+            results = await DDGSService.fetch_results_page(
+                self.search_type, self.next_page, **self.params
+            )
+            self.next_page += 1
+            fresh = self._unique(results)
+            self.buffer.extend(fresh)
+            if not fresh or len(self.buffer) >= max_depth:
+                del self.buffer[max_depth:]
+                self.exhausted = True
+
+
+class CursorPaginator:
+    """
+    管理分頁狀態，依游標回傳下一頁結果
+
+    狀態保存在記憶體中，超過ttl秒未使用或超過max_sessions個時淘汰最久未使用的；
+    找不到狀態時依游標中的搜尋條件重建。
+    """
+
+    def __init__(self, ttl: float, max_sessions: int, max_depth: int):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.max_depth = max_depth
+        self._sessions: "OrderedDict[str, PaginationSession]" = OrderedDict()
+        self.resumed = 0
+        self.rebuilt = 0
+
+    async def page(
+        self,
+        cursor: Cursor,
+        search_type: str,
+        params: Dict[str, Any],
+        page_size: int,
+    ) -> Tuple[List[Dict[str, Any]], Optional[Cursor]]:
+        """
+        取得游標位置之後的一頁結果
+
+        Args:
+            cursor: 游標，第一頁的session_id為None且offset為0
+            search_type: 搜尋類型 (text, images, news)
+            params: 搜尋參數(不含max_results)
+            page_size: 每頁結果數
+
+        Returns:
+            (該頁結果, 下一頁的游標)，沒有更多結果時游標為None
+        """
+        session = self._get(cursor.session_id, search_type, params)
+        if session is None:
+            if cursor.offset:
+                self.rebuilt += 1
+                logger.info(
+                    f"Rebuilding pagination state for {search_type} search "
+                    f"at offset {cursor.offset}"
+                )
+            session = self._open(search_type, params)
+        else:
+            self.resumed += 1
+
+        end = min(cursor.offset + page_size, self.max_depth)
+        async with session.lock:
+            await session.fill(end, self.max_depth)
+            session.last_used = time.monotonic()
+            results = session.buffer[cursor.offset : end]
+            has_more = len(session.buffer) > end or (
+                not session.exhausted and end < self.max_depth
+            )
+
+        next_cursor = (
+            Cursor(session.session_id, end, cursor.search) if has_more else None
+        )
+        return results, next_cursor
+
+    def clear(self) -> None:
+        """清除所有分頁狀態"""
+        self._sessions.clear()
+        self.resumed = 0
+        self.rebuilt = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        取得分頁狀態統計
+
+        Returns:
+            包含狀態數、續用與重建次數的字典
+        """
+        return {
+            "sessions": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "max_depth": self.max_depth,
+            "resumed": self.resumed,
+            "rebuilt": self.rebuilt,
+        }
+
+    def _get(
+        self, session_id: Optional[str], search_type: str, params: Dict[str, Any]
+    ) -> Optional[PaginationSession]:
+        """取得未過期且搜尋條件相同的分頁狀態"""
+        self._expire()
+        session = self._sessions.get(session_id) if session_id else None
+        if session is None:
+            return None
+        if session.search_type != search_type or session.params != params:
+            return None
+        self._sessions.move_to_end(session_id)
+        return session
+
+    def _open(self, search_type: str, params: Dict[str, Any]) -> PaginationSession:
+        """建立新的分頁狀態，超過上限時淘汰最久未使用的"""
+        session = PaginationSession(secrets.token_urlsafe(12), search_type, params)
+        self._sessions[session.session_id] = session
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+        return session
+
+    def _expire(self) -> None:
+        """移除超過ttl未使用的分頁狀態"""
+        cutoff = time.monotonic() - self.ttl
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if session.last_used > cutoff:
+                break
+            self._sessions.popitem(last=False)
+
+
+# 建立全域游標分頁實例
+search_paginator = CursorPaginator(
+    ttl=settings.PAGINATION_SESSION_TTL,
+    max_sessions=settings.PAGINATION_MAX_SESSIONS,
+    max_depth=settings.PAGINATION_MAX_DEPTH,
+)
@@ -0,0 +1,213 @@
+"""
+DDGS客戶端連線池
+"""
+
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from src.core.exceptions import ServiceUnavailableError
+from src.core.logging import logger
+
+
+class PoolExhaustedError(ServiceUnavailableError):
+    """在等待時間內無法取得可用的DDGS客戶端，回應503並附帶Retry-After"""
+
+
+class _PooledClient:
+    """連線池中的單一客戶端"""
+
+    __slots__ = ("context", "client", "created_at", "uses", "failures")
+
+    def __init__(self, factory: Callable[[], Any]):
+        self.context = factory()
+        self.client = self.context.__enter__()
+        self.created_at = time.monotonic()
+        self.uses = 0
+        self.failures = 0
+
+    def close(self) -> None:
+        """關閉客戶端，忽略關閉時的錯誤"""
+        try:
+            self.context.__exit__(None, None, None)
+        except Exception as e:
+            logger.warning(f"Failed to close DDGS client: {str(e)}")
+
+
+class DDGSClientPool:
+    """
+    可重複使用的長生命週期DDGS客戶端池
+
+    每個DDGS實例會快取其搜尋引擎與HTTP連線，重複使用可避免每次請求
+    重新建立TLS連線。未啟動時會退回每次請求建立新客戶端的行為。客戶端連續
+    max_failures次失敗時更換，is_failure判斷哪些錯誤計入失敗。
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], Any],
+        size: int,
+        max_age: float,
+        max_failures: int,
+        acquire_timeout: float,
+        is_failure: Callable[[BaseException], bool] = lambda error: True,
+    ):
+        self._factory = factory
+        self._is_failure = is_failure
+        self.size = size
+        self.max_age = max_age
+        self.max_failures = max_failures
+        self.acquire_timeout = acquire_timeout
+        self._idle: "queue.LifoQueue[_PooledClient]" = queue.LifoQueue()
+        self._lock = threading.RLock()
+        self._started = False
+        self._alive = 0
+        self.created = 0
+        self.recycled = 0
+
+    @property
+    def started(self) -> bool:
+        """連線池是否已啟動"""
+        return self._started
+
+    def start(self) -> None:
+        """預先建立所有客戶端並啟動連線池"""
+        with self._lock:
+            if self._started:
+                return
+            for _ in range(self.size):
+                self._idle.put(self._create())
+            self._started = True
+        logger.info(f"DDGS client pool started with {self.size} clients")
+
+    def close(self) -> None:
+        """關閉連線池並釋放所有閒置客戶端"""
+        with self._lock:
+            self._started = False
+            while True:
+                try:
+                    self._destroy(self._idle.get_nowait())
+                except queue.Empty:
+                    break
+        logger.info("DDGS client pool closed")
+
+    @contextmanager
+    def client(self) -> Iterator[Any]:
+        """
+        借用一個DDGS客戶端
+
+        Yields:
+            DDGS客戶端實例
+
+        Raises:
+            PoolExhaustedError: 在等待時間內沒有可用的客戶端
+        """
+        if not self._started:
+            with self._factory() as ddgs:
+                yield ddgs
+            return
+
+        try:
+            pooled = self._idle.get(timeout=self.acquire_timeout)
+        except queue.Empty:
+            raise PoolExhaustedError(
+                f"No DDGS client available within {self.acquire_timeout}s",
+                retry_after=max(1.0, self.acquire_timeout),
+            )
+
+        try:
+            yield pooled.client
+            pooled.failures = 0
+        except Exception as e:
+            # 查無結果等不代表客戶端有問題的錯誤不計入連續失敗次數
+            if self._is_failure(e):
+                pooled.failures += 1
+            raise
+        finally:
+            pooled.uses += 1
+            self._release(pooled)
+
+    def recycle_expired(self) -> int:
+        """
+        更換超過最大存活時間的閒置客戶端，並補足先前建立失敗的客戶端
+
+        Returns:
+            被更換的客戶端數量
+        """
+        recycled = 0
+        for _ in range(self._idle.qsize()):
+            try:
+                pooled = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if self._is_expired(pooled):
+                self._destroy(pooled)
+                pooled = self._create()
+                recycled += 1
+            self._idle.put(pooled)
+        while self._started and self._alive < self.size:
+            self._idle.put(self._create())
+        self.recycled += recycled
+        return recycled
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        取得連線池統計資訊
+
+        Returns:
+            包含大小、閒置數量與更換次數的字典
+        """
+        return {
+            "started": self._started,
+            "size": self.size,
+            "alive": self._alive,
+            "idle": self._idle.qsize(),
+            "created": self.created,
+            "recycled": self.recycled,
+        }
+
+    def _create(self) -> _PooledClient:
+        """建立新的客戶端"""
+        pooled = _PooledClient(self._factory)
+        with self._lock:
+            self.created += 1
+            self._alive += 1
+        return pooled
+
+    def _destroy(self, pooled: _PooledClient) -> None:
+        """關閉客戶端"""
+        pooled.close()
+        with self._lock:
+            self._alive -= 1
+
+    def _is_expired(self, pooled: _PooledClient) -> bool:
+        """判斷客戶端是否已過期或不健康"""
+        return (
+            pooled.failures >= self.max_failures
+            or time.monotonic() - pooled.created_at >= self.max_age
+        )
+
+    def _release(self, pooled: _PooledClient) -> None:
+        """歸還客戶端，不健康或過期的客戶端會被替換"""
+        if not self._started:
+            self._destroy(pooled)
+            return
+
+        replacement: Optional[_PooledClient] = pooled
+        if self._is_expired(pooled):
+            logger.info(
+                f"Recycling DDGS client after {pooled.uses} uses "
+                f"({pooled.failures} consecutive failures)"
+            )
+            self._destroy(pooled)
+            self.recycled += 1
+            try:
+                replacement = self._create()
+            except Exception as e:
+                logger.error(f"Failed to create DDGS client: {str(e)}")
+                replacement = None
+
+        if replacement is not None:
+            self._idle.put(replacement)
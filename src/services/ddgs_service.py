@@ -3,19 +3,174 @@ DuckDuckGo搜尋服務
 """
 
 import asyncio
-from typing import List, Dict, Any, Optional, Callable
+import time
+from functools import partial
+from typing import AsyncIterator, List, Dict, Any, Optional, Callable
+from src.core.config import settings
+from src.core.exceptions import DeadlineExceededError, ServiceUnavailableError
 from src.core.logging import logger
+from src.core.metrics import (
+    search_duration_seconds,
+    search_errors_total,
+    search_normalized_total,
+    search_requests_total,
+    search_result_count,
+    upstream_duration_seconds,
+    upstream_in_flight,
+)
+from src.services.archive import search_archive
+from src.services.async_backend import async_backend
+from src.services.cache import make_cache_key, search_cache
+from src.services.circuit_breaker import CircuitBreaker
+from src.services.concurrency import upstream_limiter
+from src.services.ddgs_pool import DDGSClientPool
+from src.services.executor import search_executor
+from src.services.hedging import search_hedger
+from src.services.normalization import normalize_params, was_rewritten
+from src.services.pagination import paginate
+from src.services.replay import upstream_tape
+from src.services.singleflight import search_flight
+from src.services.upstream_timing import call_duration_reporter
 
 try:
     from ddgs import DDGS
+    from ddgs.exceptions import DDGSException
 except ImportError:
     logger.error("DDGS not found. Please install with: pip install ddgs==9.4.3")
     raise
 
 
+# 支援的搜尋類型
+SEARCH_TYPES = ("text", "images", "news")
+
+
+def is_upstream_failure(error: BaseException) -> bool:
+    """
+    判斷錯誤是否代表上游故障，用於斷路器與客戶端池的健康判斷
+
+    查詢本身沒有結果時DDGS也會拋出DDGSException，這不代表上游有問題；
+    超過客戶端指定的截止時間同樣不計入。
+
+    Args:
+        error: 例外
+
+    Returns:
+        是否應計入斷路器與客戶端池的失敗次數
+    """
+    original = error.__cause__ or error
+    if isinstance(original, DeadlineExceededError):
+        return False
+    return not (
+        type(original) is DDGSException and str(original) == "No results found."
+    )
+
+
+# 建立全域DDGS客戶端池，由應用程式生命週期啟動與關閉
+ddgs_pool = DDGSClientPool(
+    factory=lambda: DDGS(),
+    size=settings.DDGS_POOL_SIZE,
+    max_age=settings.DDGS_POOL_MAX_AGE,
+    max_failures=settings.DDGS_POOL_MAX_FAILURES,
+    acquire_timeout=settings.DDGS_POOL_ACQUIRE_TIMEOUT,
+    is_failure=is_upstream_failure,
+)
+
+# 建立各搜尋類型的上游斷路器
+circuit_breakers = {
+    search_type: CircuitBreaker(
+        name=search_type,
+        window=settings.CIRCUIT_BREAKER_WINDOW,
+        min_calls=settings.CIRCUIT_BREAKER_MIN_CALLS,
+        failure_rate=settings.CIRCUIT_BREAKER_FAILURE_RATE,
+        slow_call_seconds=settings.CIRCUIT_BREAKER_SLOW_CALL_SECONDS,
+        open_duration=settings.CIRCUIT_BREAKER_OPEN_SECONDS,
+        half_open_calls=settings.CIRCUIT_BREAKER_HALF_OPEN_CALLS,
+        enabled=settings.CIRCUIT_BREAKER_ENABLED,
+    )
+    for search_type in SEARCH_TYPES
+}
+
+
+def timed_upstream(
+    search_type: str, operation_func: Callable[..., List[Dict[str, Any]]]
+) -> Callable[..., List[Dict[str, Any]]]:
+    """
+    包裝DDGS操作函數，在工作執行緒內記錄上游呼叫時間
+
+    計時在執行緒內開始，因此不包含並發名額與執行緒池佇列的等待時間，耗時也會
+    回報給外層的斷路器與並發限制；上游錄製或重播時經由upstream_tape呼叫。
+    包裝函數的upstream_key屬性("搜尋類型.操作名稱")是並發限制的延遲統計鍵。
+
+    Args:
+        search_type: 搜尋類型 (text, images, news)
+        operation_func: DDGS操作函數
+
+    Returns:
+        記錄指標後呼叫原函數的包裝函數
+    """
+
+    operation = getattr(operation_func, "__name__", "call")
+
+    def call(*args: Any, **kwargs: Any) -> List[Dict[str, Any]]:
+        report_duration = call_duration_reporter()
+        with upstream_in_flight.track_inprogress(search_type=search_type):
+            with upstream_duration_seconds.time(
+                search_type=search_type, backend="thread"
+            ):
+                start = time.monotonic()
+                try:
+                    return upstream_tape.run(
+                        search_type,
+                        operation,
+                        kwargs,
+                        partial(operation_func, *args, **kwargs),
+                    )
+                finally:
+                    report_duration(time.monotonic() - start)
+
+    call.upstream_key = f"{search_type}.{operation}"  # type: ignore[attr-defined]
+    return call
+
+
+def error_name(error: BaseException) -> str:
+    """
+    取得錯誤的原始例外類別名稱，用於錯誤指標
+
+    Args:
+        error: 例外
+
+    Returns:
+        被包裝前的例外類別名稱
+    """
+    return type(error.__cause__ or error).__name__
+
+
+async def store_results(
+    search_type: str, key: str, results: List[Dict[str, Any]]
+) -> None:
+    """
+    將搜尋結果寫入快取與磁碟封存(封存為背景寫入)
+
+    會阻塞的快取後端(例如SQLite)在執行緒中寫入，不阻塞事件迴圈。
+
+    Args:
+        search_type: 搜尋類型 (text, images, news)
+        key: 快取鍵
+        results: 搜尋結果
+    """
+    if not settings.CACHE_ENABLED:
+        return
+    await search_cache.aset(key, results, search_type)
+    if search_archive is not None:
+        search_archive.set(key, results, search_type)
+
+
 class DDGSService:
     """DuckDuckGo搜尋服務類"""
 
+    # 正在背景更新的過時快取項目
+    _revalidations: Dict[str, "asyncio.Future[Any]"] = {}
+
     @staticmethod
     async def safe_ddgs_operation(
         operation_func: Callable[..., List[Dict[str, Any]]], *args, **kwargs
@@ -32,16 +187,493 @@ class DDGSService:
             搜尋結果列表
 
         Raises:
+            ServiceUnavailableError: 當搜尋執行緒池已滿或等待上游並發名額逾時時
             Exception: 當DDGS操作失敗時
         """
+        key = getattr(
+            operation_func,
+            "upstream_key",
+            getattr(operation_func, "__name__", "call"),
+        )
         try:
-            # 在線程池中執行同步的DDGS操作
-            loop = asyncio.get_event_loop()
-            result = await loop.run_in_executor(None, operation_func, *args, **kwargs)
+            # 在自適應並發上限內，於專用線程池中執行同步的DDGS操作
+            async with upstream_limiter.slot(key):
+                result = await search_executor.run(
+                    partial(operation_func, *args, **kwargs)
+                )
             return result
+        except ServiceUnavailableError as e:
+            logger.warning(f"DDGS operation rejected: {str(e)}")
+            raise
         except Exception as e:
             logger.error(f"DDGS operation failed: {str(e)}")
-            raise Exception(f"Search operation failed: {str(e)}")
+            raise Exception(f"Search operation failed: {str(e)}") from e
+
+    @staticmethod
+    async def safe_async_operation(
+        search_type: str, **params: Any
+    ) -> List[Dict[str, Any]]:
+        """
+        使用原生非同步後端執行搜尋，處理可能的異常
+
+        Args:
+            search_type: 搜尋類型 (text, images, news)
+            **params: 搜尋參數
+
+        Returns:
+            搜尋結果列表
+
+        Raises:
+            Exception: 當搜尋失敗時
+        """
+        logger.info(
+            f"Starting async {search_type} search for query: {params.get('query')}"
+        )
+        try:
+            async with upstream_limiter.slot(f"{search_type}.async_search"):
+                return await async_backend.search(search_type, **params)
+        except ServiceUnavailableError as e:
+            logger.warning(f"Async search rejected: {str(e)}")
+            raise
+        except Exception as e:
+            logger.error(f"Async search operation failed: {str(e)}")
+            raise Exception(f"Search operation failed: {str(e)}") from e
+
+    @classmethod
+    async def fetch_upstream(
+        cls, search_type: str, **params: Any
+    ) -> List[Dict[str, Any]]:
+        """
+        依設定的搜尋後端向上游取得結果(不經過快取)
+
+        Args:
+            search_type: 搜尋類型 (text, images, news)
+            **params: 搜尋參數
+
+        Returns:
+            搜尋結果列表
+
+        Raises:
+            CircuitOpenError: 當該搜尋類型的斷路器開啟時
+        """
+        with circuit_breakers[search_type].guard(is_upstream_failure):
+            if settings.HEDGE_ENABLED:
+                return await search_hedger.run(
+                    search_type,
+                    partial(cls.fetch_primary, search_type, **params),
+                    partial(cls.fetch_hedge, search_type, **params),
+                )
+            return await cls.fetch_primary(search_type, **params)
+
+    @classmethod
+    async def fetch_primary(
+        cls, search_type: str, **params: Any
+    ) -> List[Dict[str, Any]]:
+        """
+        使用設定的搜尋後端向上游取得結果
+
+        Args:
+            search_type: 搜尋類型 (text, images, news)
+            **params: 搜尋參數
+
+        Returns:
+            搜尋結果列表
+        """
+        if settings.SEARCH_BACKEND == "async":
+            return await cls.safe_async_operation(search_type, **params)
+        return await cls.safe_ddgs_operation(
+            timed_upstream(search_type, cls.get_operation(search_type)), **params
+        )
+
+    @classmethod
+    async def fetch_hedge(cls, search_type: str, **params: Any) -> List[Dict[str, Any]]:
+        """
+        使用HEDGE_BACKEND與HEDGE_REGION設定向上游送出避險請求
+
+        Args:
+            search_type: 搜尋類型 (text, images, news)
+            **params: 搜尋參數
+
+        Returns:
+            搜尋結果列表
+        """
+        if settings.HEDGE_REGION:
+            params = {**params, "region": settings.HEDGE_REGION}
+        logger.info(
+            f"Hedging {search_type} search via {settings.HEDGE_BACKEND} backend "
+            f"for query: {params.get('query')}"
+        )
+        if settings.HEDGE_BACKEND == "async":
+            return await cls.safe_async_operation(search_type, **params)
+        return await cls.safe_ddgs_operation(
+            timed_upstream(search_type, cls.fetch_with_backend),
+            search_type,
+            backend=settings.HEDGE_BACKEND,
+            **params,
+        )
+
+    @classmethod
+    async def search(cls, search_type: str, **params: Any) -> List[Dict[str, Any]]:
+        """
+        執行搜尋，優先使用快取結果並合併相同的並發請求
+
+        Args:
+            search_type: 搜尋類型 (text, images, news)
+            **params: 對應搜尋函數的關鍵字參數
+
+        Returns:
+            搜尋結果列表
+
+        Raises:
+            ValueError: 當搜尋類型不支援時
+            ServiceUnavailableError: 當服務暫時無法處理請求或斷路器開啟時
+            Exception: 當DDGS操作失敗時
+        """
+        if search_type not in SEARCH_TYPES:
+            raise ValueError(f"Unsupported search type: {search_type}")
+
+        raw_params = params
+        params = normalize_params(params)
+        key = make_cache_key(search_type, params)
+        # 記錄正規化改寫了查詢的搜尋，命中與合併的比例即為正規化帶來的提升
+        normalized = was_rewritten(raw_params, params)
+
+        with search_duration_seconds.time(search_type=search_type):
+            cached = await cls.cached_results(search_type, key, params)
+            if cached is not None:
+                if normalized:
+                    search_normalized_total.inc(
+                        search_type=search_type, outcome="cache_hit"
+                    )
+                return cached
+
+            if normalized:
+                search_normalized_total.inc(
+                    search_type=search_type,
+                    outcome=(
+                        "coalesced" if search_flight.has_pending(key) else "upstream"
+                    ),
+                )
+            try:
+                # 相同參數的並發請求共用同一次上游呼叫
+                results = await search_flight.do(
+                    key, partial(cls.fetch_and_store, search_type, key, params)
+                )
+            except Exception as e:
+                search_errors_total.inc(
+                    search_type=search_type, exception=error_name(e)
+                )
+                raise
+
+            search_result_count.observe(len(results), search_type=search_type)
+            return results
+
+    @classmethod
+    async def cached_results(
+        cls, search_type: str, key: str, params: Dict[str, Any]
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        讀取快取結果，記憶體(或共用)快取未命中時再查詢磁碟封存；已過時的項目
+        照常回傳並在背景更新
+
+        封存的未過時項目會以剩餘的TTL提升到快取，後續請求不需再讀取磁碟。
+
+        斷路器開啟時不在背景更新，並且連超過硬性期限但尚未清除的項目也會回傳。
+
+        Args:
+            search_type: 搜尋類型 (text, images, news)
+            key: 快取鍵
+            params: 搜尋參數
+
+        Returns:
+            快取的搜尋結果，未命中或未啟用快取時為None
+        """
+        if not settings.CACHE_ENABLED:
+            search_requests_total.inc(search_type=search_type, cache="disabled")
+            return None
+
+        degraded = circuit_breakers[search_type].is_open()
+        tier = "hit"
+        entry = await search_cache.alookup(key, include_expired=degraded)
+        if entry is None and search_archive is not None:
+            tier = "archive"
+            archived = await search_archive.aread(key, include_expired=degraded)
+            if archived is not None:
+                archived_results, fresh_until = archived
+                remaining = fresh_until - time.time()
+                entry = (archived_results, remaining <= 0)
+                if remaining > 0:
+                    await search_cache.aset(
+                        key, archived_results, search_type, ttl=remaining
+                    )
+        if entry is None:
+            search_requests_total.inc(search_type=search_type, cache="miss")
+            return None
+
+        results, stale = entry
+        if stale and not degraded:
+            cls.revalidate(search_type, key, params)
+        logger.info(
+            f"Cache {'stale hit' if stale else 'hit'} ({tier}) for {search_type} "
+            f"search: {params.get('query')}"
+        )
+        search_requests_total.inc(
+            search_type=search_type, cache="stale" if stale else tier
+        )
+        search_result_count.observe(len(results), search_type=search_type)
+        return results
+
+    @classmethod
+    async def fetch_and_store(
+        cls, search_type: str, key: str, params: Dict[str, Any]
+    ) -> List[Dict[str, Any]]:
+        """
+        向上游取得結果並寫入快取
+
+        Args:
+            search_type: 搜尋類型 (text, images, news)
+            key: 快取鍵
+            params: 搜尋參數
+
+        Returns:
+            搜尋結果列表
+        """
+        results = await cls.fetch_upstream(search_type, **params)
+        await store_results(search_type, key, results)
+        return results
+
+    @classmethod
+    def revalidate(cls, search_type: str, key: str, params: Dict[str, Any]) -> None:
+        """
+        在背景更新過時的快取項目，同一個鍵同時只有一個更新工作
+
+        Args:
+            search_type: 搜尋類型 (text, images, news)
+            key: 快取鍵
+            params: 搜尋參數
+        """
+        if key in cls._revalidations:
+            return
+
+        task = asyncio.ensure_future(
+            search_flight.do(
+                key, partial(cls.fetch_and_store, search_type, key, params)
+            )
+        )
+        cls._revalidations[key] = task
+
+        def done(finished: "asyncio.Future[Any]") -> None:
+            cls._revalidations.pop(key, None)
+            if not finished.cancelled() and finished.exception() is not None:
+                logger.warning(
+                    f"Background refresh failed for {search_type} search "
+                    f"{params.get('query')}: {str(finished.exception())}"
+                )
+
+        task.add_done_callback(done)
+
+    @classmethod
+    async def stream(
+        cls, search_type: str, deadline: Optional[float] = None, **params: Any
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        逐頁串流搜尋結果，快取命中時一次產生全部結果
+
+        完整讀取後的結果會寫入快取；呼叫者提前停止或超過截止時間時不會向上游
+        要求後續分頁，已取得的部分結果也不會寫入快取。
+
+        Args:
+            search_type: 搜尋類型 (text, images, news)
+            deadline: 截止時間(time.monotonic)，None表示不限制
+            **params: 對應搜尋函數的關鍵字參數
+
+        Yields:
+            每一頁的搜尋結果
+
+        Raises:
+            ValueError: 當搜尋類型不支援時
+            ServiceUnavailableError: 當服務暫時無法處理請求時
+            DeadlineExceededError: 當超過截止時間時
+            Exception: 當DDGS操作失敗時
+        """
+        if search_type not in SEARCH_TYPES:
+            raise ValueError(f"Unsupported search type: {search_type}")
+
+        params = normalize_params(params)
+        key = make_cache_key(search_type, params)
+        cached = await cls.cached_results(search_type, key, params)
+        if cached is not None:
+            yield cached
+            return
+
+        if settings.SEARCH_BACKEND == "async":
+            pages = async_backend.iter_pages(search_type, deadline, **params)
+        else:
+            pages = cls._iter_thread_pages(search_type, deadline, **params)
+
+        collected: List[Dict[str, Any]] = []
+        try:
+            with circuit_breakers[search_type].guard(is_upstream_failure):
+                async for page in pages:
+                    collected.extend(page)
+                    yield page
+        except Exception as e:
+            search_errors_total.inc(search_type=search_type, exception=error_name(e))
+            raise
+
+        search_result_count.observe(len(collected), search_type=search_type)
+        await store_results(search_type, key, collected)
+
+    @classmethod
+    async def _iter_thread_pages(
+        cls, search_type: str, deadline: Optional[float] = None, **params: Any
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        使用執行緒後端逐頁取得結果，每個上游分頁為一個獨立的執行緒池工作
+
+        DDGS的page是搜尋引擎自己的分頁(例如圖片每頁100筆、新聞30筆)，指定
+        max_results只會截斷該頁而不會改變下一頁的起點，因此每次取得完整的引擎
+        分頁，再以STREAM_PAGE_SIZE筆為單位切片產生；每頁剩餘不足一片的結果在要求
+        下一頁前先產生，逾時中止時不會遺失已取得的結果。
+        """
+        max_results = params.pop("max_results", None) or 10
+        page_size = min(settings.STREAM_PAGE_SIZE, max_results)
+
+        async def fetch(page: int) -> List[Dict[str, Any]]:
+            return await cls.safe_ddgs_operation(
+                timed_upstream(search_type, cls.fetch_page),
+                search_type,
+                page=page,
+                max_results=None,
+                **params,
+            )
+
+        async for results in paginate(fetch, search_type, max_results, deadline):
+            for start in range(0, len(results), page_size):
+                yield results[start : start + page_size]
+
+    @classmethod
+    async def fetch_results_page(
+        cls, search_type: str, page: int, **params: Any
+    ) -> List[Dict[str, Any]]:
+        """
+        取得搜尋引擎的一個完整分頁(例如圖片100筆、新聞30筆)，結果依頁碼個別快取
+
+        DDGS的max_results只會截斷引擎分頁而不改變下一頁的起點，因此不指定筆數；
+        呼叫者以結果的位移而非引擎頁碼記錄分頁位置。
+
+        Args:
+            search_type: 搜尋類型 (text, images, news)
+            page: 引擎頁碼，從1開始
+            **params: 搜尋參數(不含max_results)
+
+        Returns:
+            該頁的搜尋結果列表，後續分頁沒有結果時為空列表
+
+        Raises:
+            ValueError: 當搜尋類型不支援時
+            ServiceUnavailableError: 當服務暫時無法處理請求或斷路器開啟時
+            Exception: 當DDGS操作失敗時
+        """
+        if search_type not in SEARCH_TYPES:
+            raise ValueError(f"Unsupported search type: {search_type}")
+
+        params = normalize_params(params)
+        key = make_cache_key(search_type, {**params, "engine_page": page})
+        if settings.CACHE_ENABLED:
+            cached = await search_cache.aget(key)
+            if cached is not None:
+                return cached
+
+        try:
+            with circuit_breakers[search_type].guard(is_upstream_failure):
+                if settings.SEARCH_BACKEND == "async":
+                    async with upstream_limiter.slot(f"{search_type}.async_page"):
+                        results = await async_backend.fetch_page(
+                            search_type, page, **params
+                        )
+                else:
+                    results = await cls.safe_ddgs_operation(
+                        timed_upstream(search_type, cls.fetch_page),
+                        search_type,
+                        page=page,
+                        max_results=None,
+                        **params,
+                    )
+        except Exception as e:
+            search_errors_total.inc(search_type=search_type, exception=error_name(e))
+            raise
+
+        await store_results(search_type, key, results)
+        return results
+
+    @staticmethod
+    def fetch_page(
+        search_type: str, query: str, page: int = 1, **params: Any
+    ) -> List[Dict[str, Any]]:
+        """
+        取得單頁DDGS搜尋結果
+
+        Args:
+            search_type: 搜尋類型 (text, images, news)
+            query: 搜尋關鍵字
+            page: 頁碼，從1開始
+            **params: 其他DDGS搜尋參數
+
+        Returns:
+            該頁的搜尋結果列表，後續分頁沒有結果時為空列表
+        """
+        logger.info(f"Fetching DDGS {search_type} page {page} for query: {query}")
+
+        with ddgs_pool.client() as ddgs:
+            try:
+                return getattr(ddgs, search_type)(query, page=page, **params)
+            except DDGSException:
+                if page > 1:
+                    return []
+                raise
+
+    @staticmethod
+    def fetch_with_backend(
+        search_type: str, query: str, backend: str, **params: Any
+    ) -> List[Dict[str, Any]]:
+        """
+        使用指定的DDGS backend執行搜尋
+
+        Args:
+            search_type: 搜尋類型 (text, images, news)
+            query: 搜尋關鍵字
+            backend: DDGS backend名稱，例如duckduckgo或以逗號分隔的多個後端
+            **params: 其他DDGS搜尋參數
+
+        Returns:
+            搜尋結果列表
+        """
+        with ddgs_pool.client() as ddgs:
+            return getattr(ddgs, search_type)(query, backend=backend, **params)
+
+    @staticmethod
+    def get_operation(search_type: str) -> Callable[..., List[Dict[str, Any]]]:
+        """
+        取得搜尋類型對應的DDGS操作函數
+
+        Args:
+            search_type: 搜尋類型 (text, images, news)
+
+        Returns:
+            DDGS操作函數
+
+        Raises:
+            ValueError: 當搜尋類型不支援時
+        """
+        operations = {
+            "text": DDGSService.text_search,
+            "images": DDGSService.image_search,
+            "news": DDGSService.news_search,
+        }
+        if search_type not in operations:
+            raise ValueError(f"Unsupported search type: {search_type}")
+        return operations[search_type]
 
     @staticmethod
     def text_search(
@@ -67,7 +699,7 @@ class DDGSService:
         logger.info(f"Starting DDGS text search for query: {query}")
 
         try:
-            with DDGS() as ddgs:
+            with ddgs_pool.client() as ddgs:
                 results = list(
                     ddgs.text(
                         query,  # query as positional argument
@@ -117,7 +749,7 @@ class DDGSService:
         logger.info(f"Starting DDGS image search for query: {query}")
 
         try:
-            with DDGS() as ddgs:
+            with ddgs_pool.client() as ddgs:
                 results = list(
                     ddgs.images(
                         query,  # 作為位置參數
@@ -165,7 +797,7 @@ class DDGSService:
         logger.info(f"Starting DDGS news search for query: {query}")
 
         try:
-            with DDGS() as ddgs:
+            with ddgs_pool.client() as ddgs:
                 results = list(
                     ddgs.news(
                         query,  # 作為位置參數
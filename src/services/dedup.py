@@ -0,0 +1,208 @@
+"""
+搜尋結果的URL正規化與去重
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from src.core.metrics import search_duplicates_removed_total
+
+# 追蹤用的查詢參數，不影響頁面內容
+TRACKING_PARAMS = frozenset(
+    {
+        "_ga",
+        "_gl",
+        "cmpid",
+        "dclid",
+        "fbclid",
+        "gclid",
+        "guccounter",
+        "igshid",
+        "mc_cid",
+        "mc_eid",
+        "msclkid",
+        "ocid",
+        "ref_src",
+        "ref_url",
+        "spm",
+        "srsltid",
+        "yclid",
+    }
+)
+TRACKING_PREFIXES = ("utm_",)
+
+# 指向相同內容的鏡像主機前綴，只在移除後仍剩兩個以上標籤時移除
+# (mobile.de、amp.dev本身就是網域)
+MIRROR_HOST_PREFIXES = ("www.", "m.", "mobile.", "amp.")
+
+# 各搜尋類型用於去重的URL欄位，依優先順序排列
+RESULT_URL_FIELDS: Dict[str, Tuple[str, ...]] = {
+    "text": ("href",),
+    "images": ("image", "url"),
+    "news": ("url",),
+}
+
+
+def is_tracking_param(name: str) -> bool:
+    """判斷查詢參數是否為追蹤參數"""
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+
+def strip_tracking_params(url: str) -> str:
+    """
+    移除URL中的追蹤參數，其餘部分保持不變
+
+    Args:
+        url: 原始URL
+
+    Returns:
+        移除追蹤參數後的URL
+    """
+    if "?" not in url:
+        return url
+    parts = urlsplit(url)
+    params = parse_qsl(parts.query, keep_blank_values=True)
+    kept = [(name, value) for name, value in params if not is_tracking_param(name)]
+    if len(kept) == len(params):
+        return url
+    return urlunsplit(parts._replace(query=urlencode(kept)))
+
+
+def canonical_url(url: str) -> str:
+    """
+    產生URL的正規化形式，用於判斷重複
+
+    忽略協定(http/https)、主機大小寫、鏡像主機前綴、預設埠號、結尾斜線、
+    片段、追蹤參數與查詢參數順序。鏡像主機前綴只在移除後仍剩兩個以上標籤時
+    移除，避免把mobile.de變成de。
+
+    Args:
+        url: 原始URL
+
+    Returns:
+        正規化後的URL鍵值，無法解析時為去除空白的原始字串
+    """
+    url = url.strip()
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return url
+    host = parts.hostname
+    if not host:
+        return url
+
+    for prefix in MIRROR_HOST_PREFIXES:
+        if host.startswith(prefix):
+            remainder = host[len(prefix) :]
+            if remainder.count(".") >= 1:
+                host = remainder
+            break
+    if port and port not in (80, 443):
+        host = f"{host}:{port}"
+
+    path = parts.path.rstrip("/")
+    params = sorted(
+        (name, value)
+        for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not is_tracking_param(name)
+    )
+    if params:
+        return f"{host}{path}?{urlencode(params)}"
+    return f"{host}{path}"
+
+
+class ResultDeduplicator:
+    """
+    以正規化URL去除重複的搜尋結果
+
+    已見過的鍵值在多次呼叫filter之間保留，因此可用於串流時跨分頁去重。
+    """
+
+    def __init__(self, search_type: str):
+        self.search_type = search_type
+        self.fields = RESULT_URL_FIELDS.get(search_type, ())
+        self.removed = 0
+        self._seen: Set[str] = set()
+
+    def key(self, result: Dict[str, Any]) -> Optional[str]:
+        """
+        取得結果的去重鍵值
+
+        Args:
+            result: DDGS搜尋結果
+
+        Returns:
+            第一個非空URL欄位的正規化形式，沒有URL時為None
+        """
+        for field in self.fields:
+            url = result.get(field)
+            if url:
+                return canonical_url(url)
+        return None
+
+    def filter(self, results: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        以單次線性掃描去除重複結果，並移除保留結果URL中的追蹤參數
+
+        不會修改傳入的結果物件(可能來自快取)。
+
+        Args:
+            results: DDGS搜尋結果
+
+        Returns:
+            去重後的結果列表，保持原始順序
+        """
+        unique: List[Dict[str, Any]] = []
+        removed = 0
+        for result in results:
+            key = self.key(result)
+            if key is not None:
+                if key in self._seen:
+                    removed += 1
+                    continue
+                self._seen.add(key)
+            unique.append(self.clean(result))
+
+        if removed:
+            self.removed += removed
+            search_duplicates_removed_total.inc(removed, search_type=self.search_type)
+        return unique
+
+    def clean(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        移除結果URL欄位中的追蹤參數
+
+        Args:
+            result: DDGS搜尋結果
+
+        Returns:
+            有變更時為新的字典，否則為原物件
+        """
+        cleaned = result
+        for field in RESULT_URL_FIELDS.get(self.search_type, ()):
+            url = result.get(field)
+            if url:
+                stripped = strip_tracking_params(url)
+                if stripped != url:
+                    if cleaned is result:
+                        cleaned = dict(result)
+                    cleaned[field] = stripped
+        return cleaned
+
+
+def dedupe_results(
+    search_type: str, results: Iterable[Dict[str, Any]]
+) -> List[Dict[str, Any]]:
+    """
+    去除重複的搜尋結果
+
+    Args:
+        search_type: 搜尋類型 (text, images, news)
+        results: DDGS搜尋結果
+
+    Returns:
+        去重後的結果列表
+    """
+    return ResultDeduplicator(search_type).filter(results)
@@ -0,0 +1,156 @@
+"""
+搜尋專用的有界執行緒池
+"""
+
+import asyncio
+import contextvars
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from src.core.config import settings
+from src.core.exceptions import ServiceUnavailableError
+from src.core.metrics import executor_queue_wait_seconds, executor_rejected_total
+
+
+class ExecutorSaturatedError(ServiceUnavailableError):
+    """執行緒池佇列已滿，拒絕新的工作"""
+
+
+class BoundedExecutor:
+    """
+    具有佇列上限與准入控制的執行緒池
+
+    正在執行與等待中的工作總數超過上限時立即拒絕，避免突發流量下累積
+    無上限的等待工作。
+    """
+
+    def __init__(
+        self,
+        max_workers: int,
+        max_queue: int,
+        retry_after: float,
+        thread_name_prefix: str = "search",
+    ):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self.thread_name_prefix = thread_name_prefix
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.started = 0
+        self.completed = 0
+        self.rejected = 0
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+
+    @property
+    def capacity(self) -> int:
+        """可同時接受的工作總數"""
+        return self.max_workers + self.max_queue
+
+    @property
+    def pending(self) -> int:
+        """正在執行與等待中的工作數"""
+        return self._pending
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """
+        在執行緒池中執行同步函數，函數在呼叫者的context副本中執行
+
+        Args:
+            func: 同步函數
+            *args: 位置參數
+
+        Returns:
+            函數的回傳值
+
+        Raises:
+            ExecutorSaturatedError: 當佇列已滿時
+        """
+        with self._lock:
+            if self._pending >= self.capacity:
+                self.rejected += 1
+                executor_rejected_total.inc()
+                raise ExecutorSaturatedError(
+                    f"Search capacity exhausted ({self._pending} pending)",
+                    retry_after=self.retry_after,
+                )
+            self._pending += 1
+
+        submitted_at = time.monotonic()
+        context = contextvars.copy_context()
+
+        def call() -> Any:
+            self._record_wait(time.monotonic() - submitted_at)
+            return context.run(func, *args)
+
+        try:
+            future = self._get_executor().submit(call)
+        except BaseException:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def shutdown(self) -> None:
+        """關閉執行緒池，下次使用時會重新建立"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        取得執行緒池統計資訊
+
+        Returns:
+            包含容量、等待數量、拒絕次數與佇列等待時間的字典
+        """
+        return {
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "pending": self._pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "queue_wait_avg": (
+                round(self.queue_wait_total / self.started, 6) if self.started else 0.0
+            ),
+            "queue_wait_max": round(self.queue_wait_max, 6),
+            "saturation": round(self._pending / self.capacity, 4),
+        }
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """取得或延遲建立執行緒池"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix=self.thread_name_prefix,
+                )
+            return self._executor
+
+    def _record_wait(self, wait: float) -> None:
+        """記錄工作在佇列中的等待時間"""
+        with self._lock:
+            self.started += 1
+            self.queue_wait_total += wait
+            self.queue_wait_max = max(self.queue_wait_max, wait)
+        executor_queue_wait_seconds.observe(wait)
+
+    def _release(self, future: Optional["Future[Any]"]) -> None:
+        """工作結束後釋放容量"""
+        with self._lock:
+            self._pending -= 1
+            if future is not None and not future.cancelled():
+                self.completed += 1
+
+
+# 建立全域搜尋執行緒池
+search_executor = BoundedExecutor(
+    max_workers=settings.SEARCH_EXECUTOR_WORKERS,
+    max_queue=settings.SEARCH_EXECUTOR_QUEUE_LIMIT,
+    retry_after=settings.SEARCH_RETRY_AFTER,
+)
@@ -0,0 +1,159 @@
+"""
+上游請求避險 (hedged requests)
+"""
+
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+from src.core.config import settings
+from src.core.metrics import hedged_requests_total
+
+T = TypeVar("T")
+
+
+class RequestHedger:
+    """
+    依近期延遲分位數決定何時送出第二次上游請求
+
+    第一次請求在延遲門檻內未完成時，以替代的後端設定再送出一次，先成功的結果
+    勝出並取消另一個。門檻為各搜尋類型最近window次主要請求延遲的percentile分位數，
+    並限制在min_delay與max_delay之間；樣本不足min_samples時使用initial_delay。
+    """
+
+    def __init__(
+        self,
+        percentile: float,
+        min_delay: float,
+        max_delay: float,
+        initial_delay: float,
+        min_samples: int = 20,
+        window: int = 200,
+    ):
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.initial_delay = initial_delay
+        self.min_samples = min_samples
+        self.window = window
+        self._lock = threading.Lock()
+        self._samples: Dict[str, Deque[float]] = {}
+
+    def observe(self, search_type: str, seconds: float) -> None:
+        """
+        記錄一次主要請求的延遲
+
+        Args:
+            search_type: 搜尋類型
+            seconds: 延遲(秒)
+        """
+        with self._lock:
+            samples = self._samples.get(search_type)
+            if samples is None:
+                samples = self._samples[search_type] = deque(maxlen=self.window)
+            samples.append(seconds)
+
+    def delay(self, search_type: str) -> float:
+        """
+        取得送出避險請求前的等待時間
+
+        Args:
+            search_type: 搜尋類型
+
+        Returns:
+            等待時間(秒)
+        """
+        with self._lock:
+            samples = sorted(self._samples.get(search_type, ()))
+        if len(samples) < self.min_samples:
+            return self.initial_delay
+        index = min(len(samples) - 1, math.ceil(self.percentile * len(samples)) - 1)
+        return min(self.max_delay, max(self.min_delay, samples[max(index, 0)]))
+
+    async def run(
+        self,
+        search_type: str,
+        primary: Callable[[], Awaitable[T]],
+        hedge: Callable[[], Awaitable[T]],
+        delay: Optional[float] = None,
+    ) -> T:
+        """
+        執行主要請求，逾延遲門檻時再送出避險請求，回傳先成功的結果
+
+        Args:
+            search_type: 搜尋類型
+            primary: 產生主要請求的函數
+            hedge: 產生避險請求的函數
+            delay: 覆寫延遲門檻(秒)，None表示依分位數計算
+
+        Returns:
+            先成功完成的請求結果
+
+        Raises:
+            Exception: 兩個請求都失敗時拋出主要請求的例外
+        """
+        start = time.monotonic()
+        primary_task = asyncio.ensure_future(primary())
+        hedge_task: "Optional[asyncio.Future[T]]" = None
+        try:
+            done, _ = await asyncio.wait(
+                {primary_task},
+                timeout=self.delay(search_type) if delay is None else delay,
+            )
+            if done:
+                if primary_task.exception() is None:
+                    self.observe(search_type, time.monotonic() - start)
+                hedged_requests_total.inc(search_type=search_type, outcome="not_hedged")
+                return primary_task.result()
+
+            hedge_task = asyncio.ensure_future(hedge())
+            pending = {primary_task, hedge_task}
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is not None:
+                        continue
+                    # 避險請求勝出時，主要請求的延遲至少為目前經過的時間
+                    self.observe(search_type, time.monotonic() - start)
+                    winner = "primary_won" if task is primary_task else "hedge_won"
+                    hedged_requests_total.inc(search_type=search_type, outcome=winner)
+                    return task.result()
+
+            hedged_requests_total.inc(search_type=search_type, outcome="failed")
+            return primary_task.result()
+        finally:
+            for task in (primary_task, hedge_task):
+                if task is not None and not task.done():
+                    task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        取得避險設定與各搜尋類型目前的延遲門檻
+
+        Returns:
+            包含分位數與各類型延遲門檻的字典
+        """
+        with self._lock:
+            search_types = list(self._samples)
+        return {
+            "percentile": self.percentile,
+            "delays": {
+                search_type: round(self.delay(search_type), 4)
+                for search_type in search_types
+            },
+        }
+
+
+# 建立全域避險實例
+search_hedger = RequestHedger(
+    percentile=settings.HEDGE_PERCENTILE,
+    min_delay=settings.HEDGE_MIN_DELAY,
+    max_delay=settings.HEDGE_MAX_DELAY,
+    initial_delay=settings.HEDGE_INITIAL_DELAY,
+    min_samples=settings.HEDGE_MIN_SAMPLES,
+)
@@ -0,0 +1,93 @@
+"""
+搜尋查詢正規化，讓等價的請求共用快取與上游呼叫
+"""
+
+import unicodedata
+from typing import Any, Dict
+
+from src.core.config import settings
+
+# 查詢結尾可去除的標點 (DuckDuckGo比對時會忽略)；引號、減號等運算子保留
+TRAILING_PUNCTUATION = "?!,;:。，、；：？！…"
+
+# 大小寫有意義的搜尋運算子
+CASE_SENSITIVE_OPERATORS = frozenset({"OR"})
+
+# normalize_params會改寫值的參數
+REWRITTEN_FIELDS = ("query", "region", "safesearch")
+
+
+def normalize_query(query: str, casefold: bool = True) -> str:
+    """
+    正規化查詢字串
+
+    依序套用NFKC (全形字元轉為半形、相容字元統一)、合併空白、去除結尾標點與大小寫
+    摺疊；若結果為空則回傳只合併空白的原查詢。
+
+    Args:
+        query: 原始查詢
+        casefold: 是否摺疊大小寫 (OR運算子除外)
+
+    Returns:
+        正規化後的查詢
+    """
+    collapsed = " ".join(query.split())
+    text = " ".join(unicodedata.normalize("NFKC", query).split())
+    if settings.QUERY_STRIP_PUNCTUATION:
+        text = text.rstrip(TRAILING_PUNCTUATION).rstrip()
+    if casefold:
+        text = " ".join(
+            word if word in CASE_SENSITIVE_OPERATORS else word.casefold()
+            for word in text.split(" ")
+        )
+    return text or collapsed
+
+
+def normalize_params(params: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    正規化搜尋參數，作為快取鍵與上游呼叫的依據
+
+    查詢字串以normalize_query處理；region與safesearch未指定時使用預設值並轉為小寫，
+    max_results未指定時使用預設值；其餘值為None的參數與搜尋函數的預設值相同，
+    因此移除。
+
+    Args:
+        params: 搜尋參數
+
+    Returns:
+        新的參數字典，未啟用QUERY_NORMALIZATION_ENABLED時回傳原字典
+    """
+    if not settings.QUERY_NORMALIZATION_ENABLED:
+        return params
+
+    normalized = {key: value for key, value in params.items() if value is not None}
+    if isinstance(normalized.get("query"), str):
+        normalized["query"] = normalize_query(
+            normalized["query"], casefold=settings.QUERY_CASEFOLD
+        )
+    normalized["region"] = (normalized.get("region") or settings.DEFAULT_REGION).lower()
+    normalized["safesearch"] = (
+        normalized.get("safesearch") or settings.DEFAULT_SAFESEARCH
+    ).lower()
+    if "max_results" in params:
+        normalized.setdefault("max_results", settings.DEFAULT_MAX_RESULTS)
+    return normalized
+
+
+def was_rewritten(params: Dict[str, Any], normalized: Dict[str, Any]) -> bool:
+    """
+    判斷正規化是否改寫了請求指定的值
+
+    只比較查詢、region與safesearch；未指定的參數補上預設值不算改寫。
+
+    Args:
+        params: 原始搜尋參數
+        normalized: normalize_params的結果
+
+    Returns:
+        任一指定的值被改寫時為True
+    """
+    return any(
+        params.get(field) is not None and params[field] != normalized.get(field)
+        for field in REWRITTEN_FIELDS
+    )
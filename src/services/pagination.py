@@ -0,0 +1,81 @@
+"""
+搜尋結果分頁工具
+"""
+
+import asyncio
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from src.core.exceptions import DeadlineExceededError
+
+# 各搜尋類型用於判斷重複結果的欄位
+UNIQUE_KEYS = {"text": "href", "images": "image", "news": "url"}
+
+
+async def fetch_before_deadline(
+    page: Awaitable[List[Dict[str, Any]]], deadline: Optional[float]
+) -> List[Dict[str, Any]]:
+    """
+    在截止時間前取得單頁結果，逾時會取消該頁的請求
+
+    Args:
+        page: 取得單頁結果的awaitable
+        deadline: 截止時間(time.monotonic)，None表示不限制
+
+    Returns:
+        該頁的搜尋結果
+
+    Raises:
+        DeadlineExceededError: 截止時間已過或取得該頁逾時
+    """
+    if deadline is None:
+        return await page
+    try:
+        return await asyncio.wait_for(page, deadline - time.monotonic())
+    except asyncio.TimeoutError:
+        raise DeadlineExceededError("Search deadline exceeded") from None
+
+
+async def paginate(
+    fetch_page: Callable[[int], Awaitable[List[Dict[str, Any]]]],
+    search_type: str,
+    max_results: int,
+    deadline: Optional[float] = None,
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    逐頁取得搜尋結果，已取得max_results筆或某頁沒有新結果時停止
+
+    Args:
+        fetch_page: 依頁碼(從1開始)取得單頁結果的函數
+        search_type: 搜尋類型，用於決定去重欄位
+        max_results: 最大結果數
+        deadline: 截止時間(time.monotonic)，None表示不限制
+
+    Yields:
+        每一頁去除重複後的搜尋結果
+
+    Raises:
+        DeadlineExceededError: 截止時間已過，不再要求後續分頁
+    """
+    unique_key = UNIQUE_KEYS.get(search_type, "url")
+    seen: set = set()
+    total = 0
+    page = 1
+    while total < max_results:
+        if deadline is not None and time.monotonic() >= deadline:
+            raise DeadlineExceededError("Search deadline exceeded")
+
+        fresh = []
+        for result in await fetch_before_deadline(fetch_page(page), deadline):
+            key = result.get(unique_key)
+            if key in seen:
+                continue
+            seen.add(key)
+            fresh.append(result)
+        if not fresh:
+            break
+
+        fresh = fresh[: max_results - total]
+        total += len(fresh)
+        yield fresh
+        page += 1
@@ -0,0 +1,371 @@
+"""
+以token bucket限制每個API token與客戶端IP的請求速率
+"""
+
+import asyncio
+import math
+from abc import ABC, abstractmethod
+from functools import partial
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+from src.core.config import settings
+from src.core.logging import logger
+
+# 共用狀態每處理幾次請求清理一次已補滿的bucket
+PRUNE_EVERY_REQUESTS = 256
+
+# 清理前bucket至少閒置的秒數 (個別token可設定較慢的補充速率)
+PRUNE_MIN_IDLE_SECONDS = 3600.0
+
+# 共用狀態被其他worker鎖定時最多等待的秒數，逾時即允許請求
+SQLITE_BUSY_TIMEOUT = 0.25
+
+
+class RateLimitDecision(NamedTuple):
+    """單一bucket的判斷結果，欄位對應RateLimit-*標頭"""
+
+    allowed: bool
+    limit: int
+    remaining: int
+    reset: int
+    retry_after: int
+    window: int
+
+
+class RateLimiter(ABC):
+    """
+    Token bucket限速器的共同介面
+
+    每個鍵有一個容量為burst的bucket，以每秒rate個的速度補充；每個請求消耗一個。
+    操作會阻塞的限速器將blocking設為True，非同步呼叫者經由aacquire與astats在執行緒中
+    執行，不阻塞事件迴圈。
+    """
+
+    name = "base"
+
+    # 操作是否可能阻塞事件迴圈
+    blocking = False
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.allowed = 0
+        self.rejected = 0
+
+    def acquire(
+        self,
+        key: str,
+        cost: float = 1.0,
+        rate: Optional[float] = None,
+        burst: Optional[int] = None,
+    ) -> RateLimitDecision:
+        """
+        嘗試從鍵對應的bucket取出cost個token
+
+        Args:
+            key: bucket的鍵
+            cost: 消耗的token數
+            rate: 此鍵的補充速率，None表示使用限速器的設定
+            burst: 此鍵的bucket容量，None表示使用限速器的設定
+
+        Returns:
+            判斷結果
+        """
+        rate = self.rate if rate is None else rate
+        burst = self.burst if burst is None else max(1, burst)
+        now = time.time()
+        tokens, allowed = self._take(key, cost, now, rate, burst)
+        if allowed:
+            self.allowed += 1
+        else:
+            self.rejected += 1
+        return self._decision(tokens, allowed, cost, rate, burst)
+
+    def refund(
+        self,
+        key: str,
+        cost: float = 1.0,
+        rate: Optional[float] = None,
+        burst: Optional[int] = None,
+    ) -> None:
+        """
+        歸還先前acquire取出的token (例如請求被其他bucket拒絕)，不超過bucket容量
+
+        Args:
+            key: bucket的鍵
+            cost: 歸還的token數
+            rate: 此鍵的補充速率，None表示使用限速器的設定
+            burst: 此鍵的bucket容量，None表示使用限速器的設定
+        """
+        rate = self.rate if rate is None else rate
+        burst = self.burst if burst is None else max(1, burst)
+        self._take(key, -cost, time.time(), rate, burst)
+
+    async def aacquire(
+        self,
+        key: str,
+        cost: float = 1.0,
+        rate: Optional[float] = None,
+        burst: Optional[int] = None,
+    ) -> RateLimitDecision:
+        """非同步版本的acquire"""
+        return await self._offload(self.acquire, key, cost, rate, burst)
+
+    async def arefund(
+        self,
+        key: str,
+        cost: float = 1.0,
+        rate: Optional[float] = None,
+        burst: Optional[int] = None,
+    ) -> None:
+        """非同步版本的refund"""
+        await self._offload(self.refund, key, cost, rate, burst)
+
+    async def astats(self) -> Dict[str, Any]:
+        """非同步版本的stats"""
+        return await self._offload(self.stats)
+
+    async def _offload(self, func: Any, *args: Any) -> Any:
+        """blocking的限速器在預設執行緒池中執行操作，其餘直接呼叫"""
+        if not self.blocking:
+            return func(*args)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, partial(func, *args))
+
+    def clear(self) -> None:
+        """清除所有bucket與統計"""
+        self.allowed = 0
+        self.rejected = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        取得限速統計資訊
+
+        Returns:
+            包含設定與允許、拒絕次數的字典
+        """
+        return {
+            "backend": self.name,
+            "rate": self.rate,
+            "burst": self.burst,
+            "allowed": self.allowed,
+            "rejected": self.rejected,
+        }
+
+    @abstractmethod
+    def _take(
+        self, key: str, cost: float, now: float, rate: float, burst: int
+    ) -> Tuple[float, bool]:
+        """補充並取出token，回傳(剩餘token數, 是否允許)"""
+
+    @staticmethod
+    def _refill(
+        tokens: float, updated: float, now: float, rate: float, burst: int
+    ) -> float:
+        """依經過的時間補充token"""
+        return min(float(burst), tokens + max(0.0, now - updated) * rate)
+
+    @staticmethod
+    def _decision(
+        tokens: float, allowed: bool, cost: float, rate: float, burst: int
+    ) -> RateLimitDecision:
+        """由剩餘token數計算回應標頭的數值"""
+        if rate > 0:
+            reset = math.ceil((burst - tokens) / rate)
+            retry_after = 0 if allowed else math.ceil((cost - tokens) / rate)
+            window = math.ceil(burst / rate)
+        else:
+            reset = retry_after = window = 0
+        return RateLimitDecision(
+            allowed=allowed,
+            limit=burst,
+            remaining=max(0, int(tokens)),
+            reset=max(0, reset),
+            retry_after=max(1, retry_after) if not allowed else 0,
+            window=window,
+        )
+
+
+class MemoryRateLimiter(RateLimiter):
+    """
+    以程序內字典保存bucket的限速器
+
+    每個worker各自計算，多個worker時實際限制為設定值乘以worker數。
+    超過max_keys個鍵時移除最久未使用的bucket (等同於補滿)。
+    """
+
+    name = "memory"
+
+    def __init__(self, rate: float, burst: int, max_keys: int = 10000):
+        super().__init__(rate, burst)
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _take(
+        self, key: str, cost: float, now: float, rate: float, burst: int
+    ) -> Tuple[float, bool]:
+        """補充並取出token(以最近使用順序保存)"""
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (float(burst), now))
+            tokens = self._refill(tokens, updated, now, rate, burst)
+            allowed = tokens >= cost
+            if allowed:
+                tokens = min(float(burst), tokens - cost)
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return tokens, allowed
+
+    def clear(self) -> None:
+        """清除所有bucket與統計"""
+        with self._lock:
+            self._buckets.clear()
+        super().clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """取得限速統計資訊，包含目前的bucket數"""
+        return {**super().stats(), "keys": len(self._buckets)}
+
+
+class SQLiteRateLimiter(RateLimiter):
+    """
+    以SQLite檔案保存bucket的限速器
+
+    同一主機上的worker開啟同一個檔案(建議放在/dev/shm)即可共用限制；每次判斷在
+    BEGIN IMMEDIATE交易中完成。資料庫無法使用或被鎖定超過SQLITE_BUSY_TIMEOUT秒時
+    允許請求，避免限速器成為單點故障或拖慢請求。
+    """
+
+    name = "sqlite"
+    blocking = True
+
+    def __init__(self, path: str, scope: str, rate: float, burst: int):
+        super().__init__(rate, burst)
+        self.path = path
+        self.scope = scope
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._requests = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        """取得或建立資料庫連線(呼叫者需持有鎖)，fork後的子程序會重新連線"""
+        if self._conn is None or self._pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(
+                self.path,
+                timeout=SQLITE_BUSY_TIMEOUT,
+                isolation_level=None,
+                check_same_thread=False,
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limits ("
+                "key TEXT PRIMARY KEY, "
+                "tokens REAL NOT NULL, "
+                "updated REAL NOT NULL)"
+            )
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    def _take(
+        self, key: str, cost: float, now: float, rate: float, burst: int
+    ) -> Tuple[float, bool]:
+        """在交易中補充並取出token，資料庫錯誤時允許請求"""
+        with self._lock:
+            try:
+                conn = self._connection()
+                key = f"{self.scope}:{key}"
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    row = conn.execute(
+                        "SELECT tokens, updated FROM rate_limits WHERE key = ?",
+                        (key,),
+                    ).fetchone()
+                    tokens = self._refill(*(row or (burst, now)), now, rate, burst)
+                    allowed = tokens >= cost
+                    if allowed:
+                        tokens = min(float(burst), tokens - cost)
+                    conn.execute(
+                        "INSERT OR REPLACE INTO rate_limits (key, tokens, updated) "
+                        "VALUES (?, ?, ?)",
+                        (key, tokens, now),
+                    )
+                    conn.execute("COMMIT")
+                except BaseException:
+                    conn.execute("ROLLBACK")
+                    raise
+                self._requests += 1
+                if self._requests % PRUNE_EVERY_REQUESTS == 0:
+                    self._prune(now)
+            except sqlite3.Error as e:
+                logger.warning(f"Shared rate limit check failed: {str(e)}")
+                return float(burst), True
+        return tokens, allowed
+
+    def clear(self) -> None:
+        """清除此範圍的所有bucket與統計"""
+        with self._lock:
+            self._connection().execute(
+                "DELETE FROM rate_limits WHERE key LIKE ?", (f"{self.scope}:%",)
+            )
+        super().clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """取得限速統計資訊，包含此範圍目前的bucket數"""
+        with self._lock:
+            (keys,) = (
+                self._connection()
+                .execute(
+                    "SELECT COUNT(*) FROM rate_limits WHERE key LIKE ?",
+                    (f"{self.scope}:%",),
+                )
+                .fetchone()
+            )
+        return {**super().stats(), "path": self.path, "keys": keys}
+
+    def _prune(self, now: float) -> None:
+        """刪除此範圍中閒置已久、必定已補滿的bucket(呼叫者需持有鎖)"""
+        if self.rate <= 0:
+            return
+        idle = max(self.burst / self.rate, PRUNE_MIN_IDLE_SECONDS)
+        self._connection().execute(
+            "DELETE FROM rate_limits WHERE key LIKE ? AND updated < ?",
+            (f"{self.scope}:%", now - idle),
+        )
+
+
+def create_rate_limiter(scope: str, rate: float, burst: int) -> RateLimiter:
+    """
+    依設定建立限速器
+
+    Args:
+        scope: 限制範圍 (token, ip)，共用狀態中以此區分鍵
+        rate: 每秒補充的token數
+        burst: bucket容量
+
+    Returns:
+        RATE_LIMIT_BACKEND為sqlite時回傳共用的SQLite限速器，否則回傳記憶體限速器
+    """
+    if settings.RATE_LIMIT_BACKEND == "sqlite":
+        return SQLiteRateLimiter(settings.RATE_LIMIT_SQLITE_PATH, scope, rate, burst)
+    return MemoryRateLimiter(rate, burst, settings.RATE_LIMIT_MAX_KEYS)
+
+
+# 建立全域限速器實例 (依API token與依客戶端IP)
+token_rate_limiter = create_rate_limiter(
+    "token", settings.RATE_LIMIT_TOKEN_RATE, settings.RATE_LIMIT_TOKEN_BURST
+)
+ip_rate_limiter = create_rate_limiter(
+    "ip", settings.RATE_LIMIT_IP_RATE, settings.RATE_LIMIT_IP_BURST
+)
@@ -0,0 +1,336 @@
+"""
+上游呼叫的錄製與重播，讓負載測試不需連線網際網路即可重現真實的上游回應
+"""
+
+import asyncio
+import gzip
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+from src.core.config import settings
+from src.core.logging import logger
+from src.services.ddgs_pool import PoolExhaustedError
+
+try:
+    from ddgs import exceptions as ddgs_exceptions
+    from ddgs.exceptions import DDGSException
+except ImportError:
+    logger.error("DDGS not found. Please install with: pip install ddgs==9.4.3")
+    raise
+
+# 找不到錄製回應時使用的錯誤訊息 (與DDGS查無結果時相同，不計入斷路器)
+REPLAY_MISS_MESSAGE = "No results found."
+
+
+def tape_key(search_type: str, operation: str, params: Dict[str, Any]) -> str:
+    """
+    建立錄製項目的比對鍵
+
+    Args:
+        search_type: 搜尋類型 (text, images, news)
+        operation: 上游操作名稱，例如text_search或fetch_page
+        params: 上游呼叫的關鍵字參數
+
+    Returns:
+        穩定的鍵字串
+    """
+    return json.dumps(
+        [search_type, operation, sorted(params.items())],
+        ensure_ascii=False,
+        default=str,
+    )
+
+
+def recorded_error(error: Dict[str, Any]) -> Exception:
+    """
+    由錄製的錯誤重建例外，DDGS例外保留原類別，其餘以DDGSException表示
+
+    Args:
+        error: 錄製項目的error欄位
+
+    Returns:
+        例外實例
+    """
+    error_class = getattr(ddgs_exceptions, str(error.get("type")), None)
+    if not (isinstance(error_class, type) and issubclass(error_class, Exception)):
+        error_class = DDGSException
+    return error_class(error.get("message", ""))
+
+
+def read_tape(path: str) -> List[Dict[str, Any]]:
+    """
+    讀取錄製檔，.gz結尾的檔案會自動解壓
+
+    Args:
+        path: 錄製檔路徑
+
+    Returns:
+        依錄製順序排列的項目
+    """
+    opener = gzip.open if path.endswith(".gz") else open
+    entries = []
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # 寫入中斷的最後一行
+                continue
+            if isinstance(entry, dict) and "type" in entry and "op" in entry:
+                entries.append(entry)
+    return entries
+
+
+class UpstreamTape:
+    """
+    錄製或重播上游呼叫
+
+    錄製模式將每次上游呼叫的參數、結果(或錯誤)與耗時以精簡的JSON lines附加到
+    檔案，每行以單次寫入完成，多個worker可寫入同一檔案。重播模式不呼叫上游，
+    依參數找到錄製的回應並等待錄製耗時乘以latency_scale；同一參數有多筆錄製時
+    依序輪流使用，找不到時視為查無結果。
+    """
+
+    def __init__(
+        self,
+        record_path: Optional[str] = None,
+        replay_path: Optional[str] = None,
+        latency_scale: float = 1.0,
+    ):
+        self.record_path = None if replay_path else record_path
+        self.replay_path = replay_path
+        self.latency_scale = latency_scale
+        self.entries: List[Dict[str, Any]] = []
+        self.recorded = 0
+        self.record_errors = 0
+        self.replayed = 0
+        self.misses = 0
+        self._tape: Dict[str, Deque[Dict[str, Any]]] = {}
+        self._fd: Optional[int] = None
+        self._lock = threading.Lock()
+        if replay_path:
+            self.load(replay_path)
+
+    @property
+    def mode(self) -> str:
+        """目前的模式 (replay, record, off)"""
+        if self.replay_path:
+            return "replay"
+        return "record" if self.record_path else "off"
+
+    def load(self, path: str) -> int:
+        """
+        載入錄製檔作為重播來源，取代先前載入的內容
+
+        Args:
+            path: 錄製檔路徑
+
+        Returns:
+            載入的項目數，讀取失敗時為0
+        """
+        try:
+            entries = read_tape(path)
+        except OSError as e:
+            logger.error(f"Failed to load upstream recording {path}: {str(e)}")
+            entries = []
+        tape: Dict[str, Deque[Dict[str, Any]]] = {}
+        for entry in entries:
+            key = tape_key(entry["type"], entry["op"], entry.get("params") or {})
+            tape.setdefault(key, deque()).append(entry)
+        with self._lock:
+            self.replay_path = path
+            self.entries = entries
+            self._tape = tape
+        logger.info(
+            f"Loaded {len(entries)} recorded upstream calls "
+            f"({len(tape)} distinct) from {path}"
+        )
+        return len(entries)
+
+    def run(
+        self,
+        search_type: str,
+        operation: str,
+        params: Dict[str, Any],
+        func: Callable[[], List[Dict[str, Any]]],
+    ) -> List[Dict[str, Any]]:
+        """
+        執行同步的上游呼叫，依模式錄製或以錄製的回應取代
+
+        Args:
+            search_type: 搜尋類型 (text, images, news)
+            operation: 上游操作名稱
+            params: 上游呼叫的關鍵字參數
+            func: 實際呼叫上游的函數
+
+        Returns:
+            搜尋結果列表
+        """
+        if self.replay_path:
+            entry = self._next(search_type, operation, params)
+            if entry is not None:
+                time.sleep(self._delay(entry))
+            return self._play(entry, params)
+        if not self.record_path:
+            return func()
+
+        start = time.perf_counter()
+        try:
+            results = func()
+        except PoolExhaustedError:
+            raise
+        except Exception as e:
+            self._record(search_type, operation, params, start, error=e)
+            raise
+        self._record(search_type, operation, params, start, results=results)
+        return results
+
+    async def arun(
+        self,
+        search_type: str,
+        operation: str,
+        params: Dict[str, Any],
+        func: Callable[[], Awaitable[List[Dict[str, Any]]]],
+    ) -> List[Dict[str, Any]]:
+        """
+        執行非同步的上游呼叫，依模式錄製或以錄製的回應取代
+
+        Args:
+            search_type: 搜尋類型 (text, images, news)
+            operation: 上游操作名稱
+            params: 上游呼叫的關鍵字參數
+            func: 實際呼叫上游的協程函數
+
+        Returns:
+            搜尋結果列表
+        """
+        if self.replay_path:
+            entry = self._next(search_type, operation, params)
+            if entry is not None:
+                await asyncio.sleep(self._delay(entry))
+            return self._play(entry, params)
+        if not self.record_path:
+            return await func()
+
+        start = time.perf_counter()
+        try:
+            results = await func()
+        except Exception as e:
+            self._record(search_type, operation, params, start, error=e)
+            raise
+        self._record(search_type, operation, params, start, results=results)
+        return results
+
+    def close(self) -> None:
+        """關閉錄製檔"""
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        取得錄製與重播統計資訊
+
+        Returns:
+            包含模式、檔案路徑與次數的字典
+        """
+        return {
+            "mode": self.mode,
+            "record_path": self.record_path,
+            "replay_path": self.replay_path,
+            "recorded": self.recorded,
+            "record_errors": self.record_errors,
+            "loaded": len(self.entries),
+            "replayed": self.replayed,
+            "misses": self.misses,
+            "latency_scale": self.latency_scale,
+        }
+
+    def _next(
+        self, search_type: str, operation: str, params: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        """取得下一筆相符的錄製項目並移到佇列尾端"""
+        with self._lock:
+            entries = self._tape.get(tape_key(search_type, operation, params))
+            if not entries:
+                self.misses += 1
+                return None
+            entry = entries[0]
+            entries.rotate(-1)
+            self.replayed += 1
+        return entry
+
+    def _delay(self, entry: Dict[str, Any]) -> float:
+        """重播時等待的秒數"""
+        return max(0.0, float(entry.get("latency", 0.0)) * self.latency_scale)
+
+    @staticmethod
+    def _play(
+        entry: Optional[Dict[str, Any]], params: Dict[str, Any]
+    ) -> List[Dict[str, Any]]:
+        """
+        回傳錄製的結果或拋出錄製的錯誤
+
+        找不到錄製時，後續分頁回傳空列表(與分頁結束相同)，第一頁視為查無結果。
+        """
+        if entry is None:
+            if (params.get("page") or 1) > 1:
+                return []
+            raise DDGSException(REPLAY_MISS_MESSAGE)
+        if entry.get("error") is not None:
+            raise recorded_error(entry["error"])
+        return [dict(result) for result in entry.get("results") or []]
+
+    def _record(
+        self,
+        search_type: str,
+        operation: str,
+        params: Dict[str, Any],
+        start: float,
+        results: Optional[List[Dict[str, Any]]] = None,
+        error: Optional[BaseException] = None,
+    ) -> None:
+        """附加一筆錄製項目，寫入失敗只記錄日誌"""
+        entry: Dict[str, Any] = {
+            "at": round(time.time(), 3),
+            "type": search_type,
+            "op": operation,
+            "params": params,
+            "latency": round(time.perf_counter() - start, 4),
+        }
+        if error is not None:
+            entry["error"] = {"type": type(error).__name__, "message": str(error)}
+        else:
+            entry["results"] = results
+        data = (
+            json.dumps(entry, separators=(",", ":"), ensure_ascii=False, default=str)
+            + "\n"
+        ).encode("utf-8")
+
+        with self._lock:
+            try:
+                if self._fd is None:
+                    directory = os.path.dirname(self.record_path)
+                    if directory:
+                        os.makedirs(directory, exist_ok=True)
+                    self._fd = os.open(
+                        self.record_path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644
+                    )
+                os.write(self._fd, data)
+                self.recorded += 1
+            except OSError as e:
+                self.record_errors += 1
+                logger.error(f"Upstream recording write failed: {str(e)}")
+
+
+# 建立全域上游錄製與重播實例
+upstream_tape = UpstreamTape(
+    record_path=settings.UPSTREAM_RECORD_PATH,
+    replay_path=settings.UPSTREAM_REPLAY_PATH,
+    latency_scale=settings.UPSTREAM_REPLAY_LATENCY_SCALE,
+)
@@ -0,0 +1,87 @@
+"""
+相同請求合併服務 (single-flight)
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+
+class SingleFlight:
+    """合併相同鍵的並發非同步呼叫，使其共用同一次執行結果"""
+
+    def __init__(self) -> None:
+        self._inflight: Dict[str, "asyncio.Task[Any]"] = {}
+        self._waiters: Dict[str, int] = {}
+        self.executions = 0
+        self.shared = 0
+
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        執行或加入相同鍵正在進行中的呼叫
+
+        呼叫在獨立的task中執行，因此個別呼叫者被取消時不會影響其他等待者；
+        最後一個等待者被取消時，共用的執行也會被取消以釋放資源。
+
+        Args:
+            key: 合併用的鍵
+            func: 產生awaitable的函數，只有第一個呼叫者會執行
+
+        Returns:
+            共用的執行結果
+
+        Raises:
+            Exception: 共用執行所拋出的例外會傳遞給所有等待者
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._inflight[key] = task
+            self.executions += 1
+            task.add_done_callback(lambda _: self._forget(key, task))
+        else:
+            self.shared += 1
+
+        self._waiters[key] = self._waiters.get(key, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if self._waiters[key] == 1 and self._inflight.get(key) is task:
+                task.cancel()
+            raise
+        finally:
+            self._waiters[key] -= 1
+            if not self._waiters[key]:
+                del self._waiters[key]
+
+    def has_pending(self, key: str) -> bool:
+        """相同鍵的呼叫是否正在進行中"""
+        return key in self._inflight
+
+    def in_flight(self) -> int:
+        """取得目前進行中的呼叫數量"""
+        return len(self._inflight)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        取得合併統計資訊
+
+        Returns:
+            包含執行次數、共用次數與進行中數量的字典
+        """
+        return {
+            "in_flight": self.in_flight(),
+            "executions": self.executions,
+            "shared": self.shared,
+        }
+
+    def _forget(self, key: str, task: "asyncio.Task[Any]") -> None:
+        """移除已完成的呼叫"""
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # 標記例外已被取用，避免所有等待者皆取消時產生警告
+            task.exception()
+
+
+# 建立全域合併實例
+search_flight = SingleFlight()
@@ -0,0 +1,66 @@
+"""
+上游呼叫實際耗時的回報，讓斷路器與並發限制不把排隊等待算入上游延遲
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator, List, Tuple
+
+# 目前所有追蹤區塊的耗時列表，由外而內
+_active_durations: ContextVar[Tuple[List[float], ...]] = ContextVar(
+    "upstream_call_durations", default=()
+)
+
+
+@contextmanager
+def track_call_durations() -> Iterator[List[float]]:
+    """
+    收集區塊內經由call_duration_reporter回報的上游呼叫耗時
+
+    區塊可以巢狀，每次回報都會加入所有外層區塊的列表。
+
+    Yields:
+        區塊內回報的耗時列表(秒)
+    """
+    durations: List[float] = []
+    previous = _active_durations.get()
+    _active_durations.set(previous + (durations,))
+    try:
+        yield durations
+    finally:
+        # 以set還原而非reset，串流在其他context中關閉時也不會失敗
+        _active_durations.set(previous)
+
+
+def call_duration_reporter() -> Callable[[float], None]:
+    """
+    取得向目前所有追蹤區塊回報上游呼叫耗時的函數
+
+    在事件迴圈上取得後可以在工作執行緒中呼叫；search_executor會把context
+    傳入工作執行緒，因此在執行緒內取得也可以。
+
+    Returns:
+        接受耗時(秒)的函數
+    """
+    targets = _active_durations.get()
+
+    def report(elapsed: float) -> None:
+        for durations in targets:
+            durations.append(elapsed)
+
+    return report
+
+
+def measured_duration(durations: List[float], started_at: float) -> float:
+    """
+    取得區塊內上游呼叫的總耗時，沒有任何回報時使用自started_at起的經過時間
+
+    Args:
+        durations: track_call_durations產生的列表
+        started_at: 區塊開始的time.monotonic()值
+
+    Returns:
+        耗時(秒)
+    """
+    return sum(durations) if durations else time.monotonic() - started_at
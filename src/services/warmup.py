@@ -0,0 +1,369 @@
+"""
+快取預熱：啟動時與定期以常用查詢填入搜尋結果快取
+"""
+
+import asyncio
+import json
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from pydantic import BaseModel
+
+from src.core.config import settings
+from src.core.logging import logger
+
+# 預熱時只讀取查詢日誌最後這麼多位元組，避免大型日誌拖慢啟動
+QUERY_LOG_SCAN_BYTES = 16 * 1024 * 1024
+
+# 查詢日誌等待寫入的行數上限，超過時捨棄新的紀錄
+QUERY_LOG_QUEUE_LIMIT = 4096
+
+
+def query_entry(search_type: str, request: BaseModel) -> Dict[str, Any]:
+    """
+    將搜尋請求轉換為查詢清單項目
+
+    只保留非預設值的欄位，相同搜尋的項目序列化結果相同。
+
+    Args:
+        search_type: 搜尋類型 (text, images, news)
+        request: 搜尋請求
+
+    Returns:
+        包含type與搜尋欄位的字典
+    """
+    fields = request.model_dump(exclude_defaults=True, exclude={"type", "timeout"})
+    return {"type": search_type, **fields}
+
+
+class QueryLog:
+    """
+    以JSON lines附加記錄收到的搜尋，作為預熱的查詢來源
+
+    record只把紀錄排入佇列，由背景執行緒批次寫入，不在事件迴圈上進行檔案I/O；
+    佇列已滿時捨棄。每批在單次O_APPEND寫入中完成，多個worker可寫入同一檔案。
+    """
+
+    def __init__(self, path: str, max_queue: int = QUERY_LOG_QUEUE_LIMIT):
+        self.path = path
+        self._queue: "queue.Queue[Optional[str]]" = queue.Queue(maxsize=max_queue)
+        self._writer: Optional[threading.Thread] = None
+        self._fd: Optional[int] = None
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def record(self, search_type: str, request: BaseModel) -> None:
+        """
+        記錄一次搜尋，佇列已滿時捨棄
+
+        Args:
+            search_type: 搜尋類型 (text, images, news)
+            request: 搜尋請求
+        """
+        line = json.dumps(
+            query_entry(search_type, request),
+            separators=(",", ":"),
+            ensure_ascii=False,
+        )
+        self._ensure_writer()
+        try:
+            self._queue.put_nowait(line)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self) -> None:
+        """寫入剩餘紀錄並停止背景執行緒，之後的record會重新啟動"""
+        with self._lock:
+            writer, self._writer = self._writer, None
+        if writer is not None:
+            self._queue.put(None)
+            writer.join(timeout=5.0)
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def _ensure_writer(self) -> None:
+        """啟動背景寫入執行緒"""
+        if self._writer is None or not self._writer.is_alive():
+            with self._lock:
+                if self._writer is None or not self._writer.is_alive():
+                    self._writer = threading.Thread(
+                        target=self._write_loop, name="query-log", daemon=True
+                    )
+                    self._writer.start()
+
+    def _write_loop(self) -> None:
+        """背景寫入迴圈，一次寫入佇列中所有等待的紀錄"""
+        while True:
+            line = self._queue.get()
+            lines = []
+            stop = line is None
+            if line is not None:
+                lines.append(line)
+            while not stop:
+                try:
+                    line = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if line is None:
+                    stop = True
+                else:
+                    lines.append(line)
+            if lines:
+                self._write("".join(f"{line}\n" for line in lines))
+            if stop:
+                return
+
+    def _write(self, data: str) -> None:
+        """附加寫入，失敗只記錄日誌"""
+        try:
+            if self._fd is None:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._fd = os.open(
+                    self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644
+                )
+            os.write(self._fd, data.encode("utf-8"))
+        except OSError as e:
+            logger.error(f"Query log write failed: {str(e)}")
+
+
+def read_query_file(path: str) -> List[Dict[str, Any]]:
+    """
+    讀取查詢清單檔案
+
+    每行為一個查詢：JSON物件(與批次搜尋項目相同的欄位)，或純文字(視為網頁搜尋)；
+    空行與#開頭的行會被忽略，無法解碼或格式不正確的行會記錄警告後略過。
+
+    Args:
+        path: 檔案路徑
+
+    Returns:
+        查詢清單項目
+    """
+    entries = []
+    with open(path, "rb") as f:
+        for number, raw in enumerate(f, 1):
+            try:
+                line = raw.decode("utf-8").strip()
+            except UnicodeDecodeError:
+                logger.warning(f"Skipping undecodable warmup query at {path}:{number}")
+                continue
+            if not line or line.startswith("#"):
+                continue
+            if not line.startswith("{"):
+                entries.append({"type": "text", "query": line})
+                continue
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                entry = None
+            if isinstance(entry, dict):
+                entries.append(entry)
+            else:
+                logger.warning(f"Skipping invalid warmup query: {line[:100]}")
+    return entries
+
+
+def top_logged_queries(path: str, limit: int) -> List[Dict[str, Any]]:
+    """
+    從查詢日誌取得最常見的搜尋
+
+    Args:
+        path: 查詢日誌路徑
+        limit: 最多回傳的查詢數
+
+    Returns:
+        依出現次數排序的查詢清單項目
+    """
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        f.seek(max(0, size - QUERY_LOG_SCAN_BYTES))
+        data = f.read()
+    lines = data.split(b"\n")
+    if size > QUERY_LOG_SCAN_BYTES:
+        # 第一行可能只讀到一部分
+        lines = lines[1:]
+
+    counts: Counter = Counter()
+    for line in lines:
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            continue
+        if isinstance(entry, dict):
+            counts[json.dumps(entry, sort_keys=True, ensure_ascii=False)] += 1
+    return [json.loads(entry) for entry, _ in counts.most_common(limit)]
+
+
+def load_warmup_queries(
+    queries_file: Optional[str], query_log: Optional[str], limit: int
+) -> List[Dict[str, Any]]:
+    """
+    組合預熱查詢清單：先取查詢清單檔案，再以查詢日誌中最常見的搜尋補足
+
+    找不到或無法讀取的檔案會被略過。
+
+    Args:
+        queries_file: 查詢清單檔案路徑
+        query_log: 查詢日誌路徑
+        limit: 最多回傳的查詢數
+
+    Returns:
+        不重複的查詢清單項目
+    """
+    entries: List[Dict[str, Any]] = []
+    for path, read in (
+        (queries_file, read_query_file),
+        (query_log, lambda path: top_logged_queries(path, limit)),
+    ):
+        if not path:
+            continue
+        try:
+            entries.extend(read(path))
+        except FileNotFoundError:
+            logger.warning(f"Warmup query source not found: {path}")
+        except (OSError, ValueError) as e:
+            logger.error(f"Failed to read warmup queries from {path}: {str(e)}")
+
+    unique: Dict[str, Dict[str, Any]] = {}
+    for entry in entries:
+        key = json.dumps(entry, sort_keys=True, ensure_ascii=False)
+        unique.setdefault(key, entry)
+    return list(unique.values())[:limit]
+
+
+class CacheWarmer:
+    """
+    以限速的背景搜尋填入快取並記錄進度
+
+    每秒最多開始rate個搜尋，同時最多concurrency個；搜尋經由一般的服務流程執行，
+    仍受上游並發限制與斷路器保護。
+    """
+
+    def __init__(self, rate: float, concurrency: int):
+        self.rate = rate
+        self.concurrency = max(1, concurrency)
+        self.state = "idle"
+        self.runs = 0
+        self.total = 0
+        self.completed = 0
+        self.failed = 0
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        """第一次預熱是否已結束(之後的定期預熱不影響)"""
+        return self.runs > 0
+
+    def fail(self, error: BaseException) -> None:
+        """
+        記錄無法開始的預熱，仍視為一次結束的預熱，避免健康檢查一直回報warming
+
+        Args:
+            error: 預熱失敗的原因
+        """
+        self.state = "failed"
+        self.runs += 1
+        self.finished_at = time.time()
+        logger.error(f"Cache warmup failed: {str(error)}")
+
+    async def wait_ready(self, interval: float = 0.1) -> None:
+        """
+        等待第一次預熱結束
+
+        Args:
+            interval: 檢查間隔秒數
+        """
+        while not self.ready:
+            await asyncio.sleep(interval)
+
+    async def run(
+        self,
+        entries: List[Dict[str, Any]],
+        execute: Callable[[Dict[str, Any]], Awaitable[Any]],
+    ) -> None:
+        """
+        依序以限速執行預熱搜尋，個別搜尋失敗不影響其他搜尋
+
+        Args:
+            entries: 查詢清單項目
+            execute: 執行單一查詢清單項目的協程函數
+        """
+        self.state = "running"
+        self.total = len(entries)
+        self.completed = self.failed = 0
+        self.started_at = time.time()
+        self.finished_at = None
+        logger.info(f"Cache warmup started with {len(entries)} queries")
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        interval = 1.0 / self.rate if self.rate > 0 else 0.0
+
+        async def warm(entry: Dict[str, Any]) -> None:
+            try:
+                await execute(entry)
+            except Exception as e:
+                self.failed += 1
+                logger.warning(f"Warmup query failed: {str(e)}")
+            finally:
+                self.completed += 1
+                semaphore.release()
+
+        tasks = []
+        try:
+            for index, entry in enumerate(entries):
+                if index and interval:
+                    await asyncio.sleep(interval)
+                await semaphore.acquire()
+                tasks.append(asyncio.create_task(warm(entry)))
+            await asyncio.gather(*tasks)
+        except asyncio.CancelledError:
+            for task in tasks:
+                task.cancel()
+            self.state = "cancelled"
+            raise
+        finally:
+            self.runs += 1
+            self.finished_at = time.time()
+            if self.state == "running":
+                self.state = "completed"
+        logger.info(
+            f"Cache warmup completed: {self.completed - self.failed}/{self.total} "
+            f"queries cached in {self.finished_at - self.started_at:.1f}s"
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        取得預熱進度
+
+        Returns:
+            包含狀態、查詢數與完成比例的字典
+        """
+        return {
+            "state": self.state,
+            "ready": self.ready,
+            "runs": self.runs,
+            "total": self.total,
+            "completed": self.completed,
+            "failed": self.failed,
+            "progress": round(self.completed / self.total, 4) if self.total else 1.0,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+# 建立全域快取預熱實例
+search_warmer = CacheWarmer(
+    rate=settings.WARMUP_RATE, concurrency=settings.WARMUP_CONCURRENCY
+)
+
+# 建立全域查詢日誌實例 (未設定QUERY_LOG_PATH時不記錄)
+query_log = QueryLog(settings.QUERY_LOG_PATH) if settings.QUERY_LOG_PATH else None
@@ -22,17 +22,71 @@ def event_loop() -> Generator:
     loop.close()
 
 
+@pytest.fixture(autouse=True)
+def reset_search_cache():
+    """Clear the shared search result cache between tests."""
+    from src.services.cache import search_cache
+
+    search_cache.clear()
+    yield
+    search_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def reset_circuit_breakers():
+    """Close all upstream circuit breakers between tests."""
+    from src.services.ddgs_service import circuit_breakers
+
+    for breaker in circuit_breakers.values():
+        breaker.reset()
+    yield
+    for breaker in circuit_breakers.values():
+        breaker.reset()
+
+
+@pytest.fixture(autouse=True)
+def reset_upstream_limiter():
+    """Restore the adaptive upstream concurrency limit between tests."""
+    from src.services.concurrency import upstream_limiter
+
+    upstream_limiter.reset()
+    yield
+    upstream_limiter.reset()
+
+
+@pytest.fixture(autouse=True)
+def reset_search_paginator():
+    """Drop cursor pagination sessions between tests."""
+    from src.services.cursors import search_paginator
+
+    search_paginator.clear()
+    yield
+    search_paginator.clear()
+
+
+@pytest.fixture(autouse=True)
+def reset_rate_limiters():
+    """Refill all rate limit buckets between tests."""
+    from src.services.rate_limit import ip_rate_limiter, token_rate_limiter
+
+    for limiter in (ip_rate_limiter, token_rate_limiter):
+        limiter.clear()
+    yield
+    for limiter in (ip_rate_limiter, token_rate_limiter):
+        limiter.clear()
+
+
 @pytest.fixture
 def app():
     """Create a test FastAPI application."""
     from src.app import create_app
-    from src.services.auth_service import verify_token
+    from src.services.auth_service import DEFAULT_TOKEN_INFO, verify_token
 
     app = create_app()
 
     # Override the auth dependency for testing
     def mock_verify_token():
-        return "test-token"
+        return DEFAULT_TOKEN_INFO
 
     app.dependency_overrides[verify_token] = mock_verify_token
     return app
@@ -23,9 +23,19 @@ class SearchAPIUser(HttpUser):
         self.client.get("/health")
 
     @task(2)
-    def test_web_search_get(self):
-        """Test web search using GET method."""
-        self.client.get("/search?q=FastAPI&max_results=5")
+    def test_batch_search(self):
+        """Test batch search with mixed search types."""
+        batch_data = {
+            "items": [
+                {"type": "text", "query": "FastAPI", "max_results": 5},
+                {"type": "news", "query": "FastAPI", "max_results": 5},
+            ]
+        }
+        self.client.post(
+            "/search/batch",
+            data=json.dumps(batch_data),
+            headers={"Content-Type": "application/json"},
+        )
 
     @task(2)
     def test_web_search_post(self):
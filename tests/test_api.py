@@ -16,6 +16,7 @@ class TestRootEndpoints:
         data = response.json()
         assert data["message"] == "DuckDuckGo Search API"
         assert "endpoints" in data
+        assert data["endpoints"]["search_page"] == "/search/page"
         assert "version" in data
 
     def test_health_endpoint(self, client: TestClient, auth_headers):
@@ -57,6 +58,49 @@ class TestSearchEndpoints:
         assert len(data["results"]) == 1
         assert data["results"][0]["title"] == "Test Title"
 
+    @patch("src.services.ddgs_service.DDGS")
+    def test_search_debug_mode_uses_validated_response(
+        self, mock_ddgs, client: TestClient, sample_search_data, auth_headers
+    ):
+        """測試DEBUG模式與快速序列化路徑回傳相同內容"""
+        mock_ddgs_instance = MagicMock()
+        mock_ddgs_instance.text.return_value = [
+            {"title": "Test Title", "href": "https://example.com", "body": "Body"}
+        ]
+        mock_ddgs.return_value.__enter__.return_value = mock_ddgs_instance
+
+        fast = client.post("/search", json=sample_search_data, headers=auth_headers)
+        with patch("src.api.serialization.settings.DEBUG", True):
+            debug = client.post(
+                "/search", json=sample_search_data, headers=auth_headers
+            )
+
+        assert fast.headers["content-type"] == "application/json"
+        fast_data, debug_data = fast.json(), debug.json()
+        fast_data.pop("timestamp"), debug_data.pop("timestamp")
+        assert fast_data == debug_data
+
+    @patch("src.services.ddgs_service.DDGS")
+    def test_search_removes_duplicate_results(
+        self, mock_ddgs, client: TestClient, sample_search_data, auth_headers
+    ):
+        """測試回應去除正規化後相同的結果並移除追蹤參數"""
+        mock_ddgs_instance = MagicMock()
+        mock_ddgs_instance.text.return_value = [
+            {"title": "A", "href": "https://example.com/a?utm_source=x", "body": ""},
+            {"title": "A copy", "href": "http://www.example.com/a/", "body": ""},
+            {"title": "B", "href": "https://example.com/b", "body": ""},
+        ]
+        mock_ddgs.return_value.__enter__.return_value = mock_ddgs_instance
+
+        response = client.post("/search", json=sample_search_data, headers=auth_headers)
+        data = response.json()
+        assert [r["href"] for r in data["results"]] == [
+            "https://example.com/a",
+            "https://example.com/b",
+        ]
+        assert data["total_results"] == 2
+
     def test_search_validation_error(self, client: TestClient, auth_headers):
         """測試搜尋驗證錯誤"""
         # Empty query should fail validation
@@ -87,6 +131,66 @@ class TestSearchEndpoints:
         assert data["success"] is False
         assert "error" in data
 
+    def test_search_rejected_when_saturated(
+        self, client: TestClient, sample_search_data, auth_headers
+    ):
+        """測試搜尋容量已滿時回應503"""
+        from src.services.executor import ExecutorSaturatedError
+
+        error = ExecutorSaturatedError("Search capacity exhausted", retry_after=2)
+        with patch("src.services.ddgs_service.search_executor.run", side_effect=error):
+            response = client.post(
+                "/search", json=sample_search_data, headers=auth_headers
+            )
+
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "2"
+        assert response.json()["success"] is False
+
+    def test_search_rejected_when_pool_exhausted(
+        self, client: TestClient, sample_search_data, auth_headers
+    ):
+        """測試DDGS客戶端池耗盡時回應503並附帶Retry-After"""
+        from src.services.ddgs_pool import PoolExhaustedError
+
+        error = PoolExhaustedError("No DDGS client available", retry_after=3)
+        with patch("src.services.ddgs_service.ddgs_pool.client", side_effect=error):
+            response = client.post(
+                "/search", json=sample_search_data, headers=auth_headers
+            )
+
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "3"
+        assert response.json()["success"] is False
+
+    @patch("src.services.ddgs_service.DDGS")
+    def test_search_deadline_returns_504(
+        self, mock_ddgs, client: TestClient, auth_headers
+    ):
+        """測試超過X-Search-Timeout時回應504"""
+        import time
+
+        mock_ddgs_instance = MagicMock()
+        mock_ddgs_instance.text.side_effect = lambda *a, **kw: time.sleep(0.3) or []
+        mock_ddgs.return_value.__enter__.return_value = mock_ddgs_instance
+
+        response = client.post(
+            "/search",
+            json={"query": "slow"},
+            headers={**auth_headers, "X-Search-Timeout": "0.05"},
+        )
+        assert response.status_code == 504
+        assert "deadline" in response.json()["message"]
+
+    def test_search_invalid_timeout_header(self, client: TestClient, auth_headers):
+        """測試無效的截止時間標頭"""
+        response = client.post(
+            "/search",
+            json={"query": "test"},
+            headers={**auth_headers, "X-Search-Timeout": "soon"},
+        )
+        assert response.status_code == 400
+
 
 class TestImageSearchEndpoints:
     """測試圖片搜尋端點"""
@@ -124,6 +228,25 @@ class TestImageSearchEndpoints:
         assert len(data["results"]) == 1
         assert data["results"][0]["title"] == "Test Image"
 
+    def test_open_circuit_returns_503(self, client: TestClient, auth_headers):
+        """測試斷路器開啟時快速回傳503並反映在健康檢查"""
+        from src.services.ddgs_service import circuit_breakers
+
+        breaker = circuit_breakers["images"]
+        for _ in range(breaker.min_calls):
+            breaker.record_failure(False)
+
+        response = client.post(
+            "/search/images", json={"query": "outage"}, headers=auth_headers
+        )
+        assert response.status_code == 503
+        assert "Retry-After" in response.headers
+
+        health = client.get("/health").json()
+        assert health["status"] == "degraded"
+        assert health["circuit_breakers"]["images"]["state"] == "open"
+        assert health["circuit_breakers"]["text"]["state"] == "closed"
+
 
 class TestNewsSearchEndpoints:
     """測試新聞搜尋端點"""
@@ -161,6 +284,637 @@ class TestNewsSearchEndpoints:
         assert data["results"][0]["title"] == "Test News"
 
 
+class TestStreamingSearch:
+    """測試串流搜尋回應"""
+
+    @patch("src.services.ddgs_service.DDGS")
+    def test_search_streams_ndjson_pages(
+        self, mock_ddgs, client: TestClient, auth_headers
+    ):
+        """測試NDJSON串流逐頁傳送結果"""
+        import json
+
+        pages = {
+            1: [
+                {"title": "One", "href": "https://example.com/1", "body": ""},
+                {"title": "Two", "href": "https://example.com/2", "body": ""},
+            ],
+            2: [
+                {"title": "Two", "href": "https://example.com/2", "body": ""},
+                {"title": "Three", "href": "https://example.com/3", "body": ""},
+            ],
+        }
+        mock_ddgs_instance = MagicMock()
+        mock_ddgs_instance.text.side_effect = lambda query, page, **kw: pages[page]
+        mock_ddgs.return_value.__enter__.return_value = mock_ddgs_instance
+
+        response = client.post(
+            "/search",
+            json={"query": "stream", "max_results": 3},
+            headers={**auth_headers, "Accept": "application/x-ndjson"},
+        )
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+
+        events = [json.loads(line) for line in response.text.splitlines()]
+        assert [e["data"]["title"] for e in events[:-1]] == ["One", "Two", "Three"]
+        assert events[-1]["event"] == "done"
+        assert events[-1]["data"]["total_results"] == 3
+        assert mock_ddgs_instance.text.call_count == 2
+
+    @patch("src.services.ddgs_service.DDGS")
+    def test_news_streams_server_sent_events(
+        self, mock_ddgs, client: TestClient, sample_news_search_data, auth_headers
+    ):
+        """測試SSE串流格式"""
+        mock_ddgs_instance = MagicMock()
+        mock_ddgs_instance.news.side_effect = lambda query, page, **kw: (
+            [
+                {
+                    "date": "2024-01-01",
+                    "title": "News",
+                    "body": "",
+                    "url": "https://example.com/news",
+                    "source": "example",
+                }
+            ]
+            if page == 1
+            else []
+        )
+        mock_ddgs.return_value.__enter__.return_value = mock_ddgs_instance
+
+        response = client.post(
+            "/search/news",
+            json=sample_news_search_data,
+            headers={**auth_headers, "Accept": "text/event-stream"},
+        )
+        assert response.status_code == 200
+        assert "event: result" in response.text
+        assert "event: done" in response.text
+
+    @patch("src.services.ddgs_service.DDGS")
+    def test_stream_upstream_error_before_first_result(
+        self, mock_ddgs, client: TestClient, sample_search_data, auth_headers
+    ):
+        """測試串流開始前的上游錯誤以HTTP錯誤回應"""
+        mock_ddgs.side_effect = Exception("DDGS error")
+
+        response = client.post(
+            "/search",
+            json=sample_search_data,
+            headers={**auth_headers, "Accept": "application/x-ndjson"},
+        )
+        assert response.status_code == 500
+
+    @patch("src.services.ddgs_service.DDGS")
+    def test_stream_stops_paginating_at_deadline(
+        self, mock_ddgs, client: TestClient, auth_headers
+    ):
+        """測試串流超過截止時間時回傳部分結果且不寫入快取"""
+        import json
+        import time
+        from src.services.cache import search_cache
+
+        def text(query, page, **kwargs):
+            if page > 1:
+                time.sleep(0.3)
+            return [{"title": f"P{page}", "href": f"https://e.com/{page}", "body": ""}]
+
+        mock_ddgs_instance = MagicMock()
+        mock_ddgs_instance.text.side_effect = text
+        mock_ddgs.return_value.__enter__.return_value = mock_ddgs_instance
+
+        response = client.post(
+            "/search",
+            json={"query": "deadline", "max_results": 20, "timeout": 0.1},
+            headers={**auth_headers, "Accept": "application/x-ndjson"},
+        )
+        assert response.status_code == 200
+
+        events = [json.loads(line) for line in response.text.splitlines()]
+        assert [e["data"]["title"] for e in events[:-1]] == ["P1"]
+        assert events[-1]["event"] == "done"
+        assert events[-1]["data"]["partial"] is True
+        assert mock_ddgs_instance.text.call_count == 2
+        assert search_cache.stats()["entries"] == 0
+
+
+class TestBatchSearchEndpoints:
+    """測試批次搜尋端點"""
+
+    @patch("src.services.ddgs_service.DDGS")
+    def test_batch_search_mixed_results(
+        self, mock_ddgs, client: TestClient, auth_headers
+    ):
+        """測試批次搜尋回傳個別項目結果與錯誤"""
+        mock_ddgs_instance = MagicMock()
+        mock_ddgs_instance.text.return_value = [
+            {"title": "Web", "href": "https://example.com", "body": "body"}
+        ]
+        mock_ddgs_instance.news.side_effect = Exception("news backend down")
+        mock_ddgs.return_value.__enter__.return_value = mock_ddgs_instance
+
+        response = client.post(
+            "/search/batch",
+            json={
+                "items": [
+                    {"type": "text", "query": "fastapi"},
+                    {"type": "news", "query": "tech"},
+                ]
+            },
+            headers=auth_headers,
+        )
+        assert response.status_code == 200
+
+        data = response.json()
+        assert data["success"] is False
+        assert data["succeeded"] == 1
+        assert data["failed"] == 1
+        assert data["results"][0]["response"]["results"][0]["title"] == "Web"
+        assert data["results"][1]["status_code"] == 500
+        assert "news backend down" in data["results"][1]["error"]
+
+    def test_batch_search_validation_error(self, client: TestClient, auth_headers):
+        """測試批次搜尋項目類型驗證"""
+        response = client.post(
+            "/search/batch",
+            json={"items": [{"type": "videos", "query": "test"}]},
+            headers=auth_headers,
+        )
+        assert response.status_code == 422
+
+        response = client.post(
+            "/search/batch", json={"items": []}, headers=auth_headers
+        )
+        assert response.status_code == 422
+
+
+class TestPaginatedSearch:
+    """測試游標分頁搜尋"""
+
+    @staticmethod
+    def text_pages(count):
+        return {
+            page: [
+                {
+                    "title": f"Result {page}-{i}",
+                    "href": f"https://example.com/{page}/{i}",
+                    "body": "",
+                }
+                for i in range(10)
+            ]
+            for page in range(1, count + 1)
+        }
+
+    @patch("src.services.ddgs_service.DDGS")
+    def test_cursor_continues_without_refetching(
+        self, mock_ddgs, client: TestClient, auth_headers
+    ):
+        """測試後續分頁從保存的狀態繼續，不重新取得先前的上游分頁"""
+        pages = self.text_pages(3)
+        mock_ddgs_instance = MagicMock()
+        mock_ddgs_instance.text.side_effect = lambda query, page, **kw: pages.get(
+            page, []
+        )
+        mock_ddgs.return_value.__enter__.return_value = mock_ddgs_instance
+
+        first = client.post(
+            "/search/page",
+            json={"search": {"type": "text", "query": "deep"}, "page_size": 15},
+            headers=auth_headers,
+        ).json()
+        assert [r["title"] for r in first["results"]][-1] == "Result 2-4"
+        assert first["offset"] == 0
+        assert mock_ddgs_instance.text.call_count == 2
+
+        second = client.post(
+            "/search/page",
+            json={"cursor": first["next_cursor"], "page_size": 5},
+            headers=auth_headers,
+        ).json()
+        assert [r["title"] for r in second["results"]] == [
+            f"Result 2-{i}" for i in range(5, 10)
+        ]
+        assert second["offset"] == 15
+        assert mock_ddgs_instance.text.call_count == 2
+
+        last = client.post(
+            "/search/page",
+            json={"cursor": second["next_cursor"], "page_size": 50},
+            headers=auth_headers,
+        ).json()
+        assert last["total_results"] == 10
+        assert last["next_cursor"] is None
+        pages_seen = [
+            call.kwargs["page"] for call in mock_ddgs_instance.text.call_args_list
+        ]
+        assert pages_seen == [1, 2, 3, 4]
+
+    @patch("src.services.ddgs_service.DDGS")
+    def test_cursor_rebuilds_expired_state(
+        self, mock_ddgs, client: TestClient, auth_headers
+    ):
+        """測試分頁狀態不存在時依游標中的搜尋條件重建"""
+        from src.services.cursors import search_paginator
+
+        pages = self.text_pages(2)
+        mock_ddgs_instance = MagicMock()
+        mock_ddgs_instance.text.side_effect = lambda query, page, **kw: pages.get(
+            page, []
+        )
+        mock_ddgs.return_value.__enter__.return_value = mock_ddgs_instance
+
+        first = client.post(
+            "/search/page",
+            json={"search": {"type": "text", "query": "rebuild"}, "page_size": 10},
+            headers=auth_headers,
+        ).json()
+        search_paginator.clear()
+
+        second = client.post(
+            "/search/page",
+            json={"cursor": first["next_cursor"], "page_size": 10},
+            headers=auth_headers,
+        ).json()
+        assert second["results"][0]["title"] == "Result 2-0"
+        assert search_paginator.stats()["rebuilt"] == 1
+
+    @patch("src.services.ddgs_service.DDGS")
+    def test_cursor_pages_are_contiguous_within_engine_page(
+        self, mock_ddgs, client: TestClient, auth_headers
+    ):
+        """測試引擎分頁比每頁筆數大時，游標依位移取得連續結果而不遺漏"""
+
+        def images(query, page, max_results=None, **kwargs):
+            results = [
+                {
+                    "title": f"Image {(page - 1) * 100 + i}",
+                    "image": f"https://img.example.com/{(page - 1) * 100 + i}.jpg",
+                    "thumbnail": "",
+                    "url": "https://example.com",
+                    "height": 1,
+                    "width": 1,
+                    "source": "Bing",
+                }
+                for i in range(100)
+            ]
+            return results[:max_results] if max_results else results
+
+        mock_ddgs_instance = MagicMock()
+        mock_ddgs_instance.images.side_effect = images
+        mock_ddgs.return_value.__enter__.return_value = mock_ddgs_instance
+
+        titles = []
+        body = {"search": {"type": "images", "query": "cats"}, "page_size": 10}
+        for _ in range(3):
+            page = client.post("/search/page", json=body, headers=auth_headers).json()
+            titles.extend(r["title"] for r in page["results"])
+            body = {"cursor": page["next_cursor"], "page_size": 10}
+
+        assert titles == [f"Image {i}" for i in range(30)]
+        assert mock_ddgs_instance.images.call_count == 1
+        assert mock_ddgs_instance.images.call_args.kwargs["max_results"] is None
+
+    def test_invalid_cursor_and_missing_search(self, client: TestClient, auth_headers):
+        """測試無效游標回應400，未提供search或cursor回應422"""
+        response = client.post(
+            "/search/page", json={"cursor": "not-a-cursor"}, headers=auth_headers
+        )
+        assert response.status_code == 400
+
+        response = client.post("/search/page", json={}, headers=auth_headers)
+        assert response.status_code == 422
+
+
+class TestCacheWarmup:
+    """測試快取預熱與健康檢查"""
+
+    def test_health_reports_warmup_and_gates_until_ready(self, client: TestClient):
+        """測試預熱未完成時健康檢查回報warming，啟用閘門時回傳503"""
+        from src.core.config import settings
+        from src.services.warmup import CacheWarmer
+
+        warmer = CacheWarmer(rate=0, concurrency=1)
+        with patch("src.app.search_warmer", warmer), patch.object(
+            settings, "WARMUP_ENABLED", True
+        ), patch.object(settings, "WARMUP_HEALTH_GATE", True):
+            response = client.get("/health")
+            assert response.status_code == 503
+            assert response.json()["status"] == "warming"
+            assert response.json()["warmup"]["ready"] is False
+
+            warmer.runs = 1
+            response = client.get("/health")
+            assert response.status_code == 200
+            assert response.json()["status"] == "healthy"
+
+    @patch("src.services.ddgs_service.DDGS")
+    def test_warmup_fills_cache_from_logged_queries(
+        self, mock_ddgs, client: TestClient, auth_headers, tmp_path
+    ):
+        """測試記錄的搜尋在預熱後直接由快取回應"""
+        import asyncio
+        from src.api.search import run_search_item
+        from src.services.cache import search_cache
+        from src.services.warmup import CacheWarmer, QueryLog, load_warmup_queries
+
+        mock_ddgs_instance = MagicMock()
+        mock_ddgs_instance.text.return_value = [
+            {"title": "Warm", "href": "https://example.com", "body": "cached"}
+        ]
+        mock_ddgs.return_value.__enter__.return_value = mock_ddgs_instance
+
+        log = QueryLog(str(tmp_path / "queries.jsonl"))
+        with patch("src.api.search.query_log", log):
+            client.post(
+                "/search", json={"query": "hot", "max_results": 3}, headers=auth_headers
+            )
+        log.close()
+        search_cache.clear()
+
+        entries = load_warmup_queries(None, log.path, 10)
+        assert entries == [{"type": "text", "query": "hot", "max_results": 3}]
+        warmer = CacheWarmer(rate=0, concurrency=1)
+        asyncio.run(warmer.run(entries, run_search_item))
+        assert warmer.stats()["failed"] == 0
+
+        response = client.post(
+            "/search", json={"query": "hot", "max_results": 3}, headers=auth_headers
+        )
+        assert response.status_code == 200
+        assert response.json()["results"][0]["title"] == "Warm"
+        assert mock_ddgs_instance.text.call_count == 2
+
+    @patch("src.services.ddgs_service.DDGS")
+    def test_streamed_searches_are_logged(
+        self, mock_ddgs, client: TestClient, auth_headers, tmp_path
+    ):
+        """測試NDJSON與SSE串流的搜尋也寫入查詢日誌"""
+        from src.services.warmup import QueryLog, top_logged_queries
+
+        mock_ddgs_instance = MagicMock()
+        mock_ddgs_instance.news.return_value = []
+        mock_ddgs_instance.images.return_value = []
+        mock_ddgs.return_value.__enter__.return_value = mock_ddgs_instance
+
+        log = QueryLog(str(tmp_path / "queries.jsonl"))
+        with patch("src.api.search.query_log", log):
+            client.post(
+                "/search/news",
+                json={"query": "streamed"},
+                headers={**auth_headers, "Accept": "application/x-ndjson"},
+            )
+            client.post(
+                "/search/images",
+                json={"query": "events"},
+                headers={**auth_headers, "Accept": "text/event-stream"},
+            )
+        log.close()
+
+        assert sorted(
+            (entry["type"], entry["query"])
+            for entry in top_logged_queries(log.path, 10)
+        ) == [("images", "events"), ("news", "streamed")]
+
+
+class TestRateLimiting:
+    """測試請求速率限制"""
+
+    @patch("src.services.ddgs_service.DDGS")
+    def test_search_rejected_after_burst(
+        self, mock_ddgs, client: TestClient, auth_headers
+    ):
+        """測試超過IP額度時回應429並附帶RateLimit標頭，健康檢查不受限制"""
+        from src.core.config import settings
+        from src.services.rate_limit import MemoryRateLimiter
+
+        mock_ddgs_instance = MagicMock()
+        mock_ddgs_instance.text.return_value = []
+        mock_ddgs.return_value.__enter__.return_value = mock_ddgs_instance
+
+        with patch.object(settings, "RATE_LIMIT_ENABLED", True), patch(
+            "src.api.middleware.ip_rate_limiter", MemoryRateLimiter(rate=0.1, burst=2)
+        ):
+            responses = [
+                client.post("/search", json={"query": "q"}, headers=auth_headers)
+                for _ in range(3)
+            ]
+            health = client.get("/health")
+
+        assert [r.status_code for r in responses] == [200, 200, 429]
+        assert responses[0].headers["RateLimit-Limit"] == "2"
+        assert responses[0].headers["RateLimit-Remaining"] == "1"
+        assert responses[0].headers["RateLimit-Policy"] == "2;w=20"
+        assert responses[2].headers["Retry-After"] == "10"
+        assert responses[2].json()["status_code"] == 429
+        assert mock_ddgs_instance.text.call_count == 1
+        assert health.status_code == 200
+        assert "RateLimit-Limit" not in health.headers
+
+    @patch("src.services.ddgs_service.DDGS")
+    def test_tokens_limited_independently(self, mock_ddgs, client: TestClient):
+        """測試每個API token各自計算額度"""
+        from src.core.config import settings
+        from src.services.auth_service import TokenRegistry
+        from src.services.rate_limit import MemoryRateLimiter
+
+        mock_ddgs_instance = MagicMock()
+        mock_ddgs_instance.news.return_value = []
+        mock_ddgs.return_value.__enter__.return_value = mock_ddgs_instance
+
+        def search(token):
+            return client.post(
+                "/search/news",
+                json={"query": "q"},
+                headers={"Authorization": f"Bearer {token}"},
+            ).status_code
+
+        with patch.object(settings, "RATE_LIMIT_ENABLED", True), patch(
+            "src.api.middleware.token_rate_limiter",
+            MemoryRateLimiter(rate=0.1, burst=1),
+        ), patch(
+            "src.services.auth_service.token_registry", TokenRegistry(env_tokens="a,b")
+        ):
+            assert [search("a"), search("a"), search("b")] == [200, 429, 200]
+
+    @patch("src.services.ddgs_service.DDGS")
+    def test_unknown_tokens_share_ip_bucket(self, mock_ddgs, client: TestClient):
+        """測試無效的token不建立token bucket，只計入IP額度"""
+        from src.core.config import settings
+        from src.services.auth_service import TokenRegistry
+        from src.services.rate_limit import MemoryRateLimiter
+
+        mock_ddgs.return_value.__enter__.return_value.news.return_value = []
+        token_limiter = MemoryRateLimiter(rate=0.1, burst=5)
+
+        def search(token):
+            return client.post(
+                "/search/news",
+                json={"query": "q"},
+                headers={"Authorization": f"Bearer {token}"},
+            ).status_code
+
+        with patch.object(settings, "RATE_LIMIT_ENABLED", True), patch(
+            "src.api.middleware.token_rate_limiter", token_limiter
+        ), patch(
+            "src.api.middleware.ip_rate_limiter", MemoryRateLimiter(rate=0.1, burst=2)
+        ), patch(
+            "src.services.auth_service.token_registry", TokenRegistry(env_tokens="a")
+        ):
+            assert [search("x"), search("y"), search("z")] == [200, 200, 429]
+
+        assert token_limiter.stats()["keys"] == 0
+
+    @patch("src.services.ddgs_service.DDGS")
+    def test_token_rejection_keeps_ip_quota(self, mock_ddgs, client: TestClient):
+        """測試token額度用盡時不消耗IP額度"""
+        from src.core.config import settings
+        from src.services.auth_service import TokenRegistry
+        from src.services.rate_limit import MemoryRateLimiter
+
+        mock_ddgs.return_value.__enter__.return_value.news.return_value = []
+        ip_limiter = MemoryRateLimiter(rate=0.1, burst=2)
+
+        def search(token):
+            return client.post(
+                "/search/news",
+                json={"query": "q"},
+                headers={"Authorization": f"Bearer {token}"},
+            ).status_code
+
+        with patch.object(settings, "RATE_LIMIT_ENABLED", True), patch(
+            "src.api.middleware.token_rate_limiter",
+            MemoryRateLimiter(rate=0.1, burst=1),
+        ), patch("src.api.middleware.ip_rate_limiter", ip_limiter), patch(
+            "src.services.auth_service.token_registry", TokenRegistry(env_tokens="a,b")
+        ):
+            assert [search("a"), search("a"), search("a")] == [200, 429, 429]
+            assert search("b") == 200
+
+        assert ip_limiter.stats()["allowed"] == 2
+
+    @patch("src.services.ddgs_service.DDGS")
+    def test_ip_rejection_refunds_token_quota(self, mock_ddgs, client: TestClient):
+        """測試IP額度用盡時歸還已取出的token額度，不影響共用token的其他客戶端"""
+        from src.core.config import settings
+        from src.services.auth_service import TokenRegistry, token_digest
+        from src.services.rate_limit import MemoryRateLimiter
+
+        mock_ddgs.return_value.__enter__.return_value.news.return_value = []
+        token_limiter = MemoryRateLimiter(rate=0.001, burst=5)
+
+        def search():
+            return client.post(
+                "/search/news",
+                json={"query": "q"},
+                headers={"Authorization": "Bearer a"},
+            )
+
+        with patch.object(settings, "RATE_LIMIT_ENABLED", True), patch(
+            "src.api.middleware.token_rate_limiter", token_limiter
+        ), patch(
+            "src.api.middleware.ip_rate_limiter", MemoryRateLimiter(rate=0.001, burst=1)
+        ), patch(
+            "src.services.auth_service.token_registry", TokenRegistry(env_tokens="a")
+        ):
+            first = search()
+            rejected = [search(), search()]
+
+        assert first.status_code == 200
+        assert first.headers["RateLimit-Remaining"] == "0"
+        assert [r.status_code for r in rejected] == [429, 429]
+        assert token_limiter.acquire(token_digest("a")).remaining == 3
+
+
+class TestTokenScopes:
+    """測試token清單的搜尋類型與限速設定"""
+
+    @patch("src.services.ddgs_service.DDGS")
+    def test_scoped_token(self, mock_ddgs, auth_client: TestClient, tmp_path):
+        """測試token只能執行允許的搜尋類型，並套用個別限速"""
+        import json
+        from src.services.auth_service import TokenRegistry
+
+        mock_ddgs_instance = MagicMock()
+        mock_ddgs_instance.news.return_value = []
+        mock_ddgs.return_value.__enter__.return_value = mock_ddgs_instance
+
+        path = tmp_path / "tokens.json"
+        path.write_text(
+            json.dumps(
+                [
+                    {
+                        "name": "news-reader",
+                        "token": "scoped",
+                        "search_types": ["news"],
+                        "rate_limit": 0.1,
+                        "burst": 1,
+                    }
+                ]
+            )
+        )
+        registry = TokenRegistry(path=str(path))
+        headers = {"Authorization": "Bearer scoped"}
+
+        with patch("src.services.auth_service.token_registry", registry):
+            text = auth_client.post("/search", json={"query": "q"}, headers=headers)
+            news = auth_client.post(
+                "/search/news", json={"query": "q"}, headers=headers
+            )
+            with patch("src.api.middleware.settings.RATE_LIMIT_ENABLED", True):
+                first = auth_client.post(
+                    "/search/news", json={"query": "q"}, headers=headers
+                )
+                second = auth_client.post(
+                    "/search/news", json={"query": "q"}, headers=headers
+                )
+
+        assert text.status_code == 403
+        assert "news-reader" in text.json()["message"]
+        assert news.status_code == 200
+        assert first.status_code == 200
+        assert first.headers["RateLimit-Limit"] == "1"
+        assert second.status_code == 429
+
+
+class TestMetricsEndpoint:
+    """測試Prometheus指標端點"""
+
+    @patch("src.services.ddgs_service.DDGS")
+    def test_metrics_after_search(self, mock_ddgs, client: TestClient, auth_headers):
+        """測試搜尋後指標以路由樣板與搜尋類型分類"""
+        mock_ddgs_instance = MagicMock()
+        mock_ddgs_instance.images.return_value = [
+            {"title": "Image", "image": "https://example.com/a.jpg"}
+        ]
+        mock_ddgs.return_value.__enter__.return_value = mock_ddgs_instance
+
+        response = client.post(
+            "/search/images", json={"query": "metrics"}, headers=auth_headers
+        )
+        assert response.status_code == 200
+
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+
+        text = response.text
+        assert (
+            'http_requests_total{route="/search/images",method="POST",status="200"}'
+            in text
+        )
+        assert 'search_transform_seconds_count{search_type="images"}' in text
+        assert (
+            'ddgs_upstream_duration_seconds_count{search_type="images",'
+            'backend="thread"}' in text
+        )
+        assert 'response_serialization_seconds_count{model="ImageSearchResponse"}' in (
+            text
+        )
+        assert "search_executor_queue_wait_seconds_bucket" in text
+        assert "http_requests_in_flight" in text
+
+
 class TestAuthentication:
     """測試認證功能"""
 
@@ -23,6 +23,19 @@ class TestIntegration:
         response = client.get("/health")
         assert response.status_code == 200
 
+    def test_lifespan_manages_ddgs_pool(self, app):
+        """測試應用程式生命週期啟動與關閉DDGS客戶端池"""
+        from unittest.mock import MagicMock, patch
+        from src.services.ddgs_service import ddgs_pool
+
+        with patch("src.services.ddgs_service.DDGS", MagicMock()):
+            with TestClient(app) as client:
+                health = client.get("/health").json()
+                assert health["ddgs_pool"]["started"] is True
+
+        assert ddgs_pool.started is False
+        assert ddgs_pool.stats()["alive"] == 0
+
     def test_cors_headers(self, client: TestClient):
         """測試CORS設定"""
         # 使用GET請求來測試CORS headers，因為OPTIONS不被支援
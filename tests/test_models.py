@@ -11,7 +11,12 @@ from pydantic import ValidationError
 # 添加src目錄到Python路徑
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
 
-from src.models.requests import SearchRequest, ImageSearchRequest, NewsSearchRequest
+from src.models.requests import (
+    SearchRequest,
+    ImageSearchRequest,
+    NewsSearchRequest,
+    BatchSearchRequest,
+)
 from src.models.responses import SearchResponse, SearchResult
 
 
@@ -64,6 +69,14 @@ class TestRequestModels:
         with pytest.raises(ValidationError):
             SearchRequest(query="test", max_results=101)
 
+    def test_search_request_timeout(self):
+        """測試截止時間欄位"""
+        assert SearchRequest(query="test").timeout is None
+        assert SearchRequest(query="test", timeout=2.5).timeout == 2.5
+
+        with pytest.raises(ValidationError):
+            SearchRequest(query="test", timeout=0)
+
     def test_image_search_request_valid(self):
         """測試有效的圖片搜尋請求"""
         request = ImageSearchRequest(
@@ -88,6 +101,23 @@ class TestRequestModels:
         assert request.time_limit == "d"
         assert request.max_results == 3
 
+    def test_batch_search_request_discriminates_types(self):
+        """測試批次搜尋請求依type解析項目"""
+        request = BatchSearchRequest(
+            items=[
+                {"type": "text", "query": "web"},
+                {"type": "images", "query": "logo", "size": "Large"},
+                {"type": "news", "query": "tech", "time_limit": "d"},
+            ]
+        )
+        assert isinstance(request.items[0], SearchRequest)
+        assert isinstance(request.items[1], ImageSearchRequest)
+        assert request.items[1].size == "Large"
+        assert isinstance(request.items[2], NewsSearchRequest)
+
+        with pytest.raises(ValidationError):
+            BatchSearchRequest(items=[{"query": "missing type"}])
+
 
 class TestResponseModels:
     """測試回應模型"""
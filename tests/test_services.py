@@ -2,8 +2,10 @@
 服務層測試
 """
 
+import asyncio
 import os
 import sys
+import time
 from unittest.mock import MagicMock, patch
 
 import pytest
@@ -14,7 +16,54 @@ from fastapi.security import HTTPAuthorizationCredentials
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
 
 from src.services.ddgs_service import DDGSService
-from src.services.auth_service import verify_token
+from src.services.auth_service import (
+    DEFAULT_TOKEN_INFO,
+    TokenInfo,
+    TokenRegistry,
+    parse_token_entries,
+    token_digest,
+    verify_token,
+)
+from src.services.cache import (
+    CacheBackend,
+    SearchCache,
+    SQLiteSearchCache,
+    decode_results,
+    encode_results,
+    make_cache_key,
+)
+from src.services.singleflight import SingleFlight
+from src.services.archive import SegmentArchive
+from src.services.rate_limit import (
+    MemoryRateLimiter,
+    RateLimiter,
+    SQLiteRateLimiter,
+)
+from src.services.replay import UpstreamTape, read_tape
+from src.services.normalization import normalize_params, normalize_query
+from src.services.warmup import (
+    CacheWarmer,
+    QueryLog,
+    load_warmup_queries,
+    top_logged_queries,
+)
+from src.models.requests import NewsSearchRequest, SearchRequest
+from src.services.dedup import (
+    ResultDeduplicator,
+    canonical_url,
+    dedupe_results,
+    strip_tracking_params,
+)
+from src.services.ddgs_pool import DDGSClientPool, PoolExhaustedError
+from src.services.executor import BoundedExecutor, ExecutorSaturatedError
+from src.services.async_backend import AsyncDDGSBackend, extract_vqd
+from src.core.metrics import MetricsRegistry
+from src.services.circuit_breaker import CircuitBreaker, CircuitOpenError
+from src.services.hedging import RequestHedger
+from src.services.concurrency import (
+    AdaptiveConcurrencyLimiter,
+    ConcurrencyLimitError,
+)
 
 
 class TestDDGSService:
@@ -304,6 +353,1847 @@ class TestDDGSService:
             max_results=10,
         )
 
+    @patch("src.services.ddgs_service.DDGS")
+    @pytest.mark.asyncio
+    async def test_search_uses_cache(self, mock_ddgs):
+        """測試相同搜尋參數會命中快取"""
+        mock_ddgs_instance = MagicMock()
+        mock_ddgs_instance.text.return_value = [
+            {"title": "Cached", "href": "https://example.com", "body": "body"}
+        ]
+        mock_ddgs.return_value.__enter__.return_value = mock_ddgs_instance
+
+        first = await DDGSService.search("text", query="cache me", max_results=5)
+        second = await DDGSService.search("text", query="cache me", max_results=5)
+
+        assert first == second
+        mock_ddgs_instance.text.assert_called_once()
+
+    @patch("src.services.ddgs_service.DDGS")
+    @pytest.mark.asyncio
+    async def test_search_coalesces_concurrent_requests(self, mock_ddgs):
+        """測試相同參數的並發請求只呼叫上游一次"""
+        import asyncio
+        import time
+
+        def slow_text(*args, **kwargs):
+            time.sleep(0.05)
+            return [{"title": "Shared", "href": "https://example.com", "body": ""}]
+
+        mock_ddgs_instance = MagicMock()
+        mock_ddgs_instance.text.side_effect = slow_text
+        mock_ddgs.return_value.__enter__.return_value = mock_ddgs_instance
+
+        with patch("src.services.ddgs_service.settings.CACHE_ENABLED", False):
+            results = await asyncio.gather(
+                *[DDGSService.search("text", query="trending") for _ in range(5)]
+            )
+
+        assert all(r[0]["title"] == "Shared" for r in results)
+        mock_ddgs_instance.text.assert_called_once()
+
+    @pytest.mark.asyncio
+    @patch("src.services.ddgs_service.DDGS")
+    async def test_stale_cache_served_while_revalidating(self, mock_ddgs):
+        """測試過時快取立即回傳，並只在背景更新一次"""
+        import asyncio
+        from src.services.cache import search_cache
+
+        mock_ddgs_instance = MagicMock()
+        mock_ddgs_instance.text.return_value = [{"title": "fresh"}]
+        mock_ddgs.return_value.__enter__.return_value = mock_ddgs_instance
+
+        key = make_cache_key("text", normalize_params({"query": "swr"}))
+        ttl = search_cache.ttl_for("text")
+        with patch("src.services.cache.time.monotonic", return_value=0.0):
+            search_cache.set(key, [{"title": "old"}], "text")
+        with patch("src.services.cache.time.monotonic", return_value=ttl + 1):
+            first = await DDGSService.search("text", query="swr")
+            second = await DDGSService.search("text", query="swr")
+            refreshes = list(DDGSService._revalidations.values())
+
+        assert first == second == [{"title": "old"}]
+        assert len(refreshes) == 1
+        await asyncio.gather(*refreshes)
+
+        assert mock_ddgs_instance.text.call_count == 1
+        assert search_cache.get(key) == [{"title": "fresh"}]
+
+    @pytest.mark.asyncio
+    async def test_search_unsupported_type(self):
+        """測試不支援的搜尋類型"""
+        with pytest.raises(ValueError):
+            await DDGSService.search("videos", query="test")
+
+
+class TestSearchCache:
+    """測試搜尋結果快取"""
+
+    def test_incomplete_backends_fail_on_instantiation(self):
+        """測試未實作抽象方法的快取、限速器與指標在建立時即失敗"""
+        from src.core.metrics import _Metric
+
+        class PartialCache(CacheBackend):
+            def lookup(self, key, include_expired=False):
+                return None
+
+        class PartialLimiter(RateLimiter):
+            pass
+
+        with pytest.raises(TypeError):
+            PartialCache({})
+        with pytest.raises(TypeError):
+            PartialLimiter(1.0, 1)
+        with pytest.raises(TypeError):
+            _Metric("partial", "Partial metric")
+
+    def test_cache_hit_and_miss(self):
+        """測試快取命中與未命中統計"""
+        cache = SearchCache(max_entries=10, max_bytes=1024 * 1024, ttls={"text": 60})
+        key = make_cache_key("text", {"query": "test"})
+
+        assert cache.get(key) is None
+        cache.set(key, [{"title": "a"}], "text")
+        assert cache.get(key) == [{"title": "a"}]
+
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["entries"] == 1
+
+    def test_stale_entry_served_until_hard_expiry(self):
+        """測試超過軟性TTL後標記為過時，超過硬性期限後移除"""
+        cache = SearchCache(
+            max_entries=10, max_bytes=1024 * 1024, ttls={"news": 10}, stale_ttl=20
+        )
+
+        with patch("src.services.cache.time.monotonic", return_value=100.0):
+            cache.set("k", [{"title": "a"}], "news")
+        with patch("src.services.cache.time.monotonic", return_value=105.0):
+            assert cache.lookup("k") == ([{"title": "a"}], False)
+        with patch("src.services.cache.time.monotonic", return_value=115.0):
+            assert cache.lookup("k") == ([{"title": "a"}], True)
+            assert cache.get("k") is None
+        with patch("src.services.cache.time.monotonic", return_value=131.0):
+            assert cache.lookup("k") is None
+
+        assert cache.stats()["stale_hits"] == 2
+        assert cache.stats()["entries"] == 0
+
+    def test_ttl_jitter_shortens_expiry(self):
+        """測試TTL抖動只會縮短軟性期限"""
+        cache = SearchCache(
+            max_entries=10,
+            max_bytes=1024 * 1024,
+            ttls={"text": 100},
+            stale_ttl=50,
+            ttl_jitter=0.2,
+        )
+
+        expiries = [cache.expiry("text", 0.0) for _ in range(50)]
+        assert all(80.0 <= fresh <= 100.0 for fresh, _ in expiries)
+        assert all(hard == fresh + 50 for fresh, hard in expiries)
+        assert len({fresh for fresh, _ in expiries}) > 1
+
+    def test_cache_expiry(self):
+        """測試快取項目過期"""
+        cache = SearchCache(max_entries=10, max_bytes=1024 * 1024, ttls={"news": 10})
+        key = make_cache_key("news", {"query": "test"})
+
+        with patch("src.services.cache.time.monotonic", return_value=100.0):
+            cache.set(key, [{"title": "a"}], "news")
+        with patch("src.services.cache.time.monotonic", return_value=111.0):
+            assert cache.get(key) is None
+
+        assert cache.stats()["entries"] == 0
+
+    def test_cache_lru_eviction_by_count(self):
+        """測試依項目數量的LRU淘汰"""
+        cache = SearchCache(max_entries=2, max_bytes=1024 * 1024, ttls={})
+        cache.set("a", [], "text")
+        cache.set("b", [], "text")
+        cache.get("a")
+        cache.set("c", [], "text")
+
+        assert cache.get("a") == []
+        assert cache.get("b") is None
+        assert cache.stats()["evictions"] == 1
+
+    def test_cache_eviction_by_size(self):
+        """測試依大小的淘汰"""
+        cache = SearchCache(max_entries=100, max_bytes=1000, ttls={})
+        big = [{"body": "x" * 400}]
+        cache.set("a", big, "text")
+        cache.set("b", big, "text")
+
+        assert cache.get("a") is None
+        assert cache.get("b") == big
+        assert cache.stats()["bytes"] <= 1000
+
+    def test_cache_key_is_order_independent(self):
+        """測試快取鍵與參數順序無關"""
+        assert make_cache_key("text", {"query": "q", "region": "us-en"}) == (
+            make_cache_key("text", {"region": "us-en", "query": "q"})
+        )
+        assert make_cache_key("text", {"query": "q"}) != make_cache_key(
+            "news", {"query": "q"}
+        )
+
+
+class TestSQLiteSearchCache:
+    """測試跨worker共用的SQLite快取後端"""
+
+    def make_cache(self, path, max_entries=10):
+        return SQLiteSearchCache(
+            path=str(path),
+            max_entries=max_entries,
+            max_bytes=1024 * 1024,
+            ttls={"text": 60, "news": 10},
+        )
+
+    def test_shared_between_instances(self, tmp_path):
+        """測試不同實例(如不同worker)共用同一個快取檔案"""
+        path = tmp_path / "cache.sqlite3"
+        writer = self.make_cache(path)
+        reader = self.make_cache(path)
+        results = [{"title": "標題", "href": "https://example.com", "body": "b"}]
+
+        assert reader.get("k") is None
+        writer.set("k", results, "text")
+        assert reader.get("k") == results
+
+        stats = reader.stats()
+        assert stats["backend"] == "sqlite"
+        assert stats["entries"] == 1
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+
+    def test_ttl_enforced_at_read(self, tmp_path):
+        """測試讀取時依系統時間判斷過期"""
+        cache = self.make_cache(tmp_path / "cache.sqlite3")
+
+        with patch("src.services.cache.time.time", return_value=1000.0):
+            cache.set("k", [{"title": "a"}], "news")
+        with patch("src.services.cache.time.time", return_value=1009.0):
+            assert cache.get("k") == [{"title": "a"}]
+        with patch("src.services.cache.time.time", return_value=1011.0):
+            assert cache.get("k") is None
+
+    def test_prune_limits_entries(self, tmp_path):
+        """測試清理時淘汰最舊的項目"""
+        cache = self.make_cache(tmp_path / "cache.sqlite3", max_entries=2)
+        for index, key in enumerate(["a", "b", "c"]):
+            with patch("src.services.cache.time.time", return_value=1000.0 + index):
+                cache.set(key, [], "text")
+
+        with patch("src.services.cache.time.time", return_value=1005.0):
+            cache.prune()
+            assert cache.get("a") is None
+            assert cache.get("c") == []
+        assert cache.stats()["evictions"] == 1
+
+    def test_prune_enforces_byte_budget(self, tmp_path):
+        """測試總大小超出上限時淘汰最舊的項目"""
+        results = [{"title": os.urandom(200).hex()}]
+        size = len(encode_results(results))
+        cache = SQLiteSearchCache(
+            path=str(tmp_path / "cache.sqlite3"),
+            max_entries=100,
+            max_bytes=size * 3,
+            ttls={"text": 60},
+        )
+        for index, key in enumerate(["a", "b", "c", "d"]):
+            with patch("src.services.cache.time.time", return_value=1000.0 + index):
+                cache.set(key, results, "text")
+
+        with patch("src.services.cache.time.time", return_value=1005.0):
+            assert cache.get("a") is None
+            assert cache.get("d") == results
+        stats = cache.stats()
+        assert stats["bytes"] <= size * 3
+        assert stats["evictions"] >= 1
+
+    @pytest.mark.asyncio
+    async def test_async_access_runs_in_thread(self, tmp_path):
+        """測試非同步呼叫在執行緒中存取SQLite"""
+        import threading
+
+        cache = self.make_cache(tmp_path / "cache.sqlite3")
+        threads = []
+        original = cache.lookup
+
+        def lookup(*args, **kwargs):
+            threads.append(threading.current_thread())
+            return original(*args, **kwargs)
+
+        cache.lookup = lookup
+        await cache.aset("k", [{"title": "a"}], "text")
+        assert await cache.alookup("k") == ([{"title": "a"}], False)
+        assert (await cache.astats())["entries"] == 1
+        assert threads and threads[0] is not threading.main_thread()
+
+    def test_compact_encoding(self):
+        """測試結果序列化為壓縮格式且可還原"""
+        results = [
+            {"title": f"Result {i}", "href": "https://example.com/page", "body": "x"}
+            for i in range(20)
+        ]
+        blob = encode_results(results)
+
+        assert decode_results(blob) == results
+        assert len(blob) < len(str(results)) / 2
+
+
+class TestResultDeduplication:
+    """測試搜尋結果URL正規化與去重"""
+
+    def test_canonical_url_ignores_cosmetic_differences(self):
+        """測試協定、鏡像主機、結尾斜線、片段與追蹤參數不影響正規化結果"""
+        expected = canonical_url("https://example.com/page?a=1&b=2")
+        for variant in (
+            "http://example.com/page?b=2&a=1",
+            "https://www.Example.com/page/?a=1&b=2#section",
+            "https://m.example.com:443/page?a=1&utm_source=news&b=2&fbclid=x",
+        ):
+            assert canonical_url(variant) == expected
+        assert canonical_url("https://example.com/Page") != expected
+        assert canonical_url("https://example.com:8080/page?a=1&b=2") != expected
+        assert canonical_url("not a url") == "not a url"
+
+    def test_mirror_prefix_kept_when_it_is_the_domain(self):
+        """測試移除鏡像前綴後只剩頂級網域時保留原主機"""
+        assert canonical_url("https://mobile.de/auto") == "mobile.de/auto"
+        assert canonical_url("https://www.amp.dev/") == "amp.dev"
+        assert canonical_url("https://amp.dev/") != canonical_url("https://dev/")
+        assert canonical_url("https://m.mobile.de/a") == "mobile.de/a"
+
+    def test_strip_tracking_params_keeps_other_parts(self):
+        """測試只移除追蹤參數"""
+        url = "http://Example.com/a?id=7&utm_medium=email&gclid=1#top"
+        assert strip_tracking_params(url) == "http://Example.com/a?id=7#top"
+        assert strip_tracking_params("https://example.com/a?id=7") == (
+            "https://example.com/a?id=7"
+        )
+
+    def test_deduplicates_by_search_type_url_field(self):
+        """測試依各搜尋類型的URL欄位去重且不修改原始結果"""
+        images = [
+            {"image": "https://cdn.example.com/1.jpg", "url": "https://a.com"},
+            {"image": "http://cdn.example.com/1.jpg", "url": "https://b.com"},
+            {"image": "", "url": "https://c.com/?utm_campaign=x"},
+            {"title": "no url"},
+            {"title": "no url"},
+        ]
+        unique = dedupe_results("images", images)
+        assert [r.get("url") for r in unique] == [
+            "https://a.com",
+            "https://c.com/",
+            None,
+            None,
+        ]
+        assert images[2]["url"] == "https://c.com/?utm_campaign=x"
+
+    def test_deduplicator_remembers_previous_pages(self):
+        """測試同一去重器跨分頁去除重複"""
+        deduplicator = ResultDeduplicator("news")
+        assert len(deduplicator.filter([{"url": "https://n.com/1"}])) == 1
+        assert deduplicator.filter(
+            [{"url": "https://n.com/1/"}, {"url": "https://n.com/2"}]
+        ) == [{"url": "https://n.com/2"}]
+        assert deduplicator.removed == 1
+
+
+class TestSegmentArchive:
+    """測試磁碟搜尋結果封存"""
+
+    def make_archive(self, directory, **overrides):
+        options = dict(
+            directory=str(directory),
+            segment_bytes=1024 * 1024,
+            max_bytes=10 * 1024 * 1024,
+            ttls={"text": 60},
+            stale_ttl=60,
+            refresh_interval=0,
+        )
+        options.update(overrides)
+        return SegmentArchive(**options)
+
+    def test_warm_start_reads_existing_segments(self, tmp_path):
+        """測試重新啟動的程序可讀取先前寫入的結果"""
+        results = [{"title": "Archived", "href": "https://example.com"}]
+        writer = self.make_archive(tmp_path)
+        writer.set("key-1", results, "text")
+        writer.flush()
+        writer.close()
+
+        reader = self.make_archive(tmp_path)
+        reader.refresh()
+        assert reader.stats()["entries"] == 1
+        assert reader.lookup("key-1") == (results, False)
+        assert reader.lookup("key-2") is None
+        reader.close()
+
+    def test_other_workers_see_new_records(self, tmp_path):
+        """測試其他程序附加的紀錄在refresh後可讀取，讀取時不掃描且不讀取未完成的紀錄"""
+        reader = self.make_archive(tmp_path)
+        reader.refresh()
+        writer = self.make_archive(tmp_path)
+        writer.set("shared", [{"title": "new"}], "text")
+        writer.flush()
+
+        segment = os.path.join(str(tmp_path), os.listdir(str(tmp_path))[0])
+        with open(segment, "ab") as f:
+            f.write(b"SRA1partial")
+
+        assert reader.lookup("shared") is None
+        reader.refresh()
+        assert reader.lookup("shared") == ([{"title": "new"}], False)
+        assert reader.stats()["entries"] == 1
+        writer.close()
+        reader.close()
+
+    def test_stale_and_expired_entries(self, tmp_path):
+        """測試超過軟性TTL的項目標記為過時，超過硬性期限時只在要求時回傳"""
+        archive = self.make_archive(tmp_path, ttls={"text": 0}, stale_ttl=60)
+        archive.set("stale", [{"title": "old"}], "text")
+        archive.flush()
+        assert archive.lookup("stale") == ([{"title": "old"}], True)
+
+        expired = self.make_archive(tmp_path / "expired", ttls={"text": 0}, stale_ttl=0)
+        expired.set("gone", [{"title": "old"}], "text")
+        expired.flush()
+        assert expired.lookup("gone") is None
+        assert expired.lookup("gone", include_expired=True) == (
+            [{"title": "old"}],
+            True,
+        )
+        archive.close()
+        expired.close()
+
+    def test_rotates_segments_and_enforces_size_limit(self, tmp_path):
+        """測試區段輪替並在超過總大小時刪除最舊的區段"""
+        archive = self.make_archive(tmp_path, segment_bytes=300, max_bytes=900)
+        for i in range(20):
+            archive.set(f"key-{i}", [{"title": "x" * 100, "n": i}], "text")
+        archive.flush()
+
+        stats = archive.stats()
+        assert stats["writes"] == 20
+        assert 1 < stats["segments"] <= 5
+        assert archive.lookup("key-0") is None
+        assert archive.lookup("key-19") == ([{"title": "x" * 100, "n": 19}], False)
+        archive.close()
+
+    def test_keeps_segments_other_workers_may_write(self, tmp_path):
+        """測試只刪除已封閉的區段，不刪除其他程序可能仍在寫入的舊區段"""
+        from src.services.archive import SEGMENT_SEAL_SECONDS, segment_name
+
+        other = tmp_path / segment_name(1)
+        other.write_bytes(b"\0" * 100)
+        (tmp_path / segment_name(2)).write_bytes(b"\0" * 100)
+        archive = self.make_archive(tmp_path, segment_bytes=300, max_bytes=150)
+        archive.set("key", [{"title": "x"}], "text")
+        archive.flush()
+        assert other.exists()
+
+        sealed_at = time.time() - SEGMENT_SEAL_SECONDS - 1
+        os.utime(other, (sealed_at, sealed_at))
+        for i in range(5):
+            archive.set(f"key-{i}", [{"title": "x" * 100, "n": i}], "text")
+        archive.flush()
+        assert not other.exists()
+        archive.close()
+
+    @pytest.mark.asyncio
+    @patch("src.services.ddgs_service.DDGS")
+    async def test_service_uses_archive_as_second_tier(self, mock_ddgs, tmp_path):
+        """測試記憶體快取未命中時由封存回應，上游結果也會寫入封存"""
+        from src.services.cache import search_cache
+
+        archive = self.make_archive(tmp_path)
+        mock_ddgs_instance = MagicMock()
+        mock_ddgs_instance.news.return_value = [{"title": "fresh", "url": "u"}]
+        mock_ddgs.return_value.__enter__.return_value = mock_ddgs_instance
+
+        with patch("src.services.ddgs_service.search_archive", archive):
+            await DDGSService.search("news", query="archive me")
+            archive.flush()
+            search_cache.clear()
+
+            results = await DDGSService.search("news", query="archive me")
+
+            promoted = await DDGSService.search("news", query="archive me")
+
+        assert results == promoted == [{"title": "fresh", "url": "u"}]
+        assert mock_ddgs_instance.news.call_count == 1
+        assert archive.stats()["hits"] == 1
+        assert search_cache.stats()["hits"] == 1
+        archive.close()
+
+
+class TestCacheWarmup:
+    """測試快取預熱"""
+
+    def test_loads_query_file_then_most_common_logged_queries(self, tmp_path):
+        """測試查詢清單優先，查詢日誌依出現次數補足並去除重複"""
+        queries = tmp_path / "queries.txt"
+        queries.write_text(
+            "# top queries\n" "python\n" '{"type": "news", "query": "release"}\n' "\n"
+        )
+        log = QueryLog(str(tmp_path / "logs" / "queries.jsonl"))
+        for query, count in (("rare", 1), ("python", 2), ("popular", 3)):
+            for _ in range(count):
+                log.record("text", SearchRequest(query=query))
+        log.close()
+
+        entries = load_warmup_queries(str(queries), log.path, limit=3)
+
+        assert entries == [
+            {"type": "text", "query": "python"},
+            {"type": "news", "query": "release"},
+            {"type": "text", "query": "popular"},
+        ]
+        assert load_warmup_queries(str(tmp_path / "missing"), None, 10) == []
+
+    def test_query_log_keeps_only_non_default_fields(self, tmp_path):
+        """測試查詢日誌只記錄非預設欄位，不記錄timeout"""
+        log = QueryLog(str(tmp_path / "queries.jsonl"))
+        log.record("news", NewsSearchRequest(query="ai", max_results=5, timeout=3))
+        log.close()
+
+        assert top_logged_queries(log.path, 10) == [
+            {"type": "news", "query": "ai", "max_results": 5}
+        ]
+
+    def test_skips_undecodable_and_malformed_lines(self, tmp_path):
+        """測試無法解碼或格式不正確的行被略過，其餘查詢照常載入"""
+        queries = tmp_path / "queries.txt"
+        queries.write_bytes(
+            b"python\n"
+            b"\xff\xfe broken\n"
+            b'{"type": "news", "query": \n'
+            b'{"query": "ok"}\n'
+        )
+        log = tmp_path / "queries.jsonl"
+        log.write_bytes(b'{"type":"text","query":"logged"}\n\xff\n{bad\n')
+
+        entries = load_warmup_queries(str(queries), str(log), limit=10)
+
+        assert entries == [
+            {"type": "text", "query": "python"},
+            {"query": "ok"},
+            {"type": "text", "query": "logged"},
+        ]
+
+    def test_failed_attempt_marks_ready(self):
+        """測試無法開始的預熱仍視為結束，健康檢查不會一直回報warming"""
+        warmer = CacheWarmer(rate=0, concurrency=1)
+        warmer.fail(ValueError("bad source"))
+
+        stats = warmer.stats()
+        assert warmer.ready
+        assert stats["state"] == "failed"
+
+    def test_query_log_writes_in_background(self, tmp_path):
+        """測試查詢日誌由背景執行緒寫入，佇列已滿時捨棄，關閉時寫入等待中的紀錄"""
+        log = QueryLog(str(tmp_path / "queries.jsonl"), max_queue=2)
+        with patch.object(log, "_ensure_writer"):
+            for query in ("a", "b", "c"):
+                log.record("text", SearchRequest(query=query))
+        assert log.dropped == 1
+        assert not os.path.exists(log.path)
+
+        log.close()
+        log.record("text", SearchRequest(query="d"))
+        log.close()
+
+        queries = [entry["query"] for entry in top_logged_queries(log.path, 10)]
+        assert sorted(queries) == ["a", "b", "d"]
+
+    @pytest.mark.asyncio
+    async def test_run_reports_progress_and_failures(self):
+        """測試預熱記錄完成數與失敗數，失敗不中斷其他查詢"""
+        warmer = CacheWarmer(rate=0, concurrency=2)
+        assert not warmer.ready
+        executed = []
+
+        async def execute(entry):
+            executed.append(entry["query"])
+            if entry["query"] == "bad":
+                raise RuntimeError("upstream failed")
+
+        entries = [{"query": q} for q in ("a", "bad", "c")]
+        await asyncio.wait_for(warmer.run(entries, execute), 1)
+
+        stats = warmer.stats()
+        assert sorted(executed) == ["a", "bad", "c"]
+        assert stats["state"] == "completed"
+        assert stats["ready"] is True
+        assert (stats["total"], stats["completed"], stats["failed"]) == (3, 3, 1)
+        assert stats["progress"] == 1.0
+
+    @pytest.mark.asyncio
+    async def test_run_limits_rate_and_concurrency(self):
+        """測試預熱依速率開始搜尋且並發數不超過上限"""
+        warmer = CacheWarmer(rate=50, concurrency=1)
+        active = peak = 0
+
+        async def execute(entry):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+
+        start = time.monotonic()
+        await warmer.run([{"query": str(i)} for i in range(5)], execute)
+
+        assert peak == 1
+        assert time.monotonic() - start >= 4 / 50
+
+
+class TestQueryNormalization:
+    """測試查詢正規化"""
+
+    def test_normalize_query(self):
+        """測試NFKC、空白合併、結尾標點與大小寫摺疊"""
+        assert normalize_query("  Python\u3000 ＦａｓｔＡＰＩ  教程？ ") == (
+            "python fastapi 教程"
+        )
+        assert normalize_query("Cats OR Dogs") == "cats OR dogs"
+        assert normalize_query('"Exact Phrase" -Noise') == '"exact phrase" -noise'
+        assert normalize_query("Straße", casefold=False) == "Straße"
+        assert normalize_query("？？") == "？？"
+
+    def test_normalize_params_fills_defaults(self):
+        """測試region與safesearch預設值並移除None參數"""
+        params = normalize_params(
+            {
+                "query": "News ",
+                "region": None,
+                "safesearch": "Off",
+                "timelimit": None,
+                "max_results": None,
+            }
+        )
+        assert params == {
+            "query": "news",
+            "region": "wt-wt",
+            "safesearch": "off",
+            "max_results": 10,
+        }
+
+        with patch(
+            "src.services.normalization.settings.QUERY_NORMALIZATION_ENABLED", False
+        ):
+            raw = {"query": "News ", "region": None}
+            assert normalize_params(raw) is raw
+
+    @pytest.mark.asyncio
+    @patch("src.services.ddgs_service.DDGS")
+    async def test_equivalent_queries_share_cache_entry(self, mock_ddgs):
+        """測試等價查詢共用快取並記錄正規化指標"""
+        from src.core.metrics import search_normalized_total
+
+        mock_ddgs_instance = MagicMock()
+        mock_ddgs_instance.text.return_value = [{"title": "Shared"}]
+        mock_ddgs.return_value.__enter__.return_value = mock_ddgs_instance
+        before = search_normalized_total.value(search_type="text", outcome="cache_hit")
+
+        await DDGSService.search("text", query="machine learning", region=None)
+        await DDGSService.search("text", query="  Machine  Learning?", region="wt-wt")
+        await DDGSService.search("text", query="ＭＡＣＨＩＮＥ learning")
+
+        mock_ddgs_instance.text.assert_called_once()
+        assert mock_ddgs_instance.text.call_args.args == ("machine learning",)
+        assert mock_ddgs_instance.text.call_args.kwargs["region"] == "wt-wt"
+        assert (
+            search_normalized_total.value(search_type="text", outcome="cache_hit")
+            == before + 2
+        )
+
+    @pytest.mark.asyncio
+    @patch("src.services.ddgs_service.DDGS")
+    async def test_already_normal_query_not_counted(self, mock_ddgs):
+        """測試未被改寫的查詢(只補上預設值或移除None參數)不計入正規化指標"""
+        from src.core.metrics import search_normalized_total
+
+        mock_ddgs_instance = MagicMock()
+        mock_ddgs_instance.text.return_value = [{"title": "Plain"}]
+        mock_ddgs.return_value.__enter__.return_value = mock_ddgs_instance
+        outcomes = ("cache_hit", "coalesced", "upstream")
+        before = [
+            search_normalized_total.value(search_type="text", outcome=outcome)
+            for outcome in outcomes
+        ]
+
+        await DDGSService.search(
+            "text", query="plain query", region="wt-wt", timelimit=None
+        )
+        await DDGSService.search("text", query="plain query", safesearch=None)
+
+        assert mock_ddgs_instance.text.call_count == 1
+        assert [
+            search_normalized_total.value(search_type="text", outcome=outcome)
+            for outcome in outcomes
+        ] == before
+
+
+class TestUpstreamTape:
+    """測試上游錄製與重播"""
+
+    @pytest.mark.asyncio
+    @patch("src.services.ddgs_service.DDGS")
+    async def test_record_then_replay_search(self, mock_ddgs, tmp_path):
+        """測試錄製的搜尋結果可在不呼叫上游的情況下重播"""
+        from src.services.cache import search_cache
+
+        path = str(tmp_path / "upstream.jsonl")
+        mock_ddgs_instance = MagicMock()
+        mock_ddgs_instance.text.return_value = [{"title": "Recorded"}]
+        mock_ddgs.return_value.__enter__.return_value = mock_ddgs_instance
+
+        recorder = UpstreamTape(record_path=path)
+        with patch("src.services.ddgs_service.upstream_tape", recorder):
+            recorded = await DDGSService.search("text", query="tape", max_results=5)
+        recorder.close()
+
+        entries = read_tape(path)
+        assert len(entries) == 1
+        assert entries[0]["op"] == "text_search"
+        assert entries[0]["params"]["query"] == "tape"
+        assert entries[0]["results"] == recorded
+        assert entries[0]["latency"] >= 0
+
+        search_cache.clear()
+        mock_ddgs_instance.text.reset_mock()
+        player = UpstreamTape(replay_path=path, latency_scale=0)
+        with patch("src.services.ddgs_service.upstream_tape", player):
+            replayed = await DDGSService.search("text", query="Tape", max_results=5)
+
+        assert replayed == recorded
+        mock_ddgs_instance.text.assert_not_called()
+        assert player.stats()["replayed"] == 1
+        assert player.stats()["mode"] == "replay"
+
+    def test_replay_errors_misses_and_latency_scale(self, tmp_path):
+        """測試重播錄製的錯誤、找不到錄製時的行為與耗時倍數"""
+        from ddgs.exceptions import DDGSException, RatelimitException
+
+        path = str(tmp_path / "upstream.jsonl")
+        recorder = UpstreamTape(record_path=path)
+
+        def fail():
+            raise RatelimitException("slow down")
+
+        with pytest.raises(RatelimitException):
+            recorder.run("news", "news_search", {"query": "limited"}, fail)
+        recorder.run("text", "fetch_page", {"query": "a", "page": 1}, lambda: [])
+        recorder.close()
+
+        player = UpstreamTape(replay_path=path, latency_scale=0.5)
+        with patch("src.services.replay.time.sleep") as mock_sleep:
+            with pytest.raises(RatelimitException, match="slow down"):
+                player.run("news", "news_search", {"query": "limited"}, fail)
+            assert mock_sleep.call_count == 1
+
+        upstream = MagicMock()
+        with pytest.raises(DDGSException, match="No results found."):
+            player.run("text", "text_search", {"query": "unknown"}, upstream)
+        assert (
+            player.run("text", "fetch_page", {"query": "a", "page": 2}, upstream) == []
+        )
+        upstream.assert_not_called()
+        assert player.stats()["misses"] == 2
+
+    def test_replay_rotates_entries_and_reads_gzip(self, tmp_path):
+        """測試同一參數的多筆錄製依序輪流使用，並可讀取壓縮的錄製檔"""
+        import gzip
+        import json
+
+        path = str(tmp_path / "upstream.jsonl.gz")
+        entries = [
+            {
+                "type": "text",
+                "op": "text_search",
+                "params": {"query": "q"},
+                "latency": 0.2,
+                "results": [{"title": str(i)}],
+            }
+            for i in range(2)
+        ]
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(json.dumps(entry) + "\n")
+            f.write('{"truncated": ')
+
+        player = UpstreamTape(replay_path=path, latency_scale=0)
+        titles = [
+            player.run("text", "text_search", {"query": "q"}, MagicMock())[0]["title"]
+            for _ in range(3)
+        ]
+        assert titles == ["0", "1", "0"]
+        assert player.stats()["loaded"] == 2
+
+    @pytest.mark.asyncio
+    async def test_async_record_and_replay(self, tmp_path):
+        """測試非同步上游呼叫的錄製與重播"""
+        path = str(tmp_path / "upstream.jsonl")
+        recorder = UpstreamTape(record_path=path)
+
+        async def fetch():
+            return [{"title": "Async"}]
+
+        params = {"page": 1, "query": "async"}
+        assert await recorder.arun("text", "async_page", params, fetch) == [
+            {"title": "Async"}
+        ]
+        recorder.close()
+
+        player = UpstreamTape(replay_path=path, latency_scale=0)
+        upstream = MagicMock()
+        assert await player.arun("text", "async_page", params, upstream) == [
+            {"title": "Async"}
+        ]
+        upstream.assert_not_called()
+
+
+class TestRateLimiter:
+    """測試token bucket限速器"""
+
+    def test_burst_then_refill(self):
+        """測試用盡burst後拒絕，並依速率補充"""
+        limiter = MemoryRateLimiter(rate=2, burst=3)
+        with patch("src.services.rate_limit.time.time", return_value=100.0):
+            decisions = [limiter.acquire("client") for _ in range(4)]
+
+        assert [d.allowed for d in decisions] == [True, True, True, False]
+        assert [d.remaining for d in decisions[:3]] == [2, 1, 0]
+        assert decisions[3].retry_after == 1
+        assert decisions[2].reset == 2
+        assert limiter.acquire("other").allowed
+
+        with patch("src.services.rate_limit.time.time", return_value=101.0):
+            refilled = limiter.acquire("client")
+        assert refilled.allowed and refilled.remaining == 1
+        assert limiter.stats()["rejected"] == 1
+
+    @pytest.mark.parametrize("backend", ["memory", "sqlite"])
+    def test_refund_restores_tokens_up_to_burst(self, backend, tmp_path):
+        """測試歸還的token加回bucket，且不超過容量"""
+        if backend == "memory":
+            limiter = MemoryRateLimiter(rate=1, burst=2)
+        else:
+            limiter = SQLiteRateLimiter(
+                str(tmp_path / "ratelimit.sqlite3"), "ip", rate=1, burst=2
+            )
+        with patch("src.services.rate_limit.time.time", return_value=100.0):
+            limiter.acquire("client")
+            limiter.acquire("client")
+            limiter.refund("client")
+            assert limiter.acquire("client").allowed
+            limiter.refund("client")
+            limiter.refund("client")
+            limiter.refund("client")
+            assert limiter.acquire("client").remaining == 1
+
+    def test_memory_limiter_bounds_keys(self):
+        """測試超過鍵數上限時移除最久未使用的bucket"""
+        limiter = MemoryRateLimiter(rate=1, burst=1, max_keys=2)
+        for key in ("a", "b", "c"):
+            limiter.acquire(key)
+        assert limiter.stats()["keys"] == 2
+        assert limiter.acquire("a").allowed
+
+    def test_sqlite_limiter_shares_state_across_instances(self, tmp_path):
+        """測試使用同一檔案的限速器(不同worker)共用bucket，不同範圍互不影響"""
+        path = str(tmp_path / "ratelimit.sqlite3")
+        first = SQLiteRateLimiter(path, "ip", rate=0.01, burst=2)
+        second = SQLiteRateLimiter(path, "ip", rate=0.01, burst=2)
+        tokens = SQLiteRateLimiter(path, "token", rate=0.01, burst=1)
+
+        assert first.acquire("1.2.3.4").allowed
+        assert second.acquire("1.2.3.4").allowed
+        denied = first.acquire("1.2.3.4")
+        assert not denied.allowed
+        assert denied.retry_after >= 1
+        assert tokens.acquire("1.2.3.4").allowed
+        assert first.stats()["keys"] == 1
+
+        first.clear()
+        assert second.acquire("1.2.3.4").allowed
+        assert not tokens.acquire("1.2.3.4").allowed
+
+    @pytest.mark.asyncio
+    async def test_sqlite_limiter_runs_off_the_loop(self, tmp_path):
+        """測試SQLite限速器在執行緒中判斷，被其他連線鎖定時很快允許請求"""
+        import sqlite3
+        import threading
+
+        limiter = SQLiteRateLimiter(
+            str(tmp_path / "ratelimit.sqlite3"), "ip", rate=1, burst=1
+        )
+        threads = []
+        original = limiter.acquire
+
+        def acquire(*args):
+            threads.append(threading.current_thread())
+            return original(*args)
+
+        with patch.object(limiter, "acquire", acquire):
+            assert (await limiter.aacquire("client")).allowed
+        assert threads[0] is not threading.main_thread()
+
+        blocker = sqlite3.connect(limiter.path, isolation_level=None)
+        blocker.execute("BEGIN IMMEDIATE")
+        start = time.monotonic()
+        decision = await limiter.aacquire("client")
+        blocker.execute("ROLLBACK")
+        assert decision.allowed
+        assert time.monotonic() - start < 2.0
+
+
+class TestSingleFlight:
+    """測試並發請求合併"""
+
+    @pytest.mark.asyncio
+    async def test_shares_error_with_all_waiters(self):
+        """測試共用呼叫的例外會傳遞給所有等待者"""
+        import asyncio
+
+        flight = SingleFlight()
+        calls = 0
+
+        async def failing():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            raise RuntimeError("upstream down")
+
+        results = await asyncio.gather(
+            *[flight.do("key", failing) for _ in range(3)], return_exceptions=True
+        )
+
+        assert calls == 1
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert flight.stats() == {"in_flight": 0, "executions": 1, "shared": 2}
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_does_not_cancel_shared_call(self):
+        """測試單一等待者取消不影響其他等待者"""
+        import asyncio
+
+        flight = SingleFlight()
+
+        async def slow():
+            await asyncio.sleep(0.02)
+            return "done"
+
+        first = asyncio.ensure_future(flight.do("key", slow))
+        second = asyncio.ensure_future(flight.do("key", slow))
+        await asyncio.sleep(0)
+        first.cancel()
+
+        assert await second == "done"
+
+    @pytest.mark.asyncio
+    async def test_last_cancelled_waiter_cancels_shared_call(self):
+        """測試所有等待者皆取消時一併取消共用的執行"""
+        import asyncio
+
+        flight = SingleFlight()
+        started = asyncio.Event()
+        cancelled = asyncio.Event()
+
+        async def slow():
+            started.set()
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        waiter = asyncio.ensure_future(flight.do("key", slow))
+        await started.wait()
+        waiter.cancel()
+        await asyncio.wait_for(cancelled.wait(), 1)
+
+        assert flight.in_flight() == 0
+
+
+class TestPagination:
+    """測試分頁與截止時間"""
+
+    @pytest.mark.asyncio
+    async def test_deadline_stops_pagination(self):
+        """測試超過截止時間時不再要求後續分頁"""
+        import asyncio
+        import time
+        from src.core.exceptions import DeadlineExceededError
+        from src.services.pagination import paginate
+
+        requested = []
+
+        async def fetch(page):
+            requested.append(page)
+            if page > 1:
+                await asyncio.sleep(1)
+            return [{"href": f"https://e.com/{page}"}]
+
+        pages = []
+        with pytest.raises(DeadlineExceededError):
+            async for page in paginate(fetch, "text", 10, time.monotonic() + 0.05):
+                pages.append(page)
+
+        assert pages == [[{"href": "https://e.com/1"}]]
+        assert requested == [1, 2]
+
+    @pytest.mark.asyncio
+    async def test_expired_deadline_skips_fetch(self):
+        """測試截止時間已過時不發出請求"""
+        import time
+        from src.core.exceptions import DeadlineExceededError
+        from src.services.pagination import paginate
+
+        fetch = MagicMock()
+
+        with pytest.raises(DeadlineExceededError):
+            async for _ in paginate(fetch, "text", 10, time.monotonic() - 1):
+                pass
+
+        fetch.assert_not_called()
+
+    @pytest.mark.asyncio
+    @patch("src.services.ddgs_service.DDGS")
+    async def test_thread_stream_results_are_contiguous(self, mock_ddgs):
+        """測試執行緒後端串流跨引擎分頁時結果連續，不會遺漏每頁的其餘結果"""
+
+        def images(query, page=1, max_results=None, **kwargs):
+            # 與DDGS相同：page為引擎分頁(每頁100筆)，max_results只截斷該頁
+            results = [
+                {"title": str(i), "image": f"https://i.example.com/{i}"}
+                for i in range((page - 1) * 100, page * 100)
+            ]
+            return results[:max_results] if max_results else results
+
+        mock_ddgs_instance = MagicMock()
+        mock_ddgs_instance.images.side_effect = images
+        mock_ddgs.return_value.__enter__.return_value = mock_ddgs_instance
+
+        pages = []
+        with patch("src.services.ddgs_service.settings.STREAM_PAGE_SIZE", 10):
+            async for page in DDGSService.stream(
+                "images", query="contiguous", max_results=150
+            ):
+                pages.append(page)
+
+        titles = [result["title"] for page in pages for result in page]
+        assert titles == [str(i) for i in range(150)]
+        assert all(len(page) == 10 for page in pages)
+        assert mock_ddgs_instance.images.call_count == 2
+
+
+class TestDDGSClientPool:
+    """測試DDGS客戶端連線池"""
+
+    def make_pool(self, **overrides):
+        options = dict(size=1, max_age=60, max_failures=2, acquire_timeout=0.01)
+        options.update(overrides)
+        return DDGSClientPool(factory=MagicMock, **options)
+
+    def test_reuses_clients(self):
+        """測試客戶端會被重複使用"""
+        pool = self.make_pool()
+        pool.start()
+
+        with pool.client() as first:
+            pass
+        with pool.client() as second:
+            pass
+
+        assert first is second
+        assert pool.stats()["created"] == 1
+        pool.close()
+        assert pool.stats()["alive"] == 0
+
+    def test_replaces_unhealthy_client(self):
+        """測試連續失敗的客戶端會被替換"""
+        pool = self.make_pool(max_failures=1)
+        pool.start()
+
+        with pytest.raises(RuntimeError):
+            with pool.client() as first:
+                raise RuntimeError("upstream error")
+        with pool.client() as second:
+            pass
+
+        assert first is not second
+        assert pool.stats()["recycled"] == 1
+
+    def test_empty_results_do_not_count_as_failures(self):
+        """測試查無結果與超過截止時間不計入失敗，健康的客戶端不會被替換"""
+        from ddgs.exceptions import DDGSException
+        from src.core.exceptions import DeadlineExceededError
+        from src.services.ddgs_service import is_upstream_failure
+
+        pool = self.make_pool(max_failures=1, is_failure=is_upstream_failure)
+        pool.start()
+
+        for error in (
+            DDGSException("No results found."),
+            DeadlineExceededError("Search deadline exceeded"),
+        ):
+            with pytest.raises(type(error)):
+                with pool.client() as client:
+                    raise error
+        with pool.client() as last:
+            pass
+
+        assert last is client
+        assert pool.stats()["recycled"] == 0
+
+    def test_recycles_expired_clients(self):
+        """測試定期更換過期客戶端"""
+        pool = self.make_pool(size=2, max_age=0)
+        pool.start()
+
+        assert pool.recycle_expired() == 2
+        assert pool.stats()["alive"] == 2
+
+    def test_exhausted_pool(self):
+        """測試沒有可用客戶端時的錯誤"""
+        pool = self.make_pool()
+        pool.start()
+
+        with pool.client():
+            with pytest.raises(PoolExhaustedError):
+                with pool.client():
+                    pass
+
+    def test_not_started_uses_ephemeral_client(self):
+        """測試未啟動時每次建立新客戶端"""
+        pool = self.make_pool()
+
+        with pool.client():
+            pass
+
+        assert pool.stats()["created"] == 0
+
+
+class TestBoundedExecutor:
+    """測試有界搜尋執行緒池"""
+
+    @pytest.mark.asyncio
+    async def test_runs_function(self):
+        """測試在執行緒池中執行函數"""
+        executor = BoundedExecutor(max_workers=1, max_queue=0, retry_after=1)
+
+        assert await executor.run(sum, [1, 2, 3]) == 6
+
+        stats = executor.stats()
+        assert stats["completed"] == 1
+        assert stats["pending"] == 0
+        executor.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_rejects_when_queue_full(self):
+        """測試佇列已滿時立即拒絕"""
+        import asyncio
+        import threading
+
+        executor = BoundedExecutor(max_workers=1, max_queue=1, retry_after=3)
+        release = threading.Event()
+
+        running = [asyncio.ensure_future(executor.run(release.wait)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+
+        with pytest.raises(ExecutorSaturatedError) as exc_info:
+            await executor.run(release.wait)
+
+        assert exc_info.value.headers() == {"Retry-After": "3"}
+        assert executor.stats()["rejected"] == 1
+
+        release.set()
+        await asyncio.gather(*running)
+        assert executor.pending == 0
+        executor.shutdown()
+
+
+class TestAsyncDDGSBackend:
+    """測試原生非同步搜尋後端"""
+
+    TEXT_HTML = """
+    <html><body>
+      <div class="result__body">
+        <h2><a class="result__a" href="https://example.com/1">First</a></h2>
+        <a class="result__snippet" href="https://example.com/1">First body</a>
+      </div>
+      <div class="result__body">
+        <h2><a class="result__a" href="https://example.com/2">Second</a></h2>
+        <a class="result__snippet" href="https://example.com/2">Second body</a>
+      </div>
+    </body></html>
+    """
+
+    def make_backend(self, handler):
+        import httpx
+
+        backend = AsyncDDGSBackend(timeout=1, max_connections=4)
+        backend._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        return backend
+
+    @pytest.mark.asyncio
+    async def test_text_search_parses_and_stops_on_duplicates(self):
+        """測試網頁搜尋解析結果並在沒有新結果時停止分頁"""
+        import httpx
+
+        requests_seen = []
+
+        def handler(request):
+            requests_seen.append(request)
+            return httpx.Response(200, text=self.TEXT_HTML)
+
+        backend = self.make_backend(handler)
+        results = await backend.search("text", query="test", max_results=10)
+        await backend.close()
+
+        assert [r["title"] for r in results] == ["First", "Second"]
+        assert results[0]["href"] == "https://example.com/1"
+        assert results[0]["body"] == "First body"
+        assert len(requests_seen) == 2
+
+    @pytest.mark.asyncio
+    async def test_news_search_respects_max_results(self):
+        """測試新聞搜尋使用vqd並限制結果數"""
+        import httpx
+
+        def handler(request):
+            if request.url.path == "/news.js":
+                assert request.url.params["vqd"] == "4-123"
+                items = [
+                    {
+                        "date": 1704067200,
+                        "title": f"News {i}",
+                        "excerpt": "body",
+                        "url": f"https://example.com/{i}",
+                        "source": "example",
+                    }
+                    for i in range(5)
+                ]
+                return httpx.Response(200, json={"results": items})
+            return httpx.Response(200, content=b'<script>vqd="4-123"</script>')
+
+        backend = self.make_backend(handler)
+        results = await backend.search("news", query="test", max_results=3)
+
+        assert len(results) == 3
+        assert results[0]["body"] == "body"
+        assert results[0]["date"].startswith("2024-01-01")
+
+    @pytest.mark.asyncio
+    async def test_images_search_reuses_vqd_across_pages(self):
+        """測試同一次搜尋的圖片分頁只取得一次vqd"""
+        import httpx
+
+        vqd_requests = []
+
+        def handler(request):
+            if request.url.path == "/i.js":
+                offset = int(request.url.params.get("s", "0"))
+                items = [
+                    {"title": f"Image {offset + i}", "image": f"https://i/{offset + i}"}
+                    for i in range(100)
+                ]
+                return httpx.Response(200, json={"results": items})
+            vqd_requests.append(request)
+            return httpx.Response(200, content=b"<script>vqd='4-456'</script>")
+
+        backend = self.make_backend(handler)
+        results = await backend.search("images", query="test", max_results=150)
+
+        assert len(results) == 150
+        assert results[100]["title"] == "Image 100"
+        assert len(vqd_requests) == 1
+
+    @pytest.mark.asyncio
+    async def test_no_results_matches_thread_backend(self):
+        """測試第一頁沒有結果時與執行緒後端相同地拋出DDGSException"""
+        import httpx
+        from ddgs.exceptions import DDGSException
+
+        backend = self.make_backend(
+            lambda request: httpx.Response(200, text="<html></html>")
+        )
+        with pytest.raises(DDGSException, match="No results found."):
+            await backend.search("text", query="nothing")
+        assert await backend.fetch_page("text", 2, query="nothing") == []
+
+    def test_extract_vqd(self):
+        """測試從首頁取出vqd參數"""
+        from ddgs.exceptions import DDGSException
+
+        assert extract_vqd(b'<script>vqd="4-1"</script>', "q") == "4-1"
+        assert extract_vqd(b"/d.js?vqd=4-2&q=x", "q") == "4-2"
+        with pytest.raises(DDGSException):
+            extract_vqd(b"<html></html>", "q")
+
+    @pytest.mark.asyncio
+    async def test_service_dispatches_to_async_backend(self):
+        """測試設定為async時DDGSService使用非同步後端"""
+        from unittest.mock import AsyncMock
+
+        mock_search = AsyncMock(return_value=[{"title": "async"}])
+        with patch("src.services.ddgs_service.settings.SEARCH_BACKEND", "async"), patch(
+            "src.services.ddgs_service.async_backend.search", mock_search
+        ):
+            results = await DDGSService.search("text", query="test")
+
+        assert results == [{"title": "async"}]
+        mock_search.assert_awaited_once_with(
+            "text", query="test", region="wt-wt", safesearch="moderate"
+        )
+
+
+class TestMetricsRegistry:
+    """測試指標註冊表"""
+
+    def test_render_counter_and_histogram(self):
+        """測試計數器與直方圖的Prometheus文字輸出"""
+        registry = MetricsRegistry()
+        requests = registry.counter("requests_total", "Requests", ("route",))
+        latency = registry.histogram(
+            "latency_seconds", "Latency", ("route",), buckets=(0.1, 1.0)
+        )
+
+        requests.inc(route="/search")
+        requests.inc(2, route="/search")
+        latency.observe(0.05, route="/search")
+        latency.observe(0.5, route="/search")
+        latency.observe(5, route="/search")
+
+        text = registry.render()
+        assert "# TYPE requests_total counter" in text
+        assert 'requests_total{route="/search"} 3' in text
+        assert 'latency_seconds_bucket{route="/search",le="0.1"} 1' in text
+        assert 'latency_seconds_bucket{route="/search",le="1"} 2' in text
+        assert 'latency_seconds_bucket{route="/search",le="+Inf"} 3' in text
+        assert 'latency_seconds_count{route="/search"} 3' in text
+        assert latency.sum(route="/search") == pytest.approx(5.55)
+
+    def test_labels_must_match(self):
+        """測試標籤名稱不符時拒絕"""
+        registry = MetricsRegistry()
+        counter = registry.counter("errors_total", "Errors", ("exception",))
+
+        with pytest.raises(ValueError):
+            counter.inc(route="/search")
+        with pytest.raises(ValueError):
+            registry.counter("errors_total", "Errors")
+
+    @pytest.mark.asyncio
+    @patch("src.services.ddgs_service.DDGS")
+    async def test_search_records_stage_metrics(self, mock_ddgs):
+        """測試搜尋記錄上游時間、結果數量與錯誤類別"""
+        from src.core import metrics
+
+        mock_ddgs_instance = MagicMock()
+        mock_ddgs_instance.news.return_value = [{"title": "n", "url": "u"}]
+        mock_ddgs.return_value.__enter__.return_value = mock_ddgs_instance
+
+        upstream = metrics.upstream_duration_seconds.count(
+            search_type="news", backend="thread"
+        )
+        counted = metrics.search_result_count.count(search_type="news")
+        await DDGSService.search("news", query="metrics")
+
+        assert (
+            metrics.upstream_duration_seconds.count(
+                search_type="news", backend="thread"
+            )
+            == upstream + 1
+        )
+        assert metrics.search_result_count.count(search_type="news") == counted + 1
+
+        errors = metrics.search_errors_total.value(
+            search_type="news", exception="ConnectionError"
+        )
+        mock_ddgs_instance.news.side_effect = ConnectionError("down")
+        with pytest.raises(Exception):
+            await DDGSService.search("news", query="metrics failure")
+        assert (
+            metrics.search_errors_total.value(
+                search_type="news", exception="ConnectionError"
+            )
+            == errors + 1
+        )
+
+
+class TestCircuitBreaker:
+    """測試上游斷路器"""
+
+    def make_breaker(self, **overrides):
+        options = dict(
+            name="text",
+            window=60,
+            min_calls=4,
+            failure_rate=0.5,
+            slow_call_seconds=5,
+            open_duration=30,
+            half_open_calls=2,
+        )
+        options.update(overrides)
+        return CircuitBreaker(**options)
+
+    def fail(self, breaker, times=1):
+        for _ in range(times):
+            with pytest.raises(ConnectionError):
+                with breaker.guard():
+                    raise ConnectionError("upstream down")
+
+    def test_opens_on_failure_rate(self):
+        """測試錯誤率達到門檻時開啟並快速失敗"""
+        breaker = self.make_breaker()
+        with breaker.guard():
+            pass
+        self.fail(breaker, 1)
+        assert breaker.state == "closed"
+
+        with patch("src.services.circuit_breaker.time.monotonic", return_value=0.0):
+            self.fail(breaker, 2)
+            assert breaker.state == "open"
+
+            with pytest.raises(CircuitOpenError) as exc_info:
+                with breaker.guard():
+                    pass
+        assert exc_info.value.retry_after == 30
+        assert breaker.stats()["rejected"] == 1
+
+    def test_slow_calls_count_as_failures(self):
+        """測試慢速呼叫計入失敗比例"""
+        breaker = self.make_breaker(min_calls=2)
+        breaker.record_success(False, 6.0)
+        assert breaker.state == "closed"
+        breaker.record_success(False, 7.0)
+        assert breaker.state == "open"
+
+    def test_slow_call_timer_excludes_queue_wait(self):
+        """測試慢速判斷只計算回報的上游耗時，不包含等待名額與佇列的時間"""
+        from src.services.upstream_timing import call_duration_reporter
+
+        breaker = self.make_breaker(min_calls=1, slow_call_seconds=0.05)
+        with breaker.guard():
+            report = call_duration_reporter()
+            time.sleep(0.1)
+            report(0.01)
+        assert breaker.state == "closed"
+
+        with breaker.guard():
+            time.sleep(0.1)
+        assert breaker.state == "open"
+        call_duration_reporter()(1.0)
+
+    def test_half_open_trials_close_or_reopen(self):
+        """測試半開狀態的試探請求結果"""
+        breaker = self.make_breaker(min_calls=1)
+        with patch("src.services.circuit_breaker.time.monotonic", return_value=0.0):
+            self.fail(breaker)
+
+        with patch("src.services.circuit_breaker.time.monotonic", return_value=31.0):
+            assert breaker.state == "half_open"
+            self.fail(breaker)
+            assert breaker.state == "open"
+
+        with patch("src.services.circuit_breaker.time.monotonic", return_value=62.0):
+            first = breaker.acquire()
+            second = breaker.acquire()
+            assert first and second
+            with pytest.raises(CircuitOpenError):
+                breaker.acquire()
+            breaker.record_success(first, 0.1)
+            breaker.record_success(second, 0.1)
+            assert breaker.state == "closed"
+
+    def test_disabled_breaker_never_opens(self):
+        """測試停用時不開啟"""
+        breaker = self.make_breaker(min_calls=1, enabled=False)
+        self.fail(breaker, 3)
+        assert not breaker.is_open()
+
+    @pytest.mark.asyncio
+    @patch("src.services.ddgs_service.DDGS")
+    async def test_open_breaker_serves_expired_cache(self, mock_ddgs):
+        """測試斷路器開啟時回傳過期快取且不呼叫上游"""
+        from src.services.cache import search_cache
+        from src.services.ddgs_service import circuit_breakers
+
+        mock_ddgs_instance = MagicMock()
+        mock_ddgs.return_value.__enter__.return_value = mock_ddgs_instance
+
+        key = make_cache_key("news", normalize_params({"query": "outage"}))
+        with patch("src.services.cache.time.monotonic", return_value=0.0):
+            search_cache.set(key, [{"title": "cached"}], "news")
+
+        breaker = circuit_breakers["news"]
+        for _ in range(breaker.min_calls):
+            breaker.record_failure(False)
+        assert breaker.is_open()
+
+        results = await DDGSService.search("news", query="outage")
+        assert results == [{"title": "cached"}]
+
+        with pytest.raises(CircuitOpenError):
+            await DDGSService.search("news", query="never cached")
+        mock_ddgs_instance.news.assert_not_called()
+
+    def test_empty_results_are_not_upstream_failures(self):
+        """測試沒有結果不計入斷路器失敗"""
+        from ddgs.exceptions import DDGSException, RatelimitException
+        from src.services.ddgs_service import is_upstream_failure
+
+        assert not is_upstream_failure(DDGSException("No results found."))
+        assert is_upstream_failure(RatelimitException("202 Ratelimit"))
+        wrapped = Exception("Search operation failed: timeout")
+        wrapped.__cause__ = TimeoutError("timeout")
+        assert is_upstream_failure(wrapped)
+
+
+class TestAdaptiveConcurrencyLimiter:
+    """測試上游自適應並發限制"""
+
+    def make_limiter(self, **overrides):
+        options = dict(
+            initial_limit=2,
+            min_limit=1,
+            max_limit=4,
+            latency_tolerance=2,
+            backoff_ratio=0.5,
+            max_wait=0.05,
+        )
+        options.update(overrides)
+        return AdaptiveConcurrencyLimiter(**options)
+
+    async def saturate(self, limiter, latency):
+        """佔滿所有名額後記錄一次呼叫結果"""
+        slots = limiter.target
+        for _ in range(slots):
+            await limiter.acquire()
+        limiter.record(time.monotonic(), latency)
+        for _ in range(slots):
+            limiter.release()
+
+    @pytest.mark.asyncio
+    async def test_grows_while_latency_is_flat(self):
+        """測試延遲穩定時上限逐步增加且不超過最大值"""
+        limiter = self.make_limiter()
+        for _ in range(3):
+            await self.saturate(limiter, 0.1)
+        assert limiter.target == 3
+
+        for _ in range(20):
+            await self.saturate(limiter, 0.1)
+        assert limiter.target == 4
+        assert limiter.stats()["baseline_latency"] == {"default": 0.1}
+
+        idle = self.make_limiter()
+        for _ in range(5):
+            idle.record(time.monotonic(), 0.1)
+        assert idle.target == 2
+
+    def test_rate_limit_halves_once_per_wave(self):
+        """測試限流錯誤使上限減半，同一波請求只縮減一次"""
+        from ddgs.exceptions import RatelimitException
+
+        limiter = self.make_limiter(initial_limit=4)
+        started_at = time.monotonic()
+        wrapped = Exception("Search operation failed: 202 Ratelimit")
+        wrapped.__cause__ = RatelimitException("202 Ratelimit")
+
+        limiter.record(started_at, 0.1, wrapped)
+        limiter.record(started_at, 0.1, wrapped)
+        assert limiter.target == 2
+        assert limiter.decreases == 1
+
+        limiter.record(time.monotonic(), 0.1, wrapped)
+        assert limiter.target == 1
+
+        limiter.record(time.monotonic(), 0.1, ValueError("bad query"))
+        assert limiter.decreases == 2
+
+    def test_latency_rise_lowers_limit(self):
+        """測試延遲明顯高於基準時降低上限"""
+        limiter = self.make_limiter(initial_limit=4)
+        limiter.record(time.monotonic(), 0.1)
+        for _ in range(10):
+            limiter.record(time.monotonic(), 2.0)
+        assert limiter.target < 4
+        assert limiter.stats()["smoothed_latency"]["default"] > 0.2
+
+    def test_latency_baseline_per_call_kind(self):
+        """測試延遲基準依呼叫種類分別計算，較慢的種類不會被視為延遲升高"""
+        limiter = self.make_limiter(initial_limit=4)
+        for _ in range(5):
+            limiter.record(time.monotonic(), 0.1, key="text.text_search")
+            limiter.record(time.monotonic(), 1.0, key="images.fetch_page")
+        assert limiter.decreases == 0
+        assert limiter.stats()["baseline_latency"] == {
+            "text.text_search": 0.1,
+            "images.fetch_page": 1.0,
+        }
+
+    @pytest.mark.asyncio
+    async def test_slot_latency_excludes_queue_wait(self):
+        """測試名額內的延遲只計算回報的上游耗時"""
+        from src.services.upstream_timing import call_duration_reporter
+
+        limiter = self.make_limiter()
+        async with limiter.slot("text.fetch_page"):
+            await asyncio.sleep(0.05)
+            call_duration_reporter()(0.01)
+        assert limiter.stats()["baseline_latency"] == {"text.fetch_page": 0.01}
+
+    @pytest.mark.asyncio
+    async def test_waits_for_slot_and_rejects_after_max_wait(self):
+        """測試超過上限的請求排隊，等待逾時後回傳503錯誤"""
+        limiter = self.make_limiter(initial_limit=1)
+        await limiter.acquire()
+
+        with pytest.raises(ConcurrencyLimitError) as exc_info:
+            await limiter.acquire()
+        assert exc_info.value.retry_after == 0.05
+        assert limiter.rejected == 1
+
+        waiter = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        assert limiter.stats()["waiting"] == 1
+        limiter.release()
+        await asyncio.wait_for(waiter, 1)
+        assert limiter.in_flight == 1
+        assert limiter.stats()["waiting"] == 0
+
+    @pytest.mark.asyncio
+    @patch("src.services.ddgs_service.DDGS")
+    async def test_safe_operation_holds_slot(self, mock_ddgs):
+        """測試DDGS操作在並發名額內執行並記錄延遲"""
+        from src.services.concurrency import upstream_limiter
+
+        in_flight = []
+        mock_ddgs_instance = MagicMock()
+        mock_ddgs_instance.text.side_effect = lambda *args, **kwargs: (
+            in_flight.append(upstream_limiter.in_flight) or [{"title": "ok"}]
+        )
+        mock_ddgs.return_value.__enter__.return_value = mock_ddgs_instance
+
+        await DDGSService.safe_ddgs_operation(DDGSService.text_search, query="slot")
+
+        assert in_flight == [1]
+        assert upstream_limiter.in_flight == 0
+        assert "text_search" in upstream_limiter.stats()["baseline_latency"]
+
+        from src.services.ddgs_service import timed_upstream
+
+        await DDGSService.safe_ddgs_operation(
+            timed_upstream("text", DDGSService.text_search), query="slot"
+        )
+        assert "text.text_search" in upstream_limiter.stats()["baseline_latency"]
+
+
+class TestRequestHedger:
+    """測試上游請求避險"""
+
+    def make_hedger(self, **overrides):
+        options = dict(percentile=0.9, min_delay=0.01, max_delay=1.0, initial_delay=0.5)
+        options.update(overrides)
+        return RequestHedger(**options, min_samples=5)
+
+    def test_delay_follows_latency_percentile(self):
+        """測試延遲門檻依分位數計算並受上下限限制"""
+        hedger = self.make_hedger()
+        assert hedger.delay("text") == 0.5
+
+        for seconds in (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 0.95):
+            hedger.observe("text", seconds)
+        assert hedger.delay("text") == 0.9
+        assert hedger.delay("news") == 0.5
+
+        hedger.observe("images", 0.0)
+        for _ in range(5):
+            hedger.observe("images", 5.0)
+        assert hedger.delay("images") == 1.0
+
+    @pytest.mark.asyncio
+    async def test_fast_primary_is_not_hedged(self):
+        """測試主要請求在門檻內完成時不送出避險請求"""
+        hedger = self.make_hedger()
+        hedge = MagicMock()
+
+        async def primary():
+            return ["primary"]
+
+        assert await hedger.run("text", primary, hedge, delay=1) == ["primary"]
+        hedge.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_hedge_wins_and_cancels_primary(self):
+        """測試避險請求先完成時回傳其結果並取消主要請求"""
+        hedger = self.make_hedger()
+        cancelled = asyncio.Event()
+
+        async def primary():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        async def hedge():
+            return ["hedge"]
+
+        assert await hedger.run("text", primary, hedge, delay=0.01) == ["hedge"]
+        await asyncio.wait_for(cancelled.wait(), 1)
+
+    @pytest.mark.asyncio
+    async def test_failed_hedge_waits_for_primary(self):
+        """測試避險請求失敗時仍等待主要請求，兩者皆失敗時拋出主要請求的例外"""
+        hedger = self.make_hedger()
+
+        async def hedge():
+            raise ConnectionError("hedge failed")
+
+        async def slow_primary():
+            await asyncio.sleep(0.05)
+            return ["primary"]
+
+        assert await hedger.run("text", slow_primary, hedge, delay=0.01) == ["primary"]
+
+        async def failing_primary():
+            await asyncio.sleep(0.05)
+            raise TimeoutError("primary failed")
+
+        with pytest.raises(TimeoutError):
+            await hedger.run("text", failing_primary, hedge, delay=0.01)
+
+    @pytest.mark.asyncio
+    @patch("src.services.ddgs_service.DDGS")
+    async def test_fetch_upstream_hedges_to_alternate_backend(self, mock_ddgs):
+        """測試啟用避險時以HEDGE_BACKEND與HEDGE_REGION送出第二次請求"""
+        from src.core.config import settings
+
+        mock_ddgs_instance = MagicMock()
+        mock_ddgs_instance.text.return_value = [{"title": "hedged"}]
+        mock_ddgs.return_value.__enter__.return_value = mock_ddgs_instance
+
+        async def slow_primary(search_type, **params):
+            await asyncio.sleep(10)
+
+        with patch.object(settings, "HEDGE_ENABLED", True), patch.object(
+            settings, "HEDGE_BACKEND", "duckduckgo"
+        ), patch.object(settings, "HEDGE_REGION", "us-en"), patch.object(
+            DDGSService, "fetch_primary", side_effect=slow_primary
+        ), patch(
+            "src.services.hedging.RequestHedger.delay", return_value=0.01
+        ):
+            results = await DDGSService.fetch_upstream(
+                "text", query="hedge", region="wt-wt", max_results=5
+            )
+
+        assert results == [{"title": "hedged"}]
+        mock_ddgs_instance.text.assert_called_once_with(
+            "hedge", backend="duckduckgo", region="us-en", max_results=5
+        )
+
+
+class TestServerLauncher:
+    """測試生產環境啟動設定"""
+
+    def test_worker_count_and_implementations(self):
+        """測試worker數預設為CPU核心數，auto時選用已安裝的uvloop與httptools"""
+        from src.core.server import (
+            LOOP_IMPLEMENTATIONS,
+            resolve_implementation,
+            worker_count,
+        )
+
+        with patch("src.core.server.settings.DEBUG", False), patch(
+            "src.core.server.settings.WORKERS", 0
+        ), patch("src.core.server.os.cpu_count", return_value=6):
+            assert worker_count() == 6
+        with patch("src.core.server.settings.DEBUG", False), patch(
+            "src.core.server.settings.WORKERS", 3
+        ):
+            assert worker_count() == 3
+        with patch("src.core.server.settings.DEBUG", True), patch(
+            "src.core.server.settings.WORKERS", 3
+        ):
+            assert worker_count() == 1
+
+        assert resolve_implementation("asyncio", LOOP_IMPLEMENTATIONS) == "asyncio"
+        with patch("src.core.server.importlib.util.find_spec", return_value=None):
+            assert resolve_implementation("auto", LOOP_IMPLEMENTATIONS) == "asyncio"
+        with patch("src.core.server.importlib.util.find_spec", return_value=object()):
+            assert resolve_implementation("auto", LOOP_IMPLEMENTATIONS) == "uvloop"
+
+    def test_server_options_and_request_jitter(self):
+        """測試uvicorn參數來自設定，且請求數上限在每個worker載入時加上抖動"""
+        from src.core.server import RecyclingConfig, server_options
+
+        with patch("src.core.server.settings.MAX_REQUESTS", 1000), patch(
+            "src.core.server.settings.MAX_REQUESTS_JITTER", 50
+        ), patch("src.core.server.settings.BACKLOG", 4096):
+            options = server_options()
+        assert options["limit_max_requests"] == 1000
+        assert options["backlog"] == 4096
+        assert options["timeout_keep_alive"] == 75
+
+        options["workers"] = 2
+        options["reload"] = False
+        config = RecyclingConfig("src.app:app", **options)
+        with patch("src.core.server.random.randint", return_value=17):
+            config.load()
+        assert config.limit_max_requests == 1017
+
+        with patch("src.core.server.settings.MAX_REQUESTS", 0):
+            assert server_options()["limit_max_requests"] is None
+
+    @pytest.mark.parametrize(
+        "max_requests, supervised", [(1000, True), (0, False)], ids=["limit", "none"]
+    )
+    def test_single_worker_with_request_limit_is_supervised(
+        self, max_requests, supervised
+    ):
+        """測試只有一個worker且設定請求數上限時，由主程序重新啟動結束的worker"""
+        from src.core import server
+
+        with patch.object(server.settings, "DEBUG", False), patch.object(
+            server.settings, "WORKERS", 1
+        ), patch.object(server.settings, "MAX_REQUESTS", max_requests), patch.object(
+            server.RecyclingConfig, "bind_socket"
+        ), patch.object(
+            server, "Multiprocess"
+        ) as multiprocess, patch.object(
+            server.uvicorn, "Server"
+        ) as server_class:
+            server_class.return_value.started = True
+            server.run()
+
+        assert multiprocess.called is supervised
+        assert server_class.return_value.run.called is not supervised
+
+    def test_reload_ignores_request_limit(self):
+        """測試開發模式的自動重新載入不會重新啟動worker，因此不套用請求數上限"""
+        from src.core import server
+
+        with patch.object(server.settings, "DEBUG", True), patch.object(
+            server.settings, "MAX_REQUESTS", 1000
+        ), patch.object(server.RecyclingConfig, "bind_socket"), patch.object(
+            server, "ChangeReload"
+        ) as reload, patch.object(
+            server.uvicorn, "Server"
+        ):
+            server.run()
+
+        config = reload.call_args.args[0]
+        assert config.limit_max_requests is None
+
 
 class TestAuthService:
     """測試認證服務"""
@@ -342,4 +2232,94 @@ class TestAuthService:
         )
 
         result = verify_token(credentials)
-        assert result == "valid-token"
+        assert result == DEFAULT_TOKEN_INFO
+
+
+class TestTokenRegistry:
+    """測試多token清單"""
+
+    def write_tokens(self, path, entries):
+        import json
+
+        path.write_text(json.dumps({"tokens": entries}))
+
+    def test_lookup_by_hash_and_plain_token(self, tmp_path):
+        """測試以摘要或原始token設定的項目皆可驗證，並保留個別設定"""
+        path = tmp_path / "tokens.json"
+        self.write_tokens(
+            path,
+            [
+                {
+                    "name": "partner",
+                    "sha256": token_digest("partner-secret"),
+                    "search_types": ["text", "news"],
+                    "rate_limit": 2,
+                    "burst": 4,
+                },
+                {"name": "internal", "token": "internal-secret"},
+            ],
+        )
+        registry = TokenRegistry(path=str(path), env_tokens="env-a, env-b")
+
+        partner = registry.lookup("partner-secret")
+        assert partner == TokenInfo(
+            "partner", frozenset({"text", "news"}), rate=2.0, burst=4
+        )
+        assert not partner.allows("images")
+        assert registry.lookup("internal-secret").allows("images")
+        assert registry.lookup("env-b").name == "env"
+        assert registry.lookup("unknown") is None
+        assert registry.stats()["file_tokens"] == 2
+
+    def test_hot_reload_on_file_change(self, tmp_path):
+        """測試檔案變更後自動重新載入，格式錯誤時沿用舊清單"""
+        path = tmp_path / "tokens.json"
+        self.write_tokens(path, [{"token": "old"}])
+        registry = TokenRegistry(path=str(path), reload_interval=0)
+        assert registry.lookup("old") is not None
+
+        self.write_tokens(path, [{"token": "new-token"}])
+        assert registry.lookup("new-token") is None
+        assert registry.refresh()
+        assert registry.lookup("new-token") is not None
+        assert registry.lookup("old") is None
+        assert not registry.refresh()
+
+        path.write_text("{not json")
+        assert not registry.refresh()
+        assert registry.lookup("new-token") is not None
+        assert registry.stats()["reload_errors"] == 1
+
+    @pytest.mark.parametrize(
+        "entry",
+        [
+            {"token": "t", "search_types": "news"},
+            {"token": "t", "search_types": ["news", "videos"]},
+            {"sha256": "z" * 64},
+            {"sha256": "ab" * 31},
+        ],
+    )
+    def test_rejects_invalid_entries(self, entry):
+        """測試search_types不是列表或含未知類型、sha256不是64個十六進位字元時拒絕"""
+        with pytest.raises(ValueError):
+            parse_token_entries([entry])
+
+    def test_verify_token_uses_registry(self, tmp_path):
+        """測試verify_token接受清單中的token，並依搜尋類型授權"""
+        from src.services.auth_service import authorize_search_type
+
+        path = tmp_path / "tokens.json"
+        self.write_tokens(path, [{"token": "news-only", "search_types": ["news"]}])
+        registry = TokenRegistry(path=str(path))
+        credentials = HTTPAuthorizationCredentials(
+            scheme="Bearer", credentials="news-only"
+        )
+
+        with patch("src.services.auth_service.token_registry", registry), patch(
+            "src.services.auth_service.settings.API_TOKEN", None
+        ):
+            info = verify_token(credentials)
+            authorize_search_type(info, "news")
+            with pytest.raises(HTTPException) as exc_info:
+                authorize_search_type(info, "text")
+            assert exc_info.value.status_code == 403